@@ -13,6 +13,7 @@ from app.api.routes import (
     actions,
     node,
     power,
+    health,
 )
 
 api_router = APIRouter()
@@ -28,3 +29,4 @@ api_router.include_router(user.router)
 api_router.include_router(actions.router)
 api_router.include_router(node.router)
 api_router.include_router(power.router)
+api_router.include_router(health.router)
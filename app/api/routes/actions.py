@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, Body
-from app.resources import get_inventory_manager, get_commands_manager
+from app.resources import bulkheads, get_inventory_manager, get_commands_manager
 
 router = APIRouter(prefix="/actions", tags=["actions"])
 
 
 # POST /actions/{node_name}/command
 @router.post("/command/{node_name}")
+@bulkheads["concourse"].isolate
 def post_command(
     node_name: str,
     user: str = "root",
@@ -21,7 +22,8 @@ def post_command(
     return {"info": f"Command was scheduled on node {node_name}!"}
 
 @router.post("/command/script")
-async def post_script(
+@bulkheads["concourse"].isolate
+def post_script(
     script: str = Body(..., media_type="text/plain"),
     commands_manager=Depends(get_commands_manager)
 ):
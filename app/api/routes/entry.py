@@ -1,29 +1,37 @@
+import asyncio
 from fastapi import APIRouter, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from app.exceptions import InvalidTypeException
 from app.models.entry import BUILDER_BY_TYPE, EntryUnion
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/entry", tags=["entry"])
 
 @router.get("/{host_name}")
-def get_entry(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-read"].isolate
+async def get_entry(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Get an entry
     """
-    host = inventory_manager.get_host(host_name)
+    host = await inventory_manager.get_host_async(host_name)
     host = host.model_dump()
-    hostvars = hostvars_manager.get(host_name)
+    hostvars = await hostvars_manager.get_async(host_name)
     host['hostvars'].update(**hostvars)
     return host
 
 @router.get("/")
-def get_entry(inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-read"].isolate
+async def get_entry(inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Get all entries
     """
-    return inventory_manager.get_all_hosts()
+    entries = await inventory_manager.get_all_hosts_async()
+    # Encoding every entry is slow; do it off the event loop rather than let FastAPI do it on it
+    return JSONResponse(await asyncio.to_thread(jsonable_encoder, entries))
 
 @router.post("/")
+@bulkheads["git-write"].isolate
 def post_entry(entry: EntryUnion, hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Create an entry
@@ -39,10 +47,11 @@ def post_entry(entry: EntryUnion, hostvars_manager=Depends(get_hostvars_manager)
     return {"info": f"{entry.name} of type {entry.type} was created successfully!"}
 
 @router.delete("/{host_name}")
-def delete_entry(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-write"].isolate
+async def delete_entry(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Delete an entry
     """
-    inventory_manager.remove_host(host_name)
-    hostvars_manager.delete(host_name)
+    await inventory_manager.remove_host_async(host_name)
+    await hostvars_manager.delete_async(host_name)
     return {"info": "Entry deleted successfully!"}
@@ -2,17 +2,19 @@ from typing import Union
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from app.models.flag import FLAGS_VALIDATOR, ServerFlagModel
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.models.validation import validate_as
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/flags", tags=["flags"])
 
 @router.get("/{host_name}")
-def get_flags(host_name: str, hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
+@bulkheads["git-read"].isolate
+async def get_flags(host_name: str, hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Get flags
     """
-    inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
+    await inventory_manager.get_host_async(host_name)
+    hostvars = await hostvars_manager.get_async(host_name)
 
     if "flags" not in hostvars:
         return JSONResponse(
@@ -23,6 +25,7 @@ def get_flags(host_name: str, hostvars_manager=Depends(get_hostvars_manager), in
     return hostvars["flags"]
 
 @router.post("/{host_name}")
+@bulkheads["git-write"].isolate
 def post_flags(
     host_name: str,
     flags: Union[ServerFlagModel],
@@ -33,17 +36,15 @@ def post_flags(
     Post the flags
     """
     entry = inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
     host_type = entry.get_type()
 
-    if "flags" not in hostvars:
+    # Read, modified and written against the latest commit of the host's branch
+    future = hostvars_manager.set_section(host_name, "flags", validate_as(FLAGS_VALIDATOR[host_type], flags))
+    if future is None:
         return JSONResponse(
             status_code=200,
             content={"info": f"No flags found for {host_name}"}
         )
-    
-    flags_data = flags.model_dump()
-    flags = FLAGS_VALIDATOR[host_type].model_validate(flags_data)
-    hostvars["flags"] = flags
-    hostvars_manager.set_from_dict(entry, hostvars)
-    return {"info": "Flags updated successfully!"}
+
+    written = future.result()
+    return {"info": "Flags updated successfully!", "changed": written is not None}
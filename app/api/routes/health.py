@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.resources import get_metrics, get_readiness
+
+router = APIRouter(tags=["health"])
+
+@router.get("/healthz")
+def healthz():
+    """
+    Liveness: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+def readyz():
+    """
+    Readiness: whether every repo and client has finished initializing.
+    """
+    resources = get_readiness()
+    ready = all(status["ready"] for status in resources.values())
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "resources": resources}
+    )
+
+@router.get("/metrics")
+def metrics():
+    """
+    Runtime metrics, e.g. SSH connection reuse and handshake time saved.
+    """
+    return get_metrics()
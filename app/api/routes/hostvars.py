@@ -2,20 +2,23 @@ from typing import Union
 from fastapi import APIRouter, Depends, Body
 from app.models import *
 from app.models.hostvars import HOSTVARS_VALIDATOR, ServerHostvarsModel, DropletHostvarsModel
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.models.validation import validate_as
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 from fastapi.encoders import jsonable_encoder
 
 router = APIRouter(prefix="/hostvars", tags=["hostvars"])
 
 @router.get("/{host_name}")
-def get_hostvars(host_name: str, hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
+@bulkheads["git-read"].isolate
+async def get_hostvars(host_name: str, hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Get host variables.
     """
-    inventory_manager.get_host(host_name)
-    return hostvars_manager.get(host_name)
+    await inventory_manager.get_host_async(host_name)
+    return await hostvars_manager.get_async(host_name)
 
 @router.post("/{host_name}")
+@bulkheads["git-write"].isolate
 def post_hostvars(
     host_name: str,
     hostvars: Union[ServerHostvarsModel, DropletHostvarsModel],
@@ -26,8 +29,7 @@ def post_hostvars(
     Save the host variables to the repository.
     """
     entry = inventory_manager.get_host(host_name)
-    hostvars_data = hostvars.model_dump()
     host_type = entry.get_type()
-    hostvars = HOSTVARS_VALIDATOR[host_type].model_validate(hostvars_data)
-    hostvars_manager.set(entry, hostvars)
-    return {"info": "Host variables updated successfully!"}
+    hostvars = validate_as(HOSTVARS_VALIDATOR[host_type], hostvars)
+    written = hostvars_manager.set(entry, hostvars).result()
+    return {"info": "Host variables updated successfully!", "changed": written is not None}
@@ -1,31 +1,39 @@
+import asyncio
 from fastapi import APIRouter, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from app.models import *
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
 @router.get("/")
-def get_inventory(inventory_manager=Depends(get_inventory_manager)):
+@bulkheads["git-read"].isolate
+async def get_inventory(inventory_manager=Depends(get_inventory_manager)):
     """
     Get inventory
     """
-    return inventory_manager.get_inventory()
+    inventory = await inventory_manager.get_inventory_async()
+    # Encoding the whole inventory is slow; do it off the event loop rather than let FastAPI do it on it
+    return JSONResponse(await asyncio.to_thread(jsonable_encoder, inventory))
 
 @router.delete("/")
-def delete_inventory(inventory_manager=Depends(get_inventory_manager)):
+@bulkheads["git-write"].isolate
+async def delete_inventory(inventory_manager=Depends(get_inventory_manager)):
     """
     Delete all servers from the inventory
     """
-    inventory_manager.clear_inventory()
-    inventory_manager.save()
-    return {"info": "Inventory deleted"}
+    written = (await inventory_manager.clear_inventory_async()).result()
+    await inventory_manager.save_async()
+    return {"info": "Inventory deleted", "changed": written is not None}
 
 @router.delete("/all")
+@bulkheads["git-write"].isolate
 def delete_site(hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Delete everything
     """
-    hostvars_manager.delete_all()
-    inventory_manager.clear_inventory()
+    hostvars_result = hostvars_manager.delete_all()
+    written = inventory_manager.clear_inventory().result()
     inventory_manager.save()
-    return {"info": "Site deleted"}
\ No newline at end of file
+    return {"info": "Site deleted", "hostvars": hostvars_result, "inventory_changed": written is not None}
\ No newline at end of file
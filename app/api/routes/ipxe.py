@@ -1,30 +1,33 @@
 import logging
 from fastapi import APIRouter, Depends
 from fastapi.responses import PlainTextResponse
-from app.exceptions import HostNotFoundException, HostvarsNotFoundException
-from app.resources import get_inventory_manager, get_hostvars_manager
+from app.resources import bulkheads, get_boot_table
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ipxe", tags=["ipxe"])
 
 @router.get("/{mac}")
-async def get_ipxe_script(mac: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["boot"].isolate
+async def get_ipxe_script(mac: str, boot_table=Depends(get_boot_table)):
     """
     Returns a plaintext response of the os for iPXE booting
     Manually handle exceptions to avoid the generic JSON exception system
+
+    Answered from the in-memory boot table, so this never blocks the event loop on git.
     """
-    try:
-        host = inventory_manager.get_host_by_mac(mac)
-        hostvars = hostvars_manager.get(host.name)
-        if host.get_type() != "server":
-            return PlainTextResponse(content="Only the 'server' type is supported for this operation!", status_code=400)
-    except HostNotFoundException:
+    entry = boot_table.lookup(mac)
+    if entry is None:
         return PlainTextResponse(content="Host not found", status_code=404)
-    except HostvarsNotFoundException:
+    if not entry.has_hostvars:
         return PlainTextResponse(content="Hostvars not found", status_code=404)
-    except Exception as e:
-        logger.error(f"Received an error in iPXE route: {e}")
+    if entry.host_type != "server":
+        if entry.host_type is None:
+            logger.error(f"Received an error in iPXE route: unrecognized host type for {entry.name}")
+            return PlainTextResponse(content="Generic exception occurred!", status_code=404)
+        return PlainTextResponse(content="Only the 'server' type is supported for this operation!", status_code=400)
+    if entry.os is None:
+        logger.error(f"Received an error in iPXE route: no system.os in the hostvars of {entry.name}")
         return PlainTextResponse(content="Generic exception occurred!", status_code=404)
 
-    return PlainTextResponse(content=str(hostvars['system']['os']), status_code=200)
+    return PlainTextResponse(content=entry.os, status_code=200)
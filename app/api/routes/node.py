@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from app.resources import get_inventory_manager, get_commands_manager
+from app.resources import bulkheads, get_inventory_manager, get_commands_manager
 
 router = APIRouter(prefix="/node", tags=["node"])
 
@@ -12,6 +12,7 @@ class ProvisionRequest(BaseModel):
     wipe: bool = False
 
 @router.post("/reboot/normal")
+@bulkheads["concourse"].isolate
 def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_manager), commands_manager=Depends(get_commands_manager)):
     """
     Reboot a node
@@ -21,6 +22,7 @@ def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_man
     return {"info": f"Node {request.node} reboot initiated!"}
 
 @router.post("/reboot/ipxe")
+@bulkheads["concourse"].isolate
 def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_manager), commands_manager=Depends(get_commands_manager)):
     """
     Reboot a node into iPXE environment
@@ -30,6 +32,7 @@ def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_man
     return {"info": f"Node {request.node} reboot initiated!"}
 
 @router.post("/reboot/hard")
+@bulkheads["concourse"].isolate
 def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_manager), commands_manager=Depends(get_commands_manager)):
     """
     Reboot a node using sysrq
@@ -39,6 +42,7 @@ def post_entry(request: NodeRequest, inventory_manager=Depends(get_inventory_man
     return {"info": f"Node {request.node} reboot initiated!"}
 
 @router.post("/provision")
+@bulkheads["concourse"].isolate
 def post_entry(request: ProvisionRequest, inventory_manager=Depends(get_inventory_manager), commands_manager=Depends(get_commands_manager)):
     """
     Provision a node
@@ -1,7 +1,7 @@
 import time
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from app.resources import get_inventory_manager, get_commands_manager, get_kauf_manager_factory
+from app.resources import bulkheads, get_inventory_manager, get_commands_manager, get_kauf_manager_factory
 
 router = APIRouter(prefix="/power", tags=["power"])
 
@@ -9,6 +9,7 @@ class PowerRequest(BaseModel):
     node: str
 
 @router.post("/on")
+@bulkheads["power"].isolate
 def post_entry(request: PowerRequest, inventory_manager=Depends(get_inventory_manager), kauf_factory=Depends(get_kauf_manager_factory)):
     """
     Reboot a node
@@ -19,6 +20,7 @@ def post_entry(request: PowerRequest, inventory_manager=Depends(get_inventory_ma
     return {"info": f"Node {request.node} reboot initiated!"}
 
 @router.post("/off")
+@bulkheads["power"].isolate
 def post_entry(request: PowerRequest, inventory_manager=Depends(get_inventory_manager), kauf_factory=Depends(get_kauf_manager_factory)):
     """
     Reboot a node
@@ -29,6 +31,7 @@ def post_entry(request: PowerRequest, inventory_manager=Depends(get_inventory_ma
     return {"info": f"Node {request.node} reboot initiated!"}
 
 @router.post("/cycle")
+@bulkheads["power"].isolate
 def post_entry(request: PowerRequest, inventory_manager=Depends(get_inventory_manager), kauf_factory=Depends(get_kauf_manager_factory)):
     """
     Reboot a node
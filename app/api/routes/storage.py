@@ -2,17 +2,19 @@ from typing import Union
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from app.models.storage import STORAGE_VALIDATOR, StorageModel
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.models.validation import validate_as
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/storage", tags=["storage"])
 
 @router.get("/{host_name}")
-def get_storage(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-read"].isolate
+async def get_storage(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Get the storage of a host.
     """
-    inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
+    await inventory_manager.get_host_async(host_name)
+    hostvars = await hostvars_manager.get_async(host_name)
 
     if "storage" not in hostvars:
         return JSONResponse(
@@ -23,22 +25,21 @@ def get_storage(host_name: str, inventory_manager=Depends(get_inventory_manager)
     return hostvars["storage"]
 
 @router.post("/{host_name}")
+@bulkheads["git-write"].isolate
 def post_storage(host_name: str, storage: Union[StorageModel], hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Post the storage
     """
     entry = inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
     host_type = entry.get_type()
 
-    if "storage" not in hostvars:
+    # Read, modified and written against the latest commit of the host's branch
+    future = hostvars_manager.set_section(host_name, "storage", validate_as(STORAGE_VALIDATOR[host_type], storage))
+    if future is None:
         return JSONResponse(
             status_code=200,
             content={"info": f"No storage found for {host_name}"}
         )
-    
-    storage_data = storage.model_dump()
-    flags = STORAGE_VALIDATOR[host_type].model_validate(storage_data)
-    hostvars["storage"] = flags
-    hostvars_manager.set_from_dict(entry, hostvars)
-    return {"info": "Storage updated successfully!"}
+
+    written = future.result()
+    return {"info": "Storage updated successfully!", "changed": written is not None}
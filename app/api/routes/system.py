@@ -2,17 +2,19 @@ from typing import Union
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from app.models.system import SYSTEM_VALIDATOR, DropletSystemModel, ServerSystemModel
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.models.validation import validate_as
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/system", tags=["system"])
 
 @router.get("/{host_name}")
-def get_system(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-read"].isolate
+async def get_system(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Get the system of a host.
     """
-    inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
+    await inventory_manager.get_host_async(host_name)
+    hostvars = await hostvars_manager.get_async(host_name)
 
     if "system" not in hostvars:
         return JSONResponse(
@@ -23,22 +25,21 @@ def get_system(host_name: str, inventory_manager=Depends(get_inventory_manager),
     return hostvars["system"]
 
 @router.post("/{host_name}")
+@bulkheads["git-write"].isolate
 def post_system(host_name: str, system: Union[ServerSystemModel, DropletSystemModel], hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Post the system
     """
     entry = inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
     host_type = entry.get_type()
 
-    if "system" not in hostvars:
+    # Read, modified and written against the latest commit of the host's branch
+    future = hostvars_manager.set_section(host_name, "system", validate_as(SYSTEM_VALIDATOR[host_type], system))
+    if future is None:
         return JSONResponse(
             status_code=200,
             content={"info": f"No system data found for {host_name}"}
         )
-    
-    system_data = system.model_dump()
-    flags = SYSTEM_VALIDATOR[host_type].model_validate(system_data)
-    hostvars["system"] = flags
-    hostvars_manager.set_from_dict(entry, hostvars)
-    return {"info": "System data updated successfully!"}
+
+    written = future.result()
+    return {"info": "System data updated successfully!", "changed": written is not None}
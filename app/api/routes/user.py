@@ -2,17 +2,19 @@ from typing import Union, List
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from app.models.user import USER_VALIDATOR, UserModel
-from app.resources import get_hostvars_manager, get_inventory_manager
+from app.models.validation import validate_as
+from app.resources import bulkheads, get_hostvars_manager, get_inventory_manager
 
 router = APIRouter(prefix="/user", tags=["user"])
 
 @router.get("/{host_name}")
-def get_user(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
+@bulkheads["git-read"].isolate
+async def get_user(host_name: str, inventory_manager=Depends(get_inventory_manager), hostvars_manager=Depends(get_hostvars_manager)):
     """
     Get the users of a host.
     """
-    inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
+    await inventory_manager.get_host_async(host_name)
+    hostvars = await hostvars_manager.get_async(host_name)
 
     if "users" not in hostvars:
         return JSONResponse(
@@ -23,26 +25,22 @@ def get_user(host_name: str, inventory_manager=Depends(get_inventory_manager), h
     return hostvars["user"]
 
 @router.post("/{host_name}")
+@bulkheads["git-write"].isolate
 def post_user(host_name: str, users: List[UserModel], hostvars_manager=Depends(get_hostvars_manager), inventory_manager=Depends(get_inventory_manager)):
     """
     Post the user data
     """
     entry = inventory_manager.get_host(host_name)
-    hostvars = hostvars_manager.get(host_name)
     host_type = entry.get_type()
 
-    if "users" not in hostvars:
+    # Technically this isn't needed for UserModel since all types use the SAME model,
+    # but we keep it for consistency with other routes.
+    future = hostvars_manager.set_section(host_name, "users", validate_as(List[USER_VALIDATOR[host_type]], users))
+    if future is None:
         return JSONResponse(
             status_code=200,
             content={"info": f"No user data found for {host_name}"}
         )
 
-    # Technically this isn't needed for UserModel since all types use the SAME model,
-    # but we keep it for consistency with other routes.
-    for user in users:
-        user_data = user.model_dump()
-        user_model = USER_VALIDATOR[host_type].model_validate(user_data)
-
-    hostvars["users"] = users
-    hostvars_manager.set_from_dict(entry, hostvars)
-    return {"info": "User data updated successfully!"}
+    written = future.result()
+    return {"info": "User data updated successfully!", "changed": written is not None}
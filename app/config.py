@@ -6,9 +6,79 @@ def get_env_var_or_bust(var_name: str) -> str:
         raise EnvironmentError(f"Environment variable {var_name} is not set.")
     return value
 
-CONCOURSE_URL = get_env_var_or_bust("CONCOURSE_URL")
-CONCOURSE_USER = get_env_var_or_bust("CONCOURSE_USER")
-CONCOURSE_PASSWORD = get_env_var_or_bust("CONCOURSE_PASSWORD")
-CONCOURSE_TEAM = get_env_var_or_bust("CONCOURSE_TEAM")
-CONCOURSE_COMMANDS_PIPELINE = get_env_var_or_bust("CONCOURSE_COMMANDS_PIPELINE")
-CONCOURSE_COMMANDS_RESOURCE = get_env_var_or_bust("CONCOURSE_COMMANDS_RESOURCE")
+def require_env_vars(*var_names: str):
+    """
+    Raise if any of the given environment variables is not set.
+    """
+    missing = [name for name in var_names if os.getenv(name) is None]
+    if missing:
+        raise EnvironmentError(f"Environment variables not set: {', '.join(missing)}")
+
+# Required by the Concourse-backed resources. Missing values no longer fail the
+# import; the resources that need them report not ready instead.
+CONCOURSE_URL = os.getenv("CONCOURSE_URL")
+CONCOURSE_USER = os.getenv("CONCOURSE_USER")
+CONCOURSE_PASSWORD = os.getenv("CONCOURSE_PASSWORD")
+CONCOURSE_TEAM = os.getenv("CONCOURSE_TEAM")
+CONCOURSE_COMMANDS_PIPELINE = os.getenv("CONCOURSE_COMMANDS_PIPELINE")
+CONCOURSE_COMMANDS_RESOURCE = os.getenv("CONCOURSE_COMMANDS_RESOURCE")
+# Concourse API calls: per-call timeout (seconds), retries on connection and gateway errors,
+# and how many keep-alive connections the session holds on to.
+CONCOURSE_HTTP_TIMEOUT_S = float(os.getenv("CONCOURSE_HTTP_TIMEOUT_S", "10"))
+CONCOURSE_HTTP_RETRIES = int(os.getenv("CONCOURSE_HTTP_RETRIES", "3"))
+CONCOURSE_HTTP_POOL_SIZE = int(os.getenv("CONCOURSE_HTTP_POOL_SIZE", "10"))
+# How long (in seconds) to wait for a commands resource check before triggering the job anyway.
+CONCOURSE_CHECK_TIMEOUT_S = float(os.getenv("CONCOURSE_CHECK_TIMEOUT_S", "30"))
+
+# How stale (in milliseconds) remote refs may be before a read triggers a new fetch.
+# 0 fetches for every read (concurrent reads still share one fetch); raise it to opt in
+# to serving reads from recently fetched refs. Writes always fetch before committing.
+GIT_FETCH_MAX_STALENESS_MS = int(os.getenv("GIT_FETCH_MAX_STALENESS_MS", "0"))
+
+# How long (in seconds) a git command run by the async routes may take before it is killed.
+GIT_TIMEOUT_S = float(os.getenv("GIT_TIMEOUT_S", "60"))
+
+# Maximum number of per-branch worktrees kept around for concurrent hostvars writes.
+HOSTVARS_MAX_WORKTREES = int(os.getenv("HOSTVARS_MAX_WORKTREES", "8"))
+
+# Write-behind: when > 0, pushes are deferred for up to this many milliseconds so that
+# concurrent writes are squashed into one commit per branch and pushed together.
+GIT_WRITE_BEHIND_MS = int(os.getenv("GIT_WRITE_BEHIND_MS", "0"))
+# Flush a write-behind batch early once it holds this many changes.
+GIT_WRITE_BEHIND_MAX_BATCH = int(os.getenv("GIT_WRITE_BEHIND_MAX_BATCH", "50"))
+
+# Cold start, opt-in: partial clone filter for the git repos (e.g. "blob:none"). Unset for a full clone.
+GIT_CLONE_FILTER = os.getenv("GIT_CLONE_FILTER") or None
+# Cold start, opt-in: clone only main for the hostvars repo and fetch host branches on demand.
+GIT_CLONE_SINGLE_BRANCH = os.getenv("GIT_CLONE_SINGLE_BRANCH", "false").lower() in ("1", "true", "yes")
+# Optional directory of local mirrors (<dir>/<repo name>) to borrow objects from when cloning.
+GIT_CLONE_REFERENCE_DIR = os.getenv("GIT_CLONE_REFERENCE_DIR") or None
+
+# Reuse persistent multiplexed SSH connections (ControlMaster) for git fetches and pushes.
+GIT_SSH_MULTIPLEX = os.getenv("GIT_SSH_MULTIPLEX", "true").lower() in ("1", "true", "yes")
+# Where the SSH control sockets live, and the ssh command (e.g. with -i <key>) to multiplex.
+GIT_SSH_CONTROL_DIR = os.getenv("GIT_SSH_CONTROL_DIR", "/tmp/prov-ssh")
+GIT_SSH_BASE_COMMAND = os.getenv("GIT_SSH_BASE_COMMAND", "ssh")
+# How long an idle master connection stays up, and how often masters are health-checked.
+GIT_SSH_CONTROL_PERSIST_S = int(os.getenv("GIT_SSH_CONTROL_PERSIST_S", "600"))
+GIT_SSH_CHECK_INTERVAL_S = int(os.getenv("GIT_SSH_CHECK_INTERVAL_S", "30"))
+
+# Bounds for the cache of parsed hostvars (the byte limit is weighed by YAML size).
+HOSTVARS_CACHE_MAX_ENTRIES = int(os.getenv("HOSTVARS_CACHE_MAX_ENTRIES", "1024"))
+HOSTVARS_CACHE_MAX_BYTES = int(os.getenv("HOSTVARS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Inventory parser: "native" (default) or "ansible" to parse inventory.yml with Ansible itself.
+INVENTORY_PARSER = os.getenv("INVENTORY_PARSER", "native")
+
+# How often (in seconds) the in-memory MAC -> OS table behind the iPXE route is rebuilt.
+BOOT_TABLE_REFRESH_S = float(os.getenv("BOOT_TABLE_REFRESH_S", "30"))
+
+# Bulkheads: per-subsystem request pools as (max concurrent requests, max queued requests).
+# Requests beyond both are shed with a 503 instead of waiting.
+BULKHEAD_LIMITS = {
+    "boot": (int(os.getenv("BULKHEAD_BOOT_CONCURRENCY", "64")), int(os.getenv("BULKHEAD_BOOT_QUEUE", "512"))),
+    "git-read": (int(os.getenv("BULKHEAD_GIT_READ_CONCURRENCY", "64")), int(os.getenv("BULKHEAD_GIT_READ_QUEUE", "256"))),
+    "git-write": (int(os.getenv("BULKHEAD_GIT_WRITE_CONCURRENCY", "8")), int(os.getenv("BULKHEAD_GIT_WRITE_QUEUE", "32"))),
+    "concourse": (int(os.getenv("BULKHEAD_CONCOURSE_CONCURRENCY", "4")), int(os.getenv("BULKHEAD_CONCOURSE_QUEUE", "16"))),
+    "power": (int(os.getenv("BULKHEAD_POWER_CONCURRENCY", "8")), int(os.getenv("BULKHEAD_POWER_QUEUE", "16"))),
+}
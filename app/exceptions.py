@@ -23,6 +23,10 @@ class HostAlreadyExistsException(InventoryException):
     """Raised when trying to add a host that already exists in inventory"""
     status_code = 409
 
+class InventoryParseException(InventoryException):
+    """Raised when the inventory file cannot be parsed"""
+    status_code = 500
+
 class HostvarsException(Exception):
     """Base exception for all hostvars operations"""
 
@@ -52,4 +56,24 @@ class GitCommitException(GitException):
 
 class GitPushException(GitException):
     """Raised when there is an error pushing changes to a Git repository"""
-    status_code = 500
\ No newline at end of file
+    status_code = 500
+
+class GitTimeoutException(GitException):
+    """Raised when a git command does not finish within its timeout"""
+    status_code = 504
+
+class ConcourseException(Exception):
+    """Base exception for Concourse operations"""
+    status_code = 502
+
+class ConcourseCheckException(ConcourseException):
+    """Raised when a resource check does not succeed, so the job would run on stale input"""
+    status_code = 502
+
+class ServiceNotReadyException(Exception):
+    """Raised when a resource a request depends on has not finished initializing"""
+    status_code = 503
+
+class BulkheadFullException(Exception):
+    """Raised when a subsystem's request pool is saturated and the request is shed"""
+    status_code = 503
@@ -1,14 +1,27 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.api.main import api_router
-from app.exceptions import GitException, InventoryException
+from app.exceptions import BulkheadFullException, ConcourseException, GitException, InventoryException, ServiceNotReadyException
+from app.resources import start_resources, stop_resources
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clone the repos in the background so the server starts accepting requests right away
+    start_resources()
+    yield
+    # Blocks while the last write-behind batch is pushed
+    await asyncio.to_thread(stop_resources)
 
 app = FastAPI(
     title="Infrastructure Management API",
     description="API for managing infrastructure resources",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -36,6 +49,29 @@ async def git_exception_handler(request, exc: GitException):
         content={"error": str(exc)}
     )
 
+@app.exception_handler(ConcourseException)
+async def concourse_exception_handler(request, exc: ConcourseException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)}
+    )
+
+@app.exception_handler(ServiceNotReadyException)
+async def service_not_ready_exception_handler(request, exc: ServiceNotReadyException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)},
+        headers={"Retry-After": "5"},
+    )
+
+@app.exception_handler(BulkheadFullException)
+async def bulkhead_full_exception_handler(request, exc: BulkheadFullException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc: Exception):
     logging.error(f"Unhandled exception: {exc}")
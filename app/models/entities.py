@@ -1,9 +1,31 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from ipaddress import ip_address
 from typing import Type
 from app.models.hostvars import DropletHostvarsModel, HostvarsModel, ServerHostvarsModel
 from app.models.inventory import DropletInventoryEntry, InventoryEntry, ServerInventoryEntry
+from app.models.validation import construct_trusted
 from app.utils.sanitize import sanitize_data
-from ansible.inventory.host import Host
+from app.utils.inventory_snapshot import HostRecord
+
+# Addresses are immutable, and the same hosts are rebuilt for every new commit
+_parse_ip = lru_cache(maxsize=65536)(ip_address)
+
+def _has_field_types(fields: dict) -> bool:
+    """
+    Check the scalar fields construct_trusted() would take as they are. If any
+    is off, the entry is validated the normal way, which coerces or rejects it.
+    """
+    port = fields.get("ansible_port")
+    user = fields.get("ansible_user")
+    return (
+        type(fields.get("name")) is str
+        and ("mac" not in fields or type(fields["mac"]) is str)
+        and (user is None or type(user) is str)
+        and (port is None or (type(port) is int and 1 <= port <= 65535))
+        and type(fields.get("hostvars")) is dict
+        and all(type(group) is str for group in fields.get("groups", ()))
+    )
 
 class HostTypeRegistryEntry(ABC):
     def __init__(self, inventory_model: Type[InventoryEntry], hostvars_model: Type[HostvarsModel]):
@@ -11,9 +33,27 @@ class HostTypeRegistryEntry(ABC):
         self.hostvars_model = hostvars_model
 
     @abstractmethod
-    def get_inventory_entry(self, host: Host) -> InventoryEntry:
+    def get_inventory_entry(self, host: HostRecord, vars: dict | None = None, trusted: bool = False) -> InventoryEntry:
+        """
+        Build the entry for a host. Pass vars if the host vars are already sanitized,
+        and trusted if the host comes from a commit, to skip full validation of
+        entries whose scalar fields check out.
+        """
         ...
 
+    def build_entry(self, fields: dict, trusted: bool) -> InventoryEntry:
+        # The repo also takes hand edits and external pushes, so even trusted
+        # fields are only constructed directly if their cheap checks pass
+        if trusted and _has_field_types(fields):
+            try:
+                ip = fields["ip"]
+                fields = dict(fields, ip=_parse_ip(ip) if ip is not None else None)
+            except (TypeError, ValueError):
+                # Not an address after all; let validation report it
+                return self.inventory_model(**fields)
+            return construct_trusted(self.inventory_model, fields)
+        return self.inventory_model(**fields)
+
     @abstractmethod
     def get_hostvars_entry(self, data: dict) -> HostvarsModel:
         ...
@@ -25,18 +65,19 @@ class ServerRegistryEntry(HostTypeRegistryEntry):
     def __init__(self, inventory_model: Type[InventoryEntry], hostvars_model: Type[HostvarsModel]):
         super().__init__(inventory_model, hostvars_model)
 
-    def get_inventory_entry(self, host: Host) -> InventoryEntry:
-        vars = sanitize_data(host.vars)
-        return self.inventory_model(
+    def get_inventory_entry(self, host: HostRecord, vars: dict | None = None, trusted: bool = False) -> InventoryEntry:
+        if vars is None:
+            vars = sanitize_data(host.vars)
+        return self.build_entry(dict(
             type="server",
             name=host.name,
             mac=vars.get("mac"),
             ip=vars.get("ansible_host"),
             ansible_user=vars.get("ansible_user", "root"),
             ansible_port=vars.get("ansible_port", 22),
-            groups=[g.name for g in host.groups],
+            groups=list(host.groups),
             hostvars=vars
-        )
+        ), trusted)
 
     def get_hostvars_entry(self, data: dict) -> HostvarsModel:
         return self.hostvars_model.model_validate(data)
@@ -50,17 +91,18 @@ class DropletRegistryEntry(HostTypeRegistryEntry):
         super().__init__(inventory_model, hostvars_model)
 
 
-    def get_inventory_entry(self, host: Host) -> InventoryEntry:
-        vars = sanitize_data(host.vars)
-        return self.inventory_model(
+    def get_inventory_entry(self, host: HostRecord, vars: dict | None = None, trusted: bool = False) -> InventoryEntry:
+        if vars is None:
+            vars = sanitize_data(host.vars)
+        return self.build_entry(dict(
             type="droplet",
             name=host.name,
             ip=vars.get("ansible_host"),
             ansible_user=vars.get("ansible_user", "root"),
             ansible_port=vars.get("ansible_port", 22),
-            groups=[g.name for g in host.groups],
+            groups=list(host.groups),
             hostvars=vars
-        )
+        ), trusted)
 
     def get_hostvars_entry(self, data: dict) -> HostvarsModel:
         return self.hostvars_model.model_validate(data)
@@ -0,0 +1,86 @@
+from functools import lru_cache
+from typing import Any, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+M = TypeVar("M", bound=BaseModel)
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """
+    A TypeAdapter for tp, built once. Building one compiles a validator, which
+    costs far more than using it.
+    """
+    return TypeAdapter(tp)
+
+def validate_as(tp: Any, value: Any) -> Any:
+    """
+    Validate value as tp.
+
+    A value that already is exactly a tp model was validated when it was built
+    and is returned as it is; a model of another type is validated from its dump.
+    """
+    if type(value) is tp:
+        return value
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    return type_adapter(tp).validate_python(value)
+
+class _Shape:
+    """
+    What construct_trusted() needs to know about a model class.
+    """
+    def __init__(self, model_cls: Type[BaseModel]):
+        self.fields = tuple(model_cls.model_fields)
+        self.field_set = frozenset(self.fields)
+        self.required = tuple(name for name, field in model_cls.model_fields.items() if field.is_required())
+        # Models with private attributes or a post-init hook need model_construct()
+        self.plain = not (model_cls.__pydantic_post_init__ or model_cls.__private_attributes__)
+
+_shapes: dict[type, _Shape] = {}
+
+def construct_trusted(model_cls: Type[M], data: dict) -> M:
+    """
+    Build a model from data that was validated before it was stored, e.g. read
+    back from a commit this service wrote, without validating it again.
+
+    Values must already have their field types (no coercion happens). Data that
+    is missing a required field is validated the normal way instead, so it
+    fails the way it always did.
+    """
+    shape = _shapes.get(model_cls)
+    if shape is None:
+        shape = _shapes[model_cls] = _Shape(model_cls)
+
+    for name in shape.required:
+        if data.get(name) is None:
+            return model_cls.model_validate(data)
+
+    if shape.plain and data.keys() == shape.field_set:
+        # Every field is given, so this is all model_construct() would do,
+        # without its per-field default handling
+        model = model_cls.__new__(model_cls)
+        object.__setattr__(model, "__dict__", {name: data[name] for name in shape.fields})
+        object.__setattr__(model, "__pydantic_fields_set__", set(shape.fields))
+        object.__setattr__(model, "__pydantic_extra__", None)
+        object.__setattr__(model, "__pydantic_private__", None)
+        return model
+    return model_cls.model_construct(**data)
+
+# Leaf types dump_models() returns as they are, checked before the
+# comparatively slow isinstance() against BaseModel's ABC metaclass
+_PLAIN = frozenset((str, int, float, bool, type(None)))
+
+def dump_models(value: Any) -> Any:
+    """
+    Replace the models nested anywhere in dicts and lists with their dumps.
+    """
+    if isinstance(value, dict):
+        return {k: v if type(v) in _PLAIN else dump_models(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [v if type(v) in _PLAIN else dump_models(v) for v in value]
+    if type(value) in _PLAIN:
+        return value
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return value
@@ -1,7 +1,5 @@
-from app.utils.inventory_manager import InventoryManager
-from app.utils.hostvars_manager import HostvarsManager
-from app.utils.concourse_manager import ConcourseManager
-from app.utils.commands_manager import CommandsManager
+import logging
+from typing import TYPE_CHECKING
 from app.config import (
     CONCOURSE_URL,
     CONCOURSE_USER,
@@ -9,50 +7,235 @@ from app.config import (
     CONCOURSE_TEAM,
     CONCOURSE_COMMANDS_PIPELINE,
     CONCOURSE_COMMANDS_RESOURCE,
+    CONCOURSE_HTTP_TIMEOUT_S,
+    CONCOURSE_HTTP_RETRIES,
+    CONCOURSE_HTTP_POOL_SIZE,
+    CONCOURSE_CHECK_TIMEOUT_S,
+    GIT_FETCH_MAX_STALENESS_MS,
+    GIT_TIMEOUT_S,
+    HOSTVARS_MAX_WORKTREES,
+    GIT_WRITE_BEHIND_MS,
+    GIT_WRITE_BEHIND_MAX_BATCH,
+    GIT_CLONE_FILTER,
+    GIT_CLONE_SINGLE_BRANCH,
+    GIT_CLONE_REFERENCE_DIR,
+    GIT_SSH_MULTIPLEX,
+    GIT_SSH_CONTROL_DIR,
+    GIT_SSH_BASE_COMMAND,
+    GIT_SSH_CONTROL_PERSIST_S,
+    GIT_SSH_CHECK_INTERVAL_S,
+    HOSTVARS_CACHE_MAX_ENTRIES,
+    HOSTVARS_CACHE_MAX_BYTES,
+    INVENTORY_PARSER,
+    BOOT_TABLE_REFRESH_S,
+    BULKHEAD_LIMITS,
+    require_env_vars,
 )
-from app.utils.kauf_manager import KaufManager
+from app.utils.bulkhead import Bulkhead
+from app.utils.lazy_resource import LazyResource
 
-inventory_manager = InventoryManager("git@github.com:asdf57/inventory.git", "/app/inventory")
-def get_inventory_manager() -> InventoryManager:
+# The managers pull in GitPython, requests and the inventory and YAML stack, so
+# they are imported by the factories below (on the background init threads)
+# rather than when the app is imported
+if TYPE_CHECKING:
+    from app.utils.boot_table import BootTable
+    from app.utils.commands_manager import CommandsManager
+    from app.utils.concourse_manager import ConcourseManager
+    from app.utils.hostvars_manager import HostvarsManager
+    from app.utils.inventory_manager import InventoryManager
+    from app.utils.kauf_manager import KaufManager
+    from app.utils.ssh_mux import SSHMultiplexer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Separate request pools per subsystem, so e.g. slow power cycles or pushes
+# cannot starve nodes that are trying to boot
+bulkheads = {name: Bulkhead(name, concurrency, queue) for name, (concurrency, queue) in BULKHEAD_LIMITS.items()}
+
+def _build_ssh_multiplexer() -> "SSHMultiplexer":
+    from app.utils.ssh_mux import SSHMultiplexer
+
+    multiplexer = SSHMultiplexer(
+        GIT_SSH_CONTROL_DIR,
+        ssh_command=GIT_SSH_BASE_COMMAND,
+        persist_s=GIT_SSH_CONTROL_PERSIST_S,
+        check_interval_s=GIT_SSH_CHECK_INTERVAL_S,
+    )
+    multiplexer.start()
+    return multiplexer
+
+def _ssh_mux() -> "SSHMultiplexer | None":
+    # The repos are configured with it when they are cloned, so wait for it
+    return ssh_multiplexer.wait() if ssh_multiplexer is not None else None
+
+def _build_inventory_manager() -> "InventoryManager":
+    from app.utils.inventory_manager import InventoryManager
+
+    return InventoryManager(
+        "git@github.com:asdf57/inventory.git",
+        "/app/inventory",
+        max_staleness_ms=GIT_FETCH_MAX_STALENESS_MS,
+        write_behind_ms=GIT_WRITE_BEHIND_MS,
+        write_behind_max_batch=GIT_WRITE_BEHIND_MAX_BATCH,
+        clone_filter=GIT_CLONE_FILTER,
+        reference_dir=GIT_CLONE_REFERENCE_DIR,
+        ssh_mux=_ssh_mux(),
+        parser=INVENTORY_PARSER,
+        git_timeout_s=GIT_TIMEOUT_S,
+    )
+
+def _build_hostvars_manager() -> "HostvarsManager":
+    from app.utils.hostvars_manager import HostvarsManager
+
+    return HostvarsManager(
+        "git@github.com:asdf57/hostvars.git",
+        "/app/hostvars",
+        max_staleness_ms=GIT_FETCH_MAX_STALENESS_MS,
+        max_worktrees=HOSTVARS_MAX_WORKTREES,
+        write_behind_ms=GIT_WRITE_BEHIND_MS,
+        write_behind_max_batch=GIT_WRITE_BEHIND_MAX_BATCH,
+        clone_filter=GIT_CLONE_FILTER,
+        single_branch=GIT_CLONE_SINGLE_BRANCH,
+        reference_dir=GIT_CLONE_REFERENCE_DIR,
+        ssh_mux=_ssh_mux(),
+        cache_max_entries=HOSTVARS_CACHE_MAX_ENTRIES,
+        cache_max_bytes=HOSTVARS_CACHE_MAX_BYTES,
+        git_timeout_s=GIT_TIMEOUT_S,
+    )
+
+def _build_concourse_manager() -> "ConcourseManager":
+    from app.utils.concourse_manager import ConcourseManager
+
+    require_env_vars("CONCOURSE_URL", "CONCOURSE_USER", "CONCOURSE_PASSWORD")
+    return ConcourseManager(
+        CONCOURSE_URL,
+        CONCOURSE_USER,
+        CONCOURSE_PASSWORD,
+        timeout_s=CONCOURSE_HTTP_TIMEOUT_S,
+        retries=CONCOURSE_HTTP_RETRIES,
+        pool_size=CONCOURSE_HTTP_POOL_SIZE,
+    )
+
+def _build_commands_manager() -> "CommandsManager":
+    from app.utils.commands_manager import CommandsManager
+
+    require_env_vars("CONCOURSE_TEAM", "CONCOURSE_COMMANDS_PIPELINE", "CONCOURSE_COMMANDS_RESOURCE")
+    # Built on top of the Concourse client, which starts concurrently; wait for it
+    return CommandsManager(
+        CONCOURSE_TEAM,
+        CONCOURSE_COMMANDS_PIPELINE,
+        CONCOURSE_COMMANDS_RESOURCE,
+        "git@github.com:asdf57/commands_data.git",
+        "/app/commands_data",
+        concourse_manager.wait(),
+        clone_filter=GIT_CLONE_FILTER,
+        reference_dir=GIT_CLONE_REFERENCE_DIR,
+        ssh_mux=_ssh_mux(),
+        check_timeout_s=CONCOURSE_CHECK_TIMEOUT_S,
+    )
+
+def _build_boot_table() -> "BootTable":
+    from app.utils.boot_table import BootTable
+
+    # Built on top of the repos, so wait for them rather than failing and backing off
+    inventory, hostvars = inventory_manager.wait(), hostvars_manager.wait()
+    table = BootTable(inventory, hostvars, refresh_interval_s=BOOT_TABLE_REFRESH_S)
+    # Writes made through this process show up at once, not on the next refresh
+    inventory.add_listener(table.inventory_changed)
+    hostvars.add_listener(table.hostvars_changed)
+    table.start()
+    return table
+
+# Built in the background once the app starts (see start_resources), so that
+# startup is not blocked on cloning the repos one after another
+# One set of persistent SSH connections shared by every repo
+ssh_multiplexer = LazyResource("ssh", _build_ssh_multiplexer) if GIT_SSH_MULTIPLEX else None
+inventory_manager = LazyResource("inventory", _build_inventory_manager)
+hostvars_manager = LazyResource("hostvars", _build_hostvars_manager)
+concourse_manager = LazyResource("concourse", _build_concourse_manager)
+commands_manager = LazyResource("commands", _build_commands_manager)
+boot_table = LazyResource("boot", _build_boot_table)
+
+RESOURCES = [inventory_manager, hostvars_manager, concourse_manager, commands_manager, boot_table]
+if ssh_multiplexer is not None:
+    RESOURCES.insert(0, ssh_multiplexer)
+
+def start_resources():
+    """
+    Start initializing every resource concurrently in the background.
+    """
+    for resource in RESOURCES:
+        resource.start()
+
+def stop_resources():
+    """
+    Flush the git repos on shutdown, so no write-behind change is lost.
+    """
+    for resource in (inventory_manager, hostvars_manager):
+        if resource.ready:
+            try:
+                resource.get().close()
+            except Exception as e:
+                logger.error(f"Failed to close {resource.name}: {e}")
+
+def get_readiness() -> dict:
+    """
+    Readiness of every resource, keyed by name.
+    """
+    return {resource.name: resource.status() for resource in RESOURCES}
+
+def get_metrics() -> dict:
+    """
+    Runtime metrics for the shared infrastructure.
+    """
+    return {
+        "ssh": ssh_multiplexer.get().stats() if ssh_multiplexer is not None and ssh_multiplexer.ready else {},
+        "hostvars_cache": hostvars_manager.get().cache.stats() if hostvars_manager.ready else None,
+        "boot_table": boot_table.get().stats() if boot_table.ready else None,
+        "bulkheads": {name: bulkhead.stats() for name, bulkhead in bulkheads.items()},
+        "concourse": concourse_manager.get().stats() if concourse_manager.ready else None,
+    }
+
+def get_inventory_manager() -> "InventoryManager":
     """
     Dependency to get the inventory manager.
     """
-    return inventory_manager
+    return inventory_manager.get()
 
-hostvars_manager = HostvarsManager("git@github.com:asdf57/hostvars.git", "/app/hostvars")
-def get_hostvars_manager() -> HostvarsManager:
+def get_hostvars_manager() -> "HostvarsManager":
     """
     Dependency to get the hostvars manager.
     """
-    return hostvars_manager
+    return hostvars_manager.get()
 
-concourse_manager = ConcourseManager(CONCOURSE_URL, CONCOURSE_USER, CONCOURSE_PASSWORD)
-def get_concourse_manager() -> ConcourseManager:
+def get_concourse_manager() -> "ConcourseManager":
     """
     Dependency to get the concourse manager.
     """
-    return concourse_manager
+    return concourse_manager.get()
 
-commands_manager = CommandsManager(
-    CONCOURSE_TEAM,
-    CONCOURSE_COMMANDS_PIPELINE,
-    CONCOURSE_COMMANDS_RESOURCE,
-    "git@github.com:asdf57/commands_data.git",
-    "/app/commands_data",
-    concourse_manager
-)
-def get_commands_manager() -> CommandsManager:
+def get_commands_manager() -> "CommandsManager":
     """
     Dependency to get the commands manager.
     """
-    return commands_manager
+    return commands_manager.get()
+
+async def get_boot_table() -> "BootTable":
+    """
+    Dependency to get the boot table. Async so the iPXE route never waits for
+    a threadpool slot behind blocking git work.
+    """
+    return boot_table.get()
 
 def get_kauf_manager_factory():
     """
     Dependency to get the kauf manager factory.
     """
 
-    def create_kauf_manager(node_name: str) -> KaufManager:
+    def create_kauf_manager(node_name: str) -> "KaufManager":
+        from app.utils.kauf_manager import KaufManager
+
         return KaufManager(node_name)
 
     return create_kauf_manager
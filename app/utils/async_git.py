@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import logging
+import os
+import signal
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from git import GitCommandError
+
+from app.exceptions import GitCommitException, GitPullException, GitTimeoutException
+from app.utils.git import ALL_BRANCHES, RepoHandler, completed
+from app.utils.rwlock import locked
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncRepoHandler:
+    """
+    asyncio front end for a RepoHandler.
+
+    It works on the same clone and shares the handler's locks, fetch
+    bookkeeping and cat-file reader, so sync and async callers can be mixed
+    freely. git runs in asyncio subprocesses: waiting on the network holds no
+    thread, every command has a timeout, and a cancelled request kills its
+    git process. Concurrent async fetches of the same refs share one process.
+    """
+    def __init__(self, handler: RepoHandler, timeout_s: float = 60, max_threads: int = 4):
+        self.handler = handler
+        self.timeout_s = timeout_s
+        self._inflight: dict[str | None, asyncio.Task] = {}
+        # Blocking work for callers that may hold the repo's locks. Kept apart
+        # from the default executor, so it can never queue behind threads that
+        # are themselves waiting for those locks
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix=f"async-git-{handler.repo_path.name}")
+
+    async def run(self, func, *args):
+        """
+        Run a blocking call on the handler's own threads.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def branch_exists(self, branch: str, remote: bool = False) -> bool:
+        """
+        Same as RepoHandler.branch_exists, off the event loop.
+        """
+        return await self.run(self.handler.branch_exists, branch, remote)
+
+    async def _git(self, *args: str, timeout_s: float | None = None) -> str:
+        """
+        Run git in the repo and return its stdout. Raises GitCommandError on a
+        non-zero exit and GitTimeoutException if it takes too long.
+        """
+        timeout_s = timeout_s or self.timeout_s
+        process = await asyncio.create_subprocess_exec(
+            "git", *args,
+            cwd=self.handler.repo_path,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # Its own process group, so ssh and remote helpers can be killed with it
+            start_new_session=True,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            # Reap it even if we are being cancelled
+            await asyncio.shield(process.wait())
+            if isinstance(e, asyncio.TimeoutError):
+                raise GitTimeoutException(f"git {args[0]} timed out after {timeout_s}s") from e
+            raise
+
+        if process.returncode != 0:
+            raise GitCommandError(["git", *args], process.returncode, stderr.decode(errors="replace"), stdout.decode(errors="replace"))
+        return stdout.decode()
+
+    @asynccontextmanager
+    async def _remote(self):
+        """
+        Wrap a git operation that talks to the remote.
+        """
+        ssh_mux = self.handler.ssh_mux
+        if ssh_mux is None:
+            yield
+            return
+        # Only blocks when a master connection has to be (re)established
+        reused = await self.run(ssh_mux.ensure, self.handler.repo_url)
+        yield
+        ssh_mux.record(self.handler.repo_url, reused)
+
+    async def fetch(self, force: bool = False, branch: str | None = None):
+        """
+        Same as RepoHandler.fetch.
+        """
+        key = branch if self.handler.single_branch and branch not in (None, "main") else None
+        await self._fetch_coalesced(key, force)
+
+    async def fetch_all(self, force: bool = False):
+        """
+        Same as RepoHandler.fetch_all.
+        """
+        await self._fetch_coalesced(ALL_BRANCHES if self.handler.single_branch else None, force)
+
+    async def _fetch_coalesced(self, key: str | None, force: bool):
+        requested_at = time.monotonic()
+        while True:
+            last = self.handler._last_fetch_started.get(key)
+            if last is not None and last >= requested_at:
+                return
+            if not force and last is not None and requested_at - last < self.handler.max_staleness:
+                return
+
+            task = self._inflight.get(key)
+            # A finished task may still be here until its done callback runs;
+            # awaiting it again would not yield, and the loop would spin
+            if task is None or task.done():
+                task = asyncio.ensure_future(self._fetch(key))
+                self._inflight[key] = task
+                task.add_done_callback(functools.partial(self._forget, key))
+            # Shielded so one cancelled caller does not cancel the fetch for the others.
+            # If the fetch started before we asked and we need a fresh one, go again
+            await asyncio.shield(task)
+
+    def _forget(self, key: str | None, task: asyncio.Task):
+        # Only if a newer fetch has not replaced it already
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _fetch(self, key: str | None, attempts: int = 3):
+        handler = self.handler
+        try:
+            async with locked(handler._fetch_lock):
+                started_at = time.monotonic()
+                for attempt in range(1, attempts + 1):
+                    try:
+                        async with locked(handler.admin_lock), self._remote():
+                            if key is None:
+                                await self._git("fetch", "--prune", "origin")
+                            elif key == ALL_BRANCHES:
+                                await self._git("fetch", "--prune", "origin", "+refs/heads/*:refs/remotes/origin/*")
+                            else:
+                                await self._fetch_branch(key)
+                        break
+                    except GitCommandError as e:
+                        # A concurrent push may be updating the same remote-tracking ref
+                        if "cannot lock ref" not in str(e) or attempt == attempts:
+                            raise
+                        logger.warning(f"Remote-tracking ref was locked during fetch, retrying ({attempt}/{attempts})")
+                handler._last_fetch_started[key] = started_at
+            logger.info("Fetched latest changes from remote repository.")
+        except GitTimeoutException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to fetch changes: {e}")
+            raise GitPullException("Failed to fetch changes from the remote repository.") from e
+
+    async def _fetch_branch(self, branch: str):
+        try:
+            await self._git("fetch", "origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}")
+        except GitCommandError as e:
+            if "couldn't find remote ref" not in str(e):
+                raise
+            if await self.branch_exists(branch, remote=True):
+                await self._git("update-ref", "-d", f"refs/remotes/origin/{branch}")
+
+    async def checkout_and_pull(self, branch: str = "main", create_if_missing: bool = False, force_fetch: bool = False):
+        """
+        Same as RepoHandler.checkout_and_pull. Callers must hold the write lock.
+        """
+        try:
+            await self.fetch(force=force_fetch, branch=branch)
+
+            local_branch_exists = await self.branch_exists(branch)
+            remote_branch_exists = await self.branch_exists(branch, remote=True)
+
+            if not local_branch_exists and create_if_missing:
+                if remote_branch_exists:
+                    logger.info(f"Branch {branch} exists remotely. Creating local tracking branch.")
+                    await self._git("checkout", "-b", branch, f"origin/{branch}")
+                else:
+                    logger.info(f"Branch {branch} does not exist locally or remotely, creating new branch.")
+                    await self._git("checkout", "-b", branch)
+                    async with self._remote():
+                        await self._git("push", "--set-upstream", "origin", branch)
+            else:
+                logger.info(f"Checking out branch {branch}.")
+                await self._git("checkout", branch)
+                if remote_branch_exists:
+                    await self._git("merge", f"origin/{branch}")
+                else:
+                    logger.info(f"No remote branch '{branch}' exists, skipping pull.")
+
+            logger.info(f"Checked out and pulled branch {branch}.")
+        except GitTimeoutException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to checkout and pull branch {branch}: {e}")
+            raise GitPullException(f"Failed to checkout and pull branch {branch}.") from e
+
+    @asynccontextmanager
+    async def snapshot(self, branch: str = "main"):
+        """
+        Same as RepoHandler.snapshot.
+        """
+        await self.fetch(branch=branch)
+        if not await self.run(self.handler._is_synced, branch):
+            async with self.handler.lock.write_async():
+                await self.checkout_and_pull(branch=branch)
+
+        async with self.handler.lock.read_async():
+            yield
+
+    async def commit_and_push(self, commit_msg: str, branch: str = "main", wait: bool = True) -> Future:
+        """
+        Same as RepoHandler.commit_and_push, for the main working tree.
+
+        With write-behind enabled the commit is queued like RepoHandler does
+        it, and wait awaits the batched push.
+        """
+        handler = self.handler
+        if handler.batcher is not None:
+            # A local commit only; the push happens in the background batch
+            future = await self.run(handler.commit_and_push, commit_msg, branch, None, False)
+            if wait:
+                await asyncio.wrap_future(future)
+            return future
+
+        try:
+            await self._git("add", "-A")
+            # --allow-empty like GitPython's index.commit, which RepoHandler uses
+            await self._git("commit", "--allow-empty", "-q", "-m", commit_msg)
+            sha = (await self._git("rev-parse", "HEAD")).strip()
+            async with self._remote():
+                await self._git("push", "origin", branch)
+        except GitTimeoutException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to commit changes: {e}")
+            raise GitCommitException("Failed to commit changes to the repository.") from e
+
+        await self._track_pushed(branch, sha)
+        logger.info(f"Committed and pushed changes to branch {branch} with message: {commit_msg}")
+        return completed(sha)
+
+    async def _track_pushed(self, branch: str, sha: str | None):
+        """
+        Same as RepoHandler._track_pushed.
+        """
+        try:
+            async with locked(self.handler.admin_lock):
+                if sha is None:
+                    if await self.branch_exists(branch, remote=True):
+                        await self._git("update-ref", "-d", f"refs/remotes/origin/{branch}")
+                else:
+                    await self._git("update-ref", f"refs/remotes/origin/{branch}", sha)
+        except GitCommandError as e:
+            logger.warning(f"Failed to update remote-tracking ref for {branch}: {e}")
+
+    async def get_remote_branches(self, excluded_branches: list = []) -> list[str]:
+        if self.handler.single_branch:
+            async with self._remote():
+                heads = (await self._git("ls-remote", "--heads", "origin")).splitlines()
+            branches = [line.split("\t", 1)[1].removeprefix("refs/heads/") for line in heads]
+        else:
+            refs = (await self._git("for-each-ref", "--format=%(refname)", "refs/remotes/origin")).splitlines()
+            branches = [ref.removeprefix("refs/remotes/origin/") for ref in refs]
+        return [branch for branch in branches if branch not in excluded_branches]
+
+    async def delete_branch_entirely(self, branch: str = "main", purge_files: list[str] = None):
+        """
+        Same as RepoHandler.delete_branch_entirely. Callers must hold the write lock.
+        """
+        if purge_files is None:
+            purge_files = []
+
+        await self.fetch(force=True, branch=branch)
+
+        if await self.branch_exists(branch):
+            await self.checkout_and_pull(branch=branch, force_fetch=True)
+            for file in purge_files:
+                os.remove(self.handler.repo_path / file)
+            await self.commit_and_push("Deleted files", branch=branch)
+
+        await self.checkout_and_pull(branch="main")
+
+        if await self.branch_exists(branch):
+            logger.info(f"Deleting local branch {branch}")
+            await self._git("branch", "-D", branch)
+
+        if await self.branch_exists(branch, remote=True):
+            logger.info(f"Deleting remote branch {branch}")
+            async with self._remote():
+                await self._git("push", "origin", "--delete", branch)
+            await self._track_pushed(branch, None)
@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+
+from app.exceptions import InvalidTypeException
+from app.models.inventory import InventoryEntry
+from app.utils.hostvars_manager import HostvarsManager
+from app.utils.inventory_manager import InventoryManager
+from app.utils.inventory_snapshot import InventorySnapshot, normalize_mac
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class BootEntry:
+    """
+    What the iPXE route needs to know about one host. host_type is None if the
+    host's groups do not name a type, os is None if its hostvars have none.
+    """
+    __slots__ = ("name", "host_type", "has_hostvars", "os")
+
+    def __init__(self, name: str, host_type: str | None, has_hostvars: bool, os: str | None):
+        self.name = name
+        self.host_type = host_type
+        self.has_hostvars = has_hostvars
+        self.os = os
+
+
+class BootTable:
+    """
+    Normalized MAC -> BootEntry for every host in the inventory, so boot
+    requests are answered from memory without touching git.
+
+    The table is rebuilt in the background from the inventory snapshot and the
+    hostvars of every host (fetched in one round trip), and swapped in whole.
+    Changes pushed by this process are applied as soon as they are pushed
+    (see inventory_changed and hostvars_changed); the refresh picks up
+    everything else. A lookup that misses (or finds a host without hostvars)
+    wakes the refresher early, since it is most likely a host that was just
+    added elsewhere.
+    """
+    def __init__(
+        self,
+        inventory_manager: InventoryManager,
+        hostvars_manager: HostvarsManager,
+        refresh_interval_s: float = 30,
+        min_refresh_gap_s: float = 2,
+    ):
+        self.inventory_manager = inventory_manager
+        self.hostvars_manager = hostvars_manager
+        self.refresh_interval_s = refresh_interval_s
+        self.min_refresh_gap_s = min_refresh_gap_s
+
+        self._entries: dict[str, BootEntry] = {}
+        # What the entries are built from: the inventory snapshot and, by host
+        # name, whether it has hostvars and which OS they name
+        self._lock = threading.Lock()
+        self._snapshot: InventorySnapshot | None = None
+        self._boot_info: dict[str, tuple[bool, str | None]] = {}
+        # Changes applied since the running refresh started reading; they are
+        # at least as new as what it reads, so they are applied on top of it
+        self._changed_snapshot: InventorySnapshot | None = None
+        self._changed_boot_info: dict[str, tuple[bool, str | None]] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._refreshed_at: float | None = None
+        self._last_refresh_s: float | None = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.lookups = 0
+        self.misses = 0
+
+    def start(self):
+        """
+        Build the table once, then keep refreshing it in a background thread.
+        """
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="boot-table", daemon=True)
+        self._thread.start()
+
+    def lookup(self, mac: str) -> BootEntry | None:
+        self.lookups += 1
+        entry = self._entries.get(normalize_mac(mac))
+        if entry is None or not entry.has_hostvars:
+            self.misses += 1
+            self._wake.set()
+        return entry
+
+    def inventory_changed(self, snapshot: InventorySnapshot):
+        """
+        Apply an inventory change pushed by this process.
+        """
+        with self._lock:
+            self._snapshot = self._changed_snapshot = snapshot
+            self._rebuild()
+
+    def hostvars_changed(self, host_name: str, hostvars: dict | None):
+        """
+        Apply a hostvars change pushed by this process; None if they were deleted.
+        """
+        info = _boot_info(hostvars)
+        with self._lock:
+            self._boot_info[host_name] = self._changed_boot_info[host_name] = info
+            self._rebuild()
+
+    def refresh(self):
+        started = time.monotonic()
+        with self._lock:
+            self._changed_snapshot = None
+            self._changed_boot_info = {}
+
+        snapshot = self.inventory_manager.get_snapshot()
+        all_hostvars = self.hostvars_manager.get_many(list(snapshot.hosts))
+        boot_info = {name: _boot_info(hostvars) for name, hostvars in all_hostvars.items()}
+
+        with self._lock:
+            self._snapshot = self._changed_snapshot or snapshot
+            self._boot_info = boot_info | self._changed_boot_info
+            self._rebuild()
+
+        self._refreshed_at = time.monotonic()
+        self._last_refresh_s = self._refreshed_at - started
+        self.refreshes += 1
+        logger.info(f"Boot table refreshed with {len(self._entries)} host(s) in {self._last_refresh_s:.2f}s")
+
+    def _rebuild(self):
+        # Callers must hold self._lock
+        if self._snapshot is None:
+            return
+
+        entries = {}
+        for mac, record in self._snapshot.by_mac.items():
+            try:
+                host_type = InventoryEntry.get_type_from_group(record.groups)
+            except InvalidTypeException:
+                host_type = None
+
+            has_hostvars, os = self._boot_info.get(record.name, (False, None))
+            entries[mac] = BootEntry(record.name, host_type, has_hostvars, os)
+
+        # Swapped in whole, so lookups never see a half-built table
+        self._entries = entries
+
+    def _run(self):
+        last_attempt = time.monotonic()
+        while True:
+            self._wake.wait(self.refresh_interval_s)
+            # Bound how often misses can make us refresh
+            time.sleep(max(0, self.min_refresh_gap_s - (time.monotonic() - last_attempt)))
+            self._wake.clear()
+            last_attempt = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good table
+                self.refresh_errors += 1
+                logger.error(f"Failed to refresh the boot table: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_s": round(self._last_refresh_s, 3) if self._last_refresh_s is not None else None,
+            "age_s": round(time.monotonic() - self._refreshed_at, 3) if self._refreshed_at is not None else None,
+            "lookups": self.lookups,
+            "misses": self.misses,
+        }
+
+
+def _boot_info(hostvars: dict | None) -> tuple[bool, str | None]:
+    """
+    Whether a host has hostvars, and the OS they name.
+    """
+    system = hostvars.get("system") if hostvars else None
+    os = system.get("os") if isinstance(system, dict) else None
+    return hostvars is not None, str(os) if os is not None else None
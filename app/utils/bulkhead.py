@@ -0,0 +1,130 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from app.exceptions import BulkheadFullException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Bulkhead:
+    """
+    An isolated pool for one subsystem's requests, with its own concurrency cap
+    and queue depth, so a slow subsystem can only exhaust its own pool.
+
+    Sync routes run on the bulkhead's own threads instead of the shared
+    threadpool; async routes run on the event loop, limited by a semaphore.
+    Once max_concurrency requests are running and max_queue are waiting,
+    further requests are shed with BulkheadFullException (a 503) right away.
+    """
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"bulkhead-{name}")
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _admit(self):
+        with self._lock:
+            if self.active + self.queued >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise BulkheadFullException(f"Too many concurrent {self.name} requests, try again shortly")
+            self.queued += 1
+            self.peak = max(self.peak, self.active + self.queued)
+
+    def _start(self):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+
+    def _finish(self, started: bool):
+        with self._lock:
+            if started:
+                self.active -= 1
+                self.completed += 1
+            else:
+                self.queued -= 1
+
+    def _run(self, func: Callable, args, kwargs):
+        self._start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._finish(started=True)
+
+    def _release_if_cancelled(self, future: Future):
+        # A job cancelled while queued never reaches _run, so give its slot back here
+        if future.cancelled():
+            self._finish(started=False)
+
+    async def _run_async(self, func: Callable, args, kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = False
+        try:
+            async with self._semaphore:
+                self._start()
+                started = True
+                return await func(*args, **kwargs)
+        finally:
+            self._finish(started)
+
+    def isolate(self, func: Callable) -> Callable:
+        """
+        Decorate a route so it runs in this bulkhead. Goes below the router
+        decorator, so FastAPI sees the wrapper.
+        """
+        if inspect.iscoroutinefunction(func):
+            async def wrapper(*args, **kwargs):
+                self._admit()
+                return await self._run_async(func, args, kwargs)
+        else:
+            async def wrapper(*args, **kwargs):
+                self._admit()
+                # Carry over context vars, as FastAPI's own threadpool does
+                context = contextvars.copy_context()
+                try:
+                    future = self._executor.submit(context.run, self._run, func, args, kwargs)
+                except RuntimeError:
+                    self._finish(started=False)
+                    raise
+                future.add_done_callback(self._release_if_cancelled)
+                try:
+                    return await asyncio.wrap_future(future)
+                except asyncio.CancelledError:
+                    # Drop the job if it is still queued; a running one cannot be stopped
+                    future.cancel()
+                    raise
+
+        # Not functools.wraps: FastAPI unwraps __wrapped__ to decide whether a
+        # route is async, and would then run this wrapper in its threadpool
+        functools.update_wrapper(wrapper, func, updated=())
+        del wrapper.__wrapped__
+        wrapper.__signature__ = inspect.signature(func)
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            capacity = self.max_concurrency + self.max_queue
+            return {
+                "active": self.active,
+                "queued": self.queued,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "saturation": round((self.active + self.queued) / capacity, 3),
+                "peak": self.peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
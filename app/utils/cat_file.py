@@ -0,0 +1,220 @@
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from app.exceptions import GitTimeoutException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CatFileProcess:
+    """
+    A single long-lived `git cat-file --batch*` process, restarted on failure.
+
+    Each request must be answered within timeout_s; otherwise the process is
+    killed and GitTimeoutException raised, so callers never wait forever on,
+    e.g., a lazy fetch in a partial clone.
+    """
+    def __init__(self, repo_path: Path, mode: str, timeout_s: float = 60):
+        self.repo_path = repo_path
+        self.mode = mode
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+        self._buffer = bytearray()
+
+    def _start(self) -> subprocess.Popen:
+        logger.info(f"Starting git cat-file {self.mode} for {self.repo_path}")
+        self._buffer = bytearray()
+        return subprocess.Popen(
+            ["git", "cat-file", self.mode],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            # Unbuffered, so select() on the pipe tells the truth
+            bufsize=0,
+        )
+
+    def _stop(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.kill()
+            self._proc.wait(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to stop git cat-file {self.mode}: {e}")
+        self._proc = None
+
+    def _fill(self, deadline: float):
+        remaining = deadline - time.monotonic()
+        fd = self._proc.stdout.fileno()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            raise TimeoutError(f"git cat-file {self.mode} did not answer within {self.timeout_s}s")
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise EOFError(f"git cat-file {self.mode} exited unexpectedly")
+        self._buffer += chunk
+
+    def _read_line(self, deadline: float) -> bytes:
+        while (end := self._buffer.find(b"\n")) < 0:
+            self._fill(deadline)
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end + 1]
+        return line
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        while len(self._buffer) < size:
+            self._fill(deadline)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _roundtrip(self, rev: str) -> tuple[bytes, bytes | None]:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = self._start()
+
+        deadline = time.monotonic() + self.timeout_s
+        self._proc.stdin.write(rev.encode() + b"\n")
+
+        header = self._read_line(deadline)
+        if self.mode != "--batch" or header.endswith((b" missing", b" ambiguous")):
+            return header, None
+
+        size = int(header.rsplit(b" ", 1)[1])
+        body = self._read_exact(size + 1, deadline)
+
+        return header, body[:-1]
+
+    def request(self, rev: str) -> tuple[bytes, bytes | None]:
+        """
+        Send one object name and return the header and (for --batch) the content.
+        """
+        if "\n" in rev:
+            raise ValueError("Object names cannot contain newlines")
+
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    return self._roundtrip(rev)
+                except TimeoutError as e:
+                    # Retrying would only wait as long again
+                    self._stop()
+                    raise GitTimeoutException(str(e)) from e
+                except (OSError, EOFError, ValueError) as e:
+                    # The process is in an unknown state, so throw it away and retry once
+                    self._stop()
+                    if attempt == 2:
+                        raise
+                    logger.warning(f"git cat-file {self.mode} failed ({e}), restarting")
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+class CatFileReader:
+    """
+    Blob, tree and ref lookups for a repository served by persistent
+    `git cat-file` processes instead of one git subprocess per lookup.
+
+    Blobs are read by their own process. In a partial clone reading a blob
+    may fetch it from the remote, and ref, tree and path lookups (which only
+    touch objects a partial clone always has) must not queue behind that.
+    """
+    def __init__(self, repo_path: Path, timeout_s: float = 60):
+        self.repo_path = Path(repo_path)
+        self._batch = CatFileProcess(self.repo_path, "--batch", timeout_s)
+        self._trees = CatFileProcess(self.repo_path, "--batch", timeout_s)
+        self._check = CatFileProcess(self.repo_path, "--batch-check", timeout_s)
+
+    def object_info(self, rev: str) -> tuple[str, str, int] | None:
+        """
+        Get the (sha, type, size) of an object, or None if it does not exist.
+
+        This needs the object itself, so in a partial clone it may fetch a
+        blob; use resolve() when the sha is enough.
+        """
+        header, _ = self._check.request(rev)
+        if header.endswith((b" missing", b" ambiguous")):
+            return None
+
+        sha, obj_type, size = header.decode().split(" ")
+        return sha, obj_type, int(size)
+
+    def resolve(self, rev: str) -> str | None:
+        """
+        Resolve a ref or revision expression to an object sha.
+
+        For "<rev>:<path>" the path is looked up in the trees, so the blob is
+        never read (or fetched).
+        """
+        commit, sep, path = rev.partition(":")
+        if not sep or not commit:
+            info = self.object_info(rev)
+            return info[0] if info else None
+
+        sha = f"{commit}^{{tree}}"
+        for name in path.strip("/").split("/"):
+            entries = self._tree_entries(sha)
+            if entries is None:
+                return None
+            sha = next((entry_sha for _, entry_name, entry_sha in entries if entry_name == name), None)
+            if sha is None:
+                return None
+        return sha
+
+    def _tree_entries(self, rev: str) -> list[tuple[str, str, str]] | None:
+        header, body = self._trees.request(rev)
+        if body is None or header.split(b" ")[1] != b"tree":
+            return None
+        return _parse_tree(body)
+
+    def read_blob(self, rev: str) -> bytes | None:
+        """
+        Read the content of a blob, e.g. "refs/remotes/origin/main:inventory.yml".
+        """
+        header, body = self._batch.request(rev)
+        if body is None:
+            return None
+
+        if header.split(b" ")[1] != b"blob":
+            raise ValueError(f"{rev} is not a blob")
+
+        return body
+
+    def read_tree(self, rev: str) -> list[tuple[str, str, str]] | None:
+        """
+        List the (mode, name, sha) entries of a tree, e.g. "refs/remotes/origin/main^{tree}".
+        """
+        header, body = self._trees.request(rev)
+        if body is None:
+            return None
+
+        if header.split(b" ")[1] != b"tree":
+            raise ValueError(f"{rev} is not a tree")
+
+        return _parse_tree(body)
+
+    def close(self):
+        self._batch.close()
+        self._trees.close()
+        self._check.close()
+
+
+def _parse_tree(body: bytes) -> list[tuple[str, str, str]]:
+    entries = []
+    pos = 0
+    while pos < len(body):
+        space = body.index(b" ", pos)
+        nul = body.index(b"\0", space)
+        mode = body[pos:space].decode()
+        name = body[space + 1:nul].decode()
+        sha = body[nul + 1:nul + 21].hex()
+        entries.append((mode, name, sha))
+        pos = nul + 21
+    return entries
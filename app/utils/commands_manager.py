@@ -1,73 +1,79 @@
-import time
+import logging
 from pathlib import Path
+from app.exceptions import ConcourseCheckException
 from app.utils.concourse_manager import ConcourseManager
 from app.utils.git import RepoHandler
+from app.utils.ssh_mux import SSHMultiplexer
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 class CommandsManager:
-    def __init__(self, concourse_team: str, concourse_commands_pipeline: str, commands_resource: str, repo_url: str, repo_path: Path, concourse_manager: ConcourseManager):
+    def __init__(self, concourse_team: str, concourse_commands_pipeline: str, commands_resource: str, repo_url: str, repo_path: Path, concourse_manager: ConcourseManager, clone_filter: str | None = None, reference_dir: Path | None = None, ssh_mux: SSHMultiplexer | None = None, check_timeout_s: float = 30):
         self.concourse_team = concourse_team
         self.concourse_commands_pipeline = concourse_commands_pipeline
         self.commands_resource = commands_resource
         self.repo_url = repo_url
         self.repo_path = Path(repo_path)
-        self.repo = RepoHandler(repo_url, self.repo_path)
+        self.repo = RepoHandler(repo_url, self.repo_path, clone_filter=clone_filter, reference_dir=reference_dir, ssh_mux=ssh_mux)
         self.concourse_manager = concourse_manager
+        # How long to wait for the resource check to pick up a new commit before running the job anyway
+        self.check_timeout_s = check_timeout_s
 
-    def add_command(self, command: str):
+    def _run_commands_job(self, pipeline: str):
         """
-        Add a new command to the commands repo and trigger a Concourse resource check.
+        Check the commands resource, and run the commands job once the check
+        has picked up the commit that was just pushed.
         """
-        self.repo.checkout_and_pull(branch="main")
-
-        commands_file = self.repo_path / "commands"
-        with open(commands_file, "w") as f:
-            f.write(command)
-
-        self.repo.commit_and_push(f"Update commands file", branch="main")
-
-        self.concourse_manager.trigger_resource_check(
+        check = self.concourse_manager.trigger_resource_check(
             self.concourse_team,
-            self.concourse_commands_pipeline,
+            pipeline,
             self.commands_resource
         )
 
-        time.sleep(1)
+        status = self.concourse_manager.wait_for_check(check, self.check_timeout_s)
+        if status is None:
+            logger.warning(f"Check of {pipeline}/{self.commands_resource} still running after {self.check_timeout_s}s, triggering the job anyway")
+        elif status != "succeeded":
+            raise ConcourseCheckException(f"Check of {pipeline}/{self.commands_resource} {status}")
 
         self.concourse_manager.trigger_job(
             self.concourse_team,
-            self.concourse_commands_pipeline,
+            pipeline,
             "commands",
         )
 
-    def add_node_command(self, node: str, command: str, user: str = "root"):
+    def add_command(self, command: str):
         """
-        Add a new command for a specific node to the commands repo and trigger a Concourse resource check.
+        Add a new command to the commands repo and trigger a Concourse resource check.
         """
-        self.repo.checkout_and_pull(branch=node, create_if_missing=True)
+        with self.repo.lock.write():
+            self.repo.checkout_and_pull(branch="main", force_fetch=True)
+
+            commands_file = self.repo_path / "commands"
+            with open(commands_file, "w") as f:
+                f.write(command)
+
+            self.repo.commit_and_push(f"Update commands file", branch="main")
 
-        commands_file = self.repo_path / "commands"
+        self._run_commands_job(self.concourse_commands_pipeline)
 
+    def add_node_command(self, node: str, command: str, user: str = "root"):
+        """
+        Add a new command for a specific node to the commands repo and trigger a Concourse resource check.
+        """
         yaml_content = f"user: {user}\ncommands: |\n"
 
         for line in command.splitlines():
             yaml_content += f"  {line}\n"
-        
-        with open(commands_file, "w") as f:
-            f.write(yaml_content)
 
-        self.repo.commit_and_push(f"Update commands file for {node}", branch=node)
+        with self.repo.lock.write():
+            self.repo.checkout_and_pull(branch=node, create_if_missing=True, force_fetch=True)
 
-        self.concourse_manager.trigger_resource_check(
-            self.concourse_team,
-            f"{node}-commands",
-            self.commands_resource
-        )
+            commands_file = self.repo_path / "commands"
+            with open(commands_file, "w") as f:
+                f.write(yaml_content)
 
-        time.sleep(1)
+            self.repo.commit_and_push(f"Update commands file for {node}", branch=node)
 
-        self.concourse_manager.trigger_job(
-            self.concourse_team,
-            f"{node}-commands",
-            "commands",
-        )
+        self._run_commands_job(f"{node}-commands")
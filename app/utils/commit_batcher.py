@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from app.exceptions import GitPushException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _PendingBranch:
+    def __init__(self):
+        self.tip: str | None = None
+        self.messages: list[str] = []
+        self.futures: list[Future] = []
+
+
+class CommitBatcher:
+    """
+    Write-behind publishing of local commits.
+
+    Writers commit locally and enqueue the commit instead of pushing it. While a
+    branch has an unpushed commit queued, later writers amend it rather than
+    stacking new commits, so each branch carries exactly one commit per batch.
+    A background thread waits until the batch window closes (or the batch is
+    full) and pushes every queued branch in a single multi-ref push. Each writer
+    gets a future that resolves to the pushed commit sha once its change is
+    durable on the remote, or raises GitPushException.
+    """
+    def __init__(self, repo, window_ms: int, max_batch: int = 50):
+        # repo is the owning RepoHandler
+        self.repo = repo
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        # Condition() uses an RLock, so enqueue() can be called inside staging()
+        self._cond = threading.Condition()
+        self._pending: dict[str, _PendingBranch] = {}
+        self._inflight: dict[str, str] = {}
+        self._count = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=f"commit-batcher-{repo.repo_path}", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def staging(self, branch: str):
+        """
+        Hold off the flush while a local commit for the branch is being made.
+
+        Yields the queued (unpushed) commit for the branch and the messages
+        folded into it so far, or (None, []) if nothing is queued. A commit that
+        builds on the queued one should amend it.
+        """
+        with self._cond:
+            pending = self._pending.get(branch)
+            if pending is None:
+                yield None, []
+            else:
+                yield pending.tip, list(pending.messages)
+
+    def enqueue(self, branch: str, tip: str, message: str) -> Future:
+        """
+        Queue a local commit for publishing. It replaces any commit already queued
+        for the branch, which it must have amended.
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise GitPushException("The write-behind batcher is shut down")
+            pending = self._pending.setdefault(branch, _PendingBranch())
+            pending.tip = tip
+            pending.messages.append(message)
+            pending.futures.append(future)
+            self._count += 1
+            self._cond.notify_all()
+        return future
+
+    def pending_tip(self, branch: str) -> str | None:
+        """
+        The newest local commit for a branch that has not reached the remote yet.
+        """
+        with self._cond:
+            if branch in self._pending:
+                return self._pending[branch].tip
+            return self._inflight.get(branch)
+
+    def close(self):
+        """
+        Push everything still queued without waiting for the batch window, and
+        stop the background thread. Later enqueue() calls raise GitPushException.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    # Closed, and everything queued has been pushed
+                    return
+
+                deadline = time.monotonic() + self.window
+                while self._count < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending
+                self._pending = {}
+                self._count = 0
+                self._inflight.update({branch: pending.tip for branch, pending in batch.items()})
+
+            try:
+                self._flush(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush commit batch: {e}")
+                for pending in batch.values():
+                    self._fail(pending, e)
+            finally:
+                with self._cond:
+                    for branch, pending in batch.items():
+                        if self._inflight.get(branch) == pending.tip:
+                            del self._inflight[branch]
+
+    def _fail(self, pending: _PendingBranch, exc: Exception):
+        for future in pending.futures:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _flush(self, batch: dict[str, _PendingBranch]):
+        logger.info(f"Pushing {sum(len(p.futures) for p in batch.values())} batched change(s) to {len(batch)} branch(es)")
+        results = self.repo.push_refspecs([f"{pending.tip}:refs/heads/{branch}" for branch, pending in batch.items()])
+
+        for branch, pending in batch.items():
+            error = results.get(f"refs/heads/{branch}")
+            if error:
+                logger.error(f"Failed to push batched commit to branch {branch}: {error}")
+                self._fail(pending, GitPushException(f"Failed to push changes to branch {branch}: {error}"))
+                continue
+
+            for future in pending.futures:
+                future.set_result(pending.tip)
@@ -1,13 +1,20 @@
 import os
 import time
 import base64
+import logging
+import threading
 import requests
+from collections import deque
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.utils.git import RepoHandler
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 CONCOURSE_USER = os.getenv("CONCOURSE_USER")
 CONCOURSE_PASSWORD = os.getenv("CONCOURSE_PASSWORD")
@@ -17,22 +24,118 @@ CONCOURSE_OAUTH_CLIENT_SECRET = os.getenv("CONCOURSE_OAUTH_CLIENT_SECRET")
 
 CONCOURSE_URL = os.getenv("CONCOURSE_URL")
 
+FINISHED_BUILD_STATUSES = {"succeeded", "failed", "errored", "aborted"}
+
+
+class _EndpointStats:
+    """
+    Latency of the calls to one Concourse endpoint, over all calls and the most recent ones.
+    """
+    def __init__(self, window: int = 256):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def record(self, elapsed_s: float, ok: bool, retries: int):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.retries += retries
+        self.total_s += elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+        self.recent.append(elapsed_s)
+
+    def stats(self) -> dict:
+        recent = sorted(self.recent)
+        def percentile(p: float) -> float | None:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1) if recent else None
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "mean_ms": round(self.total_s / self.calls * 1000, 1) if self.calls else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_s * 1000, 1),
+        }
+
 
 """
 Get OAuth token that auto refreshes
 """
 class ConcourseManager:
-    def __init__(self, concourse_url: str, concourse_user: str, concourse_password: str):
+    def __init__(
+        self,
+        concourse_url: str,
+        concourse_user: str,
+        concourse_password: str,
+        timeout_s: float = 10,
+        retries: int = 3,
+        pool_size: int = 10,
+    ):
         self.concourse_url = concourse_url
         self.concourse_user = concourse_user
         self.concourse_password = concourse_password
+        self.timeout_s = timeout_s
 
         self._access_token: Optional[str] = None
         self._token_expiry: Optional[datetime] = None
+        # Only one thread fetches a token at a time; the others wait for its result
+        self._token_lock = threading.Lock()
+        self._renewal: threading.Timer | None = None
+        self.token_refreshes = 0
 
         self.client_id = CONCOURSE_OAUTH_CLIENT_ID
         self.client_secret = CONCOURSE_OAUTH_CLIENT_SECRET
 
+        # One keep-alive session, so calls reuse connections instead of doing a
+        # TCP and TLS handshake each. Connection errors are always retried, since
+        # the request never reached Concourse. Gateway errors are retried only for
+        # idempotent methods and the token request: Concourse may already have
+        # accepted a POST (e.g. triggered a build) that then timed out at a proxy.
+        # Read errors and a plain 500 are never retried.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            backoff_factor=0.5,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        token_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry.new(allowed_methods=None))
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # The longest matching prefix wins, so this only covers the token endpoint
+        self.session.mount(f"{concourse_url.rstrip('/')}/sky/", token_adapter)
+
+        self._stats_lock = threading.Lock()
+        self._endpoints: dict[str, _EndpointStats] = {}
+
+    def _request(self, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Make a call through the session, recording its latency under endpoint.
+        """
+        started = time.perf_counter()
+        ok = False
+        retries = 0
+        try:
+            response = self.session.request(method, url, timeout=self.timeout_s, **kwargs)
+            retry = getattr(response.raw, "retries", None)
+            retries = len(retry.history) if retry is not None else 0
+            response.raise_for_status()
+            ok = True
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._endpoints.setdefault(endpoint, _EndpointStats()).record(elapsed, ok, retries)
+
     def _fetch_new_token(self) -> dict:
         token_url = f"{self.concourse_url}/sky/issuer/token"
 
@@ -49,21 +152,65 @@ class ConcourseManager:
             "scope": "openid profile email federated:id groups"
         }
 
-        response = requests.post(token_url, headers=headers, data=data)
-        response.raise_for_status()
+        response = self._request("token", "POST", token_url, headers=headers, data=data)
 
         return response.json()
-    
-    def get_token(self) -> str:
+
+    def _refresh_token(self):
+        # Callers must hold the token lock
         now = datetime.now()
+        token_data = self._fetch_new_token()
+        expires_in = token_data.get("expires_in", 3600)
+        valid_for = expires_in - min(300, expires_in / 10)
+        # get_token reads both without the lock, so the expiry has to be in
+        # place before the token it belongs to is published
+        self._token_expiry = now + timedelta(seconds=valid_for)
+        self._access_token = token_data["access_token"]
+        self.token_refreshes += 1
+        # Renew in the background well before expiry, so requests never wait on it
+        self._schedule_renewal(valid_for * 0.8)
+
+    def _schedule_renewal(self, delay_s: float):
+        if self._renewal is not None:
+            self._renewal.cancel()
+        self._renewal = threading.Timer(delay_s, self._renew)
+        self._renewal.daemon = True
+        self._renewal.start()
+
+    def _renew(self):
+        with self._token_lock:
+            try:
+                self._refresh_token()
+                logger.info("Renewed the Concourse token")
+            except Exception as e:
+                # The current token is still good for a while, so just try again
+                logger.error(f"Failed to renew the Concourse token: {e}")
+                remaining = (self._token_expiry - datetime.now()).total_seconds()
+                if remaining > 0:
+                    self._schedule_renewal(min(30, remaining / 2))
+
+    def get_token(self) -> str:
+        token, expiry = self._access_token, self._token_expiry
+        if token is not None and expiry is not None and datetime.now() < expiry:
+            return token
+
+        with self._token_lock:
+            # Someone else may have refreshed it while we waited
+            if self._access_token is None or datetime.now() >= self._token_expiry:
+                self._refresh_token()
+            return self._access_token
 
-        if self._access_token is None or now >= self._token_expiry:
-            token_data = self._fetch_new_token()
-            self._access_token = token_data["access_token"]
-            expires_in = token_data.get("expires_in", 3600)
-            self._token_expiry = now + timedelta(seconds=expires_in - 300)
+    def _post(self, endpoint: str, url: str) -> dict:
+        token = self.get_token()
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}"
+        }
 
-        return self._access_token
+        response = self._request(endpoint, "POST", url, headers=headers, json={})
+
+        return response.json()
 
     def trigger_resource_check(self, team: str, pipeline: str, resource: str) -> dict:
         """
@@ -72,19 +219,8 @@ class ConcourseManager:
         Example usage:
             manager.trigger_resource_check("main", "commands", "commands")
         """
-        token = self.get_token()
-        
         url = f"{self.concourse_url}/api/v1/teams/{team}/pipelines/{pipeline}/resources/{resource}/check"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}"
-        }
-        
-        response = requests.post(url, headers=headers, json={})
-        response.raise_for_status()
-        
-        return response.json()
+        return self._post("resource_check", url)
 
     def trigger_job(self, team: str, pipeline: str, job: str) -> dict:
         """
@@ -93,16 +229,47 @@ class ConcourseManager:
         Example usage:
             manager.trigger_job("main", "commands", "commands")
         """
-        token = self.get_token()
-
         url = f"{self.concourse_url}/api/v1/teams/{team}/pipelines/{pipeline}/jobs/{job}/builds"
+        return self._post("trigger_job", url)
+
+    def get_build(self, build_id: int) -> dict:
+        """
+        Get a build, e.g. the one a resource check runs as.
+        """
+        token = self.get_token()
 
         headers = {
-            "Content-Type": "application/json",
             "Authorization": f"Bearer {token}"
         }
 
-        response = requests.post(url, headers=headers, json={})
-        response.raise_for_status()
+        response = self._request("build_status", "GET", f"{self.concourse_url}/api/v1/builds/{build_id}", headers=headers)
 
         return response.json()
+
+    def wait_for_check(self, check: dict, timeout_s: float = 30, initial_delay_s: float = 0.1, max_delay_s: float = 1) -> str | None:
+        """
+        Poll the build of a resource check (as returned by trigger_resource_check)
+        with backoff until it finishes. Returns its final status, or None if it
+        is still running after timeout_s.
+        """
+        deadline = time.monotonic() + timeout_s
+        delay = initial_delay_s
+        status = check.get("status")
+        while status not in FINISHED_BUILD_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay_s)
+            status = self.get_build(check["id"]).get("status")
+        return status
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            endpoints = {name: stats.stats() for name, stats in self._endpoints.items()}
+        expiry = self._token_expiry
+        return {
+            "endpoints": endpoints,
+            "token_refreshes": self.token_refreshes,
+            "token_valid_for_s": round((expiry - datetime.now()).total_seconds(), 1) if expiry is not None else None,
+        }
@@ -1,18 +1,95 @@
 import logging
 import os
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
-from git import InvalidGitRepositoryError, Repo
+from git import GitCommandError, InvalidGitRepositoryError, Repo
 
+from app.utils.cat_file import CatFileReader
+from app.utils.commit_batcher import CommitBatcher
+from app.utils.rwlock import Lock, RWLock
+from app.utils.ssh_mux import SSHMultiplexer
+from app.utils import yaml_io
 from app.exceptions import GitGetOrCloneException, GitPullException, GitCommitException
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fetch key for fetching every branch of a single-branch clone; never a valid branch name
+ALL_BRANCHES = "*"
+
+def completed(result: str | None = None) -> Future:
+    """
+    A future that is already resolved, for writes that finished (or were
+    skipped, with None) without going through write-behind.
+    """
+    future = Future()
+    future.set_result(result)
+    return future
+
+def notify_when_pushed(future: Future, listeners: list, *args):
+    """
+    Call every listener with args once future resolves to a pushed commit.
+    Skipped writes (None) and failed pushes notify nobody.
+    """
+    def done(future: Future):
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+        notify(listeners, *args)
+
+    future.add_done_callback(done)
+
+def notify(listeners: list, *args):
+    """
+    Call every listener with args; a failing listener is logged and skipped.
+    """
+    for listener in listeners:
+        try:
+            listener(*args)
+        except Exception as e:
+            logger.error(f"Change listener {listener} failed: {e}")
+
 class RepoHandler:
-    def __init__(self, repo_url: str, repo_path: Path):
+    def __init__(
+        self,
+        repo_url: str,
+        repo_path: Path,
+        max_staleness_ms: int = 0,
+        write_behind_ms: int = 0,
+        write_behind_max_batch: int = 50,
+        clone_filter: str | None = None,
+        single_branch: bool = False,
+        reference_dir: Path | None = None,
+        ssh_mux: SSHMultiplexer | None = None,
+        git_timeout_s: float = 60,
+    ):
         self.repo_url = repo_url
         self.repo_path = repo_path
+        # Shared persistent SSH connections for fetches and pushes
+        self.ssh_mux = ssh_mux
+        # Cold start options: partial clone filter (e.g. "blob:none"), cloning only
+        # main and fetching other branches on demand, and a directory of local
+        # mirrors (<reference_dir>/<repo name>) to borrow objects from
+        self.clone_filter = clone_filter
+        self.single_branch = single_branch
+        self.reference_dir = reference_dir
+        # Reads may be served from remote refs fetched up to this long ago
+        self.max_staleness = max_staleness_ms / 1000
+        self._fetch_lock = Lock()
+        # Keyed by branch for on-demand fetches in single-branch clones, None for a full fetch
+        self._last_fetch_started: dict[str | None, float] = {}
+        # Serializes fetches with `git worktree add/remove`; fetch walks every
+        # worktree's HEAD and fails on one that is only half created
+        self.admin_lock = Lock()
+        # Guards the main working tree: readers share whatever commit is checked out,
+        # writers hold it exclusively from checkout through commit and push
+        self.lock = RWLock()
         self.repo = self._get_or_clone_repo()
+        # Persistent cat-file processes for blob, tree and ref lookups
+        self.reader = CatFileReader(self.repo_path, timeout_s=git_timeout_s)
+        # With write-behind enabled, pushes are deferred and batched across writers
+        self.batcher = CommitBatcher(self, write_behind_ms, write_behind_max_batch) if write_behind_ms > 0 else None
 
     def _get_or_clone_repo(self):
         """
@@ -21,10 +98,17 @@ class RepoHandler:
         try:
             if not self.repo_path.exists():
                 logger.info(f"Cloning repository from {self.repo_url} to {self.repo_path}")
-                return Repo.clone_from(self.repo_url, self.repo_path, branch="main")
+                env = {"GIT_SSH_COMMAND": self.ssh_mux.git_ssh_command} if self.ssh_mux is not None else None
+                with self._remote():
+                    repo = Repo.clone_from(self.repo_url, self.repo_path, branch="main", multi_options=self._clone_options(), env=env)
             else:
                 logger.info(f"Repository already exists at {self.repo_path}")
-                return Repo(self.repo_path)
+                repo = Repo(self.repo_path)
+
+            if self.ssh_mux is not None:
+                # Stored in the repo config so every git process (worktrees, lazy blob fetches) uses it
+                repo.git.config("core.sshCommand", self.ssh_mux.git_ssh_command)
+            return repo
         except InvalidGitRepositoryError as e:
             logger.error(f"Invalid Git repository: {e}")
             raise GitGetOrCloneException("Failed to get or clone the repository.") from e
@@ -32,25 +116,108 @@ class RepoHandler:
             logger.error(f"An error occurred while getting or cloning the repository: {e}")
             raise GitGetOrCloneException("Failed to get or clone the repository.") from e
 
-    def fetch(self):
+    def _clone_options(self) -> list[str]:
+        options = []
+        if self.clone_filter:
+            options.append(f"--filter={self.clone_filter}")
+        if self.single_branch:
+            options.append("--single-branch")
+        if self.reference_dir:
+            # Silently ignored by git if the mirror does not exist
+            options.append(f"--reference-if-able={Path(self.reference_dir) / self.repo_path.name}")
+        return options
+
+    @contextmanager
+    def _remote(self):
+        """
+        Wrap a git operation that talks to the remote.
+        """
+        if self.ssh_mux is None:
+            yield
+            return
+        with self.ssh_mux.operation(self.repo_url):
+            yield
+
+    def fetch(self, force: bool = False, branch: str | None = None):
         """
         Fetch the latest changes from the remote repository.
+
+        Concurrent callers share a single in-flight fetch, and callers within the
+        staleness window skip the network entirely unless force is set. In a
+        single-branch clone, passing a branch other than main fetches just that
+        branch on demand.
+        """
+        key = branch if self.single_branch and branch not in (None, "main") else None
+        self._fetch_coalesced(key, force)
+
+    def fetch_all(self, force: bool = False):
+        """
+        Fetch every branch in one round trip, also in a single-branch clone, for
+        callers that are about to read many branches.
+        """
+        self._fetch_coalesced(ALL_BRANCHES if self.single_branch else None, force)
+
+    def _fetch_coalesced(self, key: str | None, force: bool):
+        requested_at = time.monotonic()
+        with self._fetch_lock:
+            last = self._last_fetch_started.get(key)
+            # A fetch that started after we asked is as fresh as one we would run ourselves
+            if last is not None and last >= requested_at:
+                logger.debug("Coalesced with an in-flight fetch.")
+                return
+            if not force and last is not None and requested_at - last < self.max_staleness:
+                logger.debug("Remote refs are within the staleness window, skipping fetch.")
+                return
+            self._fetch(key, time.monotonic())
+
+    def _fetch_branch(self, branch: str):
+        """
+        Fetch a single branch into its remote-tracking ref, or drop the ref if the
+        branch no longer exists on the remote.
         """
         try:
-            self.repo.remotes.origin.fetch()
+            self.repo.git.fetch("origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}")
+        except GitCommandError as e:
+            if "couldn't find remote ref" not in str(e):
+                raise
+            if self.branch_exists(branch, remote=True):
+                self.repo.git.update_ref("-d", f"refs/remotes/origin/{branch}")
+
+    def _fetch(self, key: str | None, started_at: float, attempts: int = 3):
+        try:
+            for attempt in range(1, attempts + 1):
+                try:
+                    with self.admin_lock, self._remote():
+                        if key is None:
+                            # Prune so branches deleted on the remote stop being readable here
+                            self.repo.remotes.origin.fetch(prune=True)
+                        elif key == ALL_BRANCHES:
+                            self.repo.git.fetch("--prune", "origin", "+refs/heads/*:refs/remotes/origin/*")
+                        else:
+                            self._fetch_branch(key)
+                    break
+                except GitCommandError as e:
+                    # A concurrent push may be updating the same remote-tracking ref
+                    if "cannot lock ref" not in str(e) or attempt == attempts:
+                        raise
+                    logger.warning(f"Remote-tracking ref was locked during fetch, retrying ({attempt}/{attempts})")
+            self._last_fetch_started[key] = started_at
             logger.info("Fetched latest changes from remote repository.")
         except Exception as e:
             logger.error(f"Failed to fetch changes: {e}")
             raise GitPullException("Failed to fetch changes from the remote repository.") from e
 
-    def checkout_and_pull(self, branch: str = "main", create_if_missing: bool = False):
+    def checkout_and_pull(self, branch: str = "main", create_if_missing: bool = False, force_fetch: bool = False):
+        """
+        Check out the branch and bring it up to date with the remote.
+
+        Writers should pass force_fetch so they never commit on top of stale refs.
+        """
         try:
-            self.fetch()
+            self.fetch(force=force_fetch, branch=branch)
 
-            # Check if branch exists locally
-            local_branch_exists = branch in [b.name for b in self.repo.heads]
-            # Check if branch exists remotely
-            remote_branch_exists = f"origin/{branch}" in [str(ref) for ref in self.repo.remotes.origin.refs]
+            local_branch_exists = self.branch_exists(branch)
+            remote_branch_exists = self.branch_exists(branch, remote=True)
 
             if not local_branch_exists and create_if_missing:
                 if remote_branch_exists:
@@ -62,15 +229,16 @@ class RepoHandler:
                     logger.info(f"Branch {branch} does not exist locally or remotely, creating new branch.")
                     self.repo.git.checkout("-b", branch)
                     # Push to create remote tracking branch
-                    self.repo.git.push("--set-upstream", "origin", branch)
+                    with self._remote():
+                        self.repo.git.push("--set-upstream", "origin", branch)
             else:
                 # Branch exists locally, just check it out
                 logger.info(f"Checking out branch {branch}.")
                 self.repo.git.checkout(branch)
 
-                # Pull if remote exists
+                # Merge the fetched remote branch (fetch() already did the network round-trip)
                 if remote_branch_exists:
-                    self.repo.remotes.origin.pull(branch)
+                    self.repo.git.merge(f"origin/{branch}")
                 else:
                     logger.info(f"No remote branch '{branch}' exists, skipping pull.")
 
@@ -79,6 +247,93 @@ class RepoHandler:
             logger.error(f"Failed to checkout and pull branch {branch}: {e}")
             raise GitPullException(f"Failed to checkout and pull branch {branch}.") from e
 
+    def branch_exists(self, branch: str, remote: bool = False) -> bool:
+        """
+        Check whether a local (or fetched remote) branch exists.
+        """
+        ref = f"refs/remotes/origin/{branch}" if remote else f"refs/heads/{branch}"
+        return self.reader.resolve(ref) is not None
+
+    def rev_parse(self, rev: str) -> str | None:
+        """
+        Resolve a revision to an object sha, or None if it does not exist.
+        """
+        return self.reader.resolve(rev)
+
+    def read_file(self, branch: str, file_path: str) -> bytes | None:
+        """
+        Read a file from the fetched remote branch straight out of the object database.
+
+        This never touches the working tree, so it is safe to call while other
+        requests have a different branch checked out. Returns None if the branch
+        or the file does not exist.
+        """
+        return self.reader.read_blob(f"refs/remotes/origin/{branch}:{file_path}")
+
+    def head_sha(self) -> str | None:
+        """
+        The commit checked out in the main working tree.
+        """
+        return self.reader.resolve("HEAD")
+
+    def remote_sha(self, branch: str) -> str | None:
+        """
+        The commit the fetched remote branch points at, or None if it does not exist.
+        """
+        return self.reader.resolve(f"refs/remotes/origin/{branch}")
+
+    def read_file_at(self, commit: str, file_path: str) -> bytes | None:
+        """
+        Read a file as of a specific commit, or None if it does not exist there.
+        """
+        return self.reader.read_blob(f"{commit}:{file_path}")
+
+    def branch_tip(self, branch: str) -> str | None:
+        """
+        The commit the next write to the branch builds on: a commit still waiting
+        on a write-behind push, or else the fetched remote branch.
+        """
+        return self.pending_tip(branch) or self.remote_sha(branch)
+
+    def is_unchanged(self, commit: str | None, file_path: str, content: bytes) -> bool:
+        """
+        Check whether a file already has exactly this content at the commit, by
+        comparing blob shas, so the content never has to be read back.
+        """
+        if commit is None:
+            return False
+        return self.reader.resolve(f"{commit}:{file_path}") == yaml_io.blob_sha(content)
+
+    def file_exists(self, branch: str, file_path: str, remote: bool = False) -> bool:
+        """
+        Check whether a file exists on a branch without reading it.
+        """
+        ref = f"refs/remotes/origin/{branch}" if remote else f"refs/heads/{branch}"
+        return self.reader.resolve(f"{ref}:{file_path}") is not None
+
+    def _is_synced(self, branch: str) -> bool:
+        """
+        Check whether the working tree is on the branch at the latest fetched commit.
+        """
+        if self.repo.head.is_detached or self.repo.active_branch.name != branch:
+            return False
+        head = self.rev_parse("HEAD")
+        return head == self.rev_parse(f"refs/remotes/origin/{branch}") or head == self.pending_tip(branch)
+
+    @contextmanager
+    def snapshot(self, branch: str = "main"):
+        """
+        Hold a shared lock on the working tree checked out at the latest fetched
+        commit of the branch. Only takes the exclusive lock if it has to move.
+        """
+        self.fetch(branch=branch)
+        if not self._is_synced(branch):
+            with self.lock.write():
+                self.checkout_and_pull(branch=branch)
+
+        with self.lock.read():
+            yield
+
     def commit_all(self, commit_msg: str):
         """
         Commit all changes in the repository with the given commit message.
@@ -97,23 +352,142 @@ class RepoHandler:
         """
         return [branch.name for branch in self.repo.branches if branch.name not in excluded_branches]
 
-    def commit_and_push(self, commit_msg: str, branch: str = "main"):
+    def commit_and_push(self, commit_msg: str, branch: str = "main", worktree: Repo | None = None, wait: bool = True) -> Future:
+        """
+        Commit everything in the working tree and push it to the branch.
+
+        When a (detached) worktree is given, the commit is made there and pushed
+        as HEAD:refs/heads/<branch> instead of from the main working tree.
+
+        Returns a future that resolves to the pushed commit sha. With write-behind
+        enabled the push is batched, and the future only resolves once the batch
+        has been pushed; pass wait=False to get it back without blocking
+        (e.g. before releasing a lock).
+        """
+        repo = worktree or self.repo
+        if self.batcher is not None:
+            future = self._commit_behind(repo, commit_msg, branch)
+            if wait:
+                future.result()
+            return future
+
         try:
-            self.repo.git.add(A=True)
-            self.repo.index.commit(commit_msg)
-            self.repo.remotes.origin.push(branch)
+            repo.git.add(A=True)
+            commit = repo.index.commit(commit_msg)
+        except Exception as e:
+            logger.error(f"Failed to commit changes: {e}")
+            raise GitCommitException("Failed to commit changes to the repository.") from e
+
+        try:
+            with self._remote():
+                if worktree is None:
+                    repo.remotes.origin.push(branch)
+                else:
+                    repo.remotes.origin.push(f"HEAD:refs/heads/{branch}")
+            self._track_pushed(branch, commit.hexsha)
             logger.info(f"Committed and pushed changes to branch {branch} with message: {commit_msg}")
         except Exception as e:
             logger.error(f"Failed to commit changes: {e}")
             raise GitCommitException("Failed to commit changes to the repository.") from e
+
+        return completed(commit.hexsha)
+
+    def _commit_behind(self, repo: Repo, commit_msg: str, branch: str) -> Future:
+        """
+        Commit locally and queue the commit for the next write-behind push.
+        """
+        try:
+            with self.batcher.staging(branch) as (pending_tip, pending_messages):
+                repo.git.add(A=True)
+                head = repo.head.commit
+                if pending_tip is not None and head.hexsha == pending_tip:
+                    # Fold this change into the commit that is still waiting to be pushed
+                    messages = pending_messages + [commit_msg]
+                    message = f"Batch of {len(messages)} updates\n\n" + "\n".join(f"- {m}" for m in messages)
+                    commit = repo.index.commit(message, parent_commits=head.parents)
+                else:
+                    commit = repo.index.commit(commit_msg)
+                future = self.batcher.enqueue(branch, commit.hexsha, commit_msg)
+        except Exception as e:
+            logger.error(f"Failed to commit changes: {e}")
+            raise GitCommitException("Failed to commit changes to the repository.") from e
+
+        logger.info(f"Committed changes to branch {branch} with message: {commit_msg}, queued for push")
+        return future
+
+    def close(self):
+        """
+        Push any write-behind commits still queued and stop the cat-file processes.
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        self.reader.close()
+
+    def pending_tip(self, branch: str) -> str | None:
+        """
+        The newest local commit on the branch that write-behind has not pushed yet.
+        """
+        if self.batcher is None:
+            return None
+        return self.batcher.pending_tip(branch)
+
+    def push_refspecs(self, refspecs: list[str], atomic: bool = False) -> dict[str, str | None]:
+        """
+        Push several refspecs with a single `git push` and report the outcome per
+        destination ref: None on success, otherwise the reason it was rejected.
+        """
+        args = ["--porcelain"] + (["--atomic"] if atomic else []) + ["origin"] + refspecs
+        with self._remote():
+            status, stdout, stderr = self.repo.git.push(*args, with_extended_output=True, with_exceptions=False)
+
+        results = {}
+        for line in stdout.splitlines():
+            parts = line.split("\t")
+            if len(parts) != 3:
+                continue
+            flag, refs, summary = parts
+            results[refs.split(":", 1)[1]] = summary if flag == "!" else None
+
+        # Refs git never reported on (e.g. the connection failed) are failures too
+        for refspec in refspecs:
+            dst = refspec.split(":", 1)[1]
+            if dst not in results:
+                results[dst] = stderr.strip() or f"git push exited with status {status}"
+
+        for refspec in refspecs:
+            src, dst = refspec.split(":", 1)
+            if results[dst] is None and dst.startswith("refs/heads/"):
+                self._track_pushed(dst.removeprefix("refs/heads/"), src or None)
+
+        return results
+
+    def _track_pushed(self, branch: str, sha: str | None):
+        """
+        Point the remote-tracking ref at what was just pushed (or drop it for a
+        deletion). git only does this itself for branches covered by the fetch
+        refspec, which in a single-branch clone is main alone.
+        """
+        try:
+            with self.admin_lock:
+                if sha is None:
+                    if self.branch_exists(branch, remote=True):
+                        self.repo.git.update_ref("-d", f"refs/remotes/origin/{branch}")
+                else:
+                    self.repo.git.update_ref(f"refs/remotes/origin/{branch}", sha)
+        except GitCommandError as e:
+            # Harmless: the next fetch of the branch brings the ref up to date
+            logger.warning(f"Failed to update remote-tracking ref for {branch}: {e}")
     
     def delete_branch_entirely(self, branch: str = "main", purge_files: list[str] = None):
         if purge_files is None:
             purge_files = []
 
+        # Make sure the remote-tracking ref reflects the remote, even in a single-branch clone
+        self.fetch(force=True, branch=branch)
+
         # First check if the local branch exists and delete the specified files in it
-        if branch in [b.name for b in self.repo.heads]:
-            self.checkout_and_pull(branch=branch)
+        if self.branch_exists(branch):
+            self.checkout_and_pull(branch=branch, force_fetch=True)
             for file in purge_files:
                 os.remove(self.repo_path / file)
 
@@ -123,15 +497,31 @@ class RepoHandler:
         self.checkout_and_pull(branch="main")
 
         # Delete the local branch (if it exists)
-        if branch in [b.name for b in self.repo.heads]:
+        if self.branch_exists(branch):
             logger.info(f"Deleting local branch {branch}")
             self.repo.delete_head(branch, force=True)
 
         # Delete the remote branch if it exists
-        if branch in [ref.remote_head for ref in self.repo.remotes.origin.refs]:
+        if self.branch_exists(branch, remote=True):
             logger.info(f"Deleting remote branch {branch}")
-            self.repo.git.push("origin", "--delete", branch)
+            with self._remote():
+                self.repo.git.push("origin", "--delete", branch)
+            self._track_pushed(branch, None)
+
+    def delete_local_branches(self, branches: list[str]):
+        """
+        Delete several local branches with a single `git branch -D`.
+        """
+        logger.info(f"Deleting {len(branches)} local branch(es)")
+        self.repo.git.branch("-D", *branches)
 
     def get_remote_branches(self, excluded_branches: list = []):
+        if self.single_branch:
+            # Only main is tracked locally, so ask the remote
+            with self._remote():
+                heads = self.repo.git.ls_remote("--heads", "origin").splitlines()
+            branches = [line.split("\t", 1)[1].removeprefix("refs/heads/") for line in heads]
+            return [branch for branch in branches if branch not in excluded_branches]
+
         remote_refs = self.repo.remotes.origin.refs
         return [ref.remote_head for ref in remote_refs if ref.remote_head not in excluded_branches]
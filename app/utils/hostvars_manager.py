@@ -1,48 +1,125 @@
 
-from enum import Enum
-import os
+import asyncio
+import copy
+from concurrent.futures import Future
 import logging
 from pathlib import Path
-import yaml
+from typing import Callable
 from app.exceptions import HostvarsNotFoundException
 from app.models.entities import HOST_TYPE_REGISTRY
 from app.models.hostvars import HOSTVARS_VALIDATOR, DropletHostvarsModel, HostvarsModel, ServerHostvarsModel
 from app.models.inventory import InventoryEntry, InventoryUnion
-from app.utils.git import RepoHandler
+from app.models.validation import dump_models, validate_as
+from app.utils.async_git import AsyncRepoHandler
+from app.utils.git import RepoHandler, completed, notify, notify_when_pushed
+from app.utils.lru_cache import LRUCache
+from app.utils.ssh_mux import SSHMultiplexer
+from app.utils.worktree_pool import WorktreePool
+from app.utils import yaml_io
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Need this to avoid YAML dumping None as 'null'
-yaml.SafeDumper.add_representer(
-    type(None),
-    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
-)
-
-def str_enum_representer(dumper, data):
-    if isinstance(data, Enum):
-        return dumper.represent_scalar('tag:yaml.org,2002:str', str(data.value))
-    return dumper.represent_scalar('tag:yaml.org,2002:str', str(data))
-
-yaml.SafeDumper.add_multi_representer(Enum, str_enum_representer)
-
 class HostvarsManager:
-    def __init__(self, repo_url: str, repo_path: Path):
+    def __init__(
+        self,
+        repo_url: str,
+        repo_path: Path,
+        max_staleness_ms: int = 0,
+        max_worktrees: int = 8,
+        write_behind_ms: int = 0,
+        write_behind_max_batch: int = 50,
+        clone_filter: str | None = None,
+        single_branch: bool = False,
+        reference_dir: Path | None = None,
+        ssh_mux: SSHMultiplexer | None = None,
+        cache_max_entries: int = 1024,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        git_timeout_s: float = 60,
+    ):
         self.repo_url = repo_url
         self.repo_path = repo_path
-        self.repo = RepoHandler(repo_url, Path(repo_path))
+        self.repo = RepoHandler(
+            repo_url,
+            Path(repo_path),
+            max_staleness_ms=max_staleness_ms,
+            write_behind_ms=write_behind_ms,
+            write_behind_max_batch=write_behind_max_batch,
+            clone_filter=clone_filter,
+            single_branch=single_branch,
+            reference_dir=reference_dir,
+            ssh_mux=ssh_mux,
+            git_timeout_s=git_timeout_s,
+        )
+        # The same clone driven from the event loop, for the async routes
+        self.arepo = AsyncRepoHandler(self.repo, timeout_s=git_timeout_s)
         self.hostvars_path = Path(repo_path) / "hostvars.yml"
+        # Writes go through per-branch worktrees so different hosts can be written concurrently
+        self.worktrees = WorktreePool(self.repo, Path(f"{repo_path}-worktrees"), max_worktrees)
+        # Parsed hostvars keyed by (branch, commit sha); a fetch that moves the
+        # branch changes the key, so entries never need explicit invalidation
+        self.cache: LRUCache[dict] = LRUCache(cache_max_entries, cache_max_bytes)
+        # Called with (host name, hostvars or None) whenever this process pushes a hostvars change
+        self._listeners: list[Callable[[str, dict | None], None]] = []
 
-    def init(self, host_name: str, hostvars: HostvarsModel):
+    def add_listener(self, listener: Callable[[str, dict | None], None]):
         """
-        Create the branch and file for the host if it does not exist.
+        Call listener with the host name and its new hostvars (None once they
+        are deleted) after each change this process pushes.
+        """
+        self._listeners.append(listener)
+
+    def close(self):
+        """
+        Push any changes still queued for write-behind, e.g. on shutdown.
         """
-        branch_name = f"{host_name}"
-        self.repo.checkout_and_pull(branch=host_name, create_if_missing=True)
-        with open(self.hostvars_path, "w") as f:
-            yaml.safe_dump(hostvars.model_dump(), f, default_flow_style=False, allow_unicode=True)
+        self.repo.close()
+
+    def _write(self, host_name: str, hostvars_dict: dict, commit_msg: str, wait: bool) -> Future:
+        """
+        Write the hostvars file on the host's branch and push it. Nothing is
+        committed if the branch already has exactly this content, in which
+        case the future resolves to None.
+        """
+        return self._update(host_name, lambda current: hostvars_dict, commit_msg, wait)
+
+    def _update(self, host_name: str, update: Callable[[dict | None], dict | None], commit_msg: str, wait: bool) -> Future | None:
+        """
+        Call update with the host's current hostvars (None if it has none) and
+        write what it returns, like _write. It runs inside the worktree lease,
+        after the forced fetch, so it always builds on the latest commit and a
+        concurrent push is never overwritten. If update returns None nothing is
+        written and None is returned.
+        """
+        with self.worktrees.lease(host_name) as worktree:
+            tip = self.repo.branch_tip(host_name)
+            current = self._read_at(host_name, tip) if tip is not None else None
+            hostvars_dict = update(copy.deepcopy(current))
+            if hostvars_dict is None:
+                return None
+
+            content = yaml_io.dump(hostvars_dict).encode()
+            if self.repo.is_unchanged(tip, "hostvars.yml", content):
+                logger.info(f"Hostvars for {host_name} are unchanged, skipping the commit")
+                return completed()
 
-        self.repo.commit_and_push(f"Initialize hostvars for {host_name}", branch=branch_name)
+            hostvars_path = Path(worktree.working_tree_dir) / "hostvars.yml"
+            with open(hostvars_path, "wb") as f:
+                f.write(content)
+
+            future = self.repo.commit_and_push(commit_msg, branch=host_name, worktree=worktree, wait=False)
+            notify_when_pushed(future, self._listeners, host_name, hostvars_dict)
+
+        # Wait outside the lease so other writes to this host can join the same batch
+        if wait:
+            future.result()
+        return future
+
+    def init(self, host_name: str, hostvars: HostvarsModel, wait: bool = True) -> Future:
+        """
+        Create the branch and file for the host if it does not exist.
+        """
+        return self._write(host_name, hostvars.model_dump(), f"Initialize hostvars for {host_name}", wait)
 
     def delete(self, host_name: str):
         """
@@ -50,80 +127,160 @@ class HostvarsManager:
         """
         logger.info(f"Deleting hostvars for {host_name}...")
         # Remove the host's branch in Git
-        self.repo.delete_branch_entirely(branch=host_name, purge_files=["hostvars.yml"])
+        self.worktrees.discard(host_name)
+        with self.repo.lock.write():
+            self.repo.delete_branch_entirely(branch=host_name, purge_files=["hostvars.yml"])
+        notify(self._listeners, host_name, None)
 
+    async def delete_async(self, host_name: str):
+        """
+        Same as delete, for the event loop.
+        """
+        logger.info(f"Deleting hostvars for {host_name}...")
+        await asyncio.to_thread(self.worktrees.discard, host_name)
+        async with self.repo.lock.write_async():
+            await self.arepo.delete_branch_entirely(branch=host_name, purge_files=["hostvars.yml"])
+        notify(self._listeners, host_name, None)
 
-    def delete_all(self):
+    def delete_all(self) -> dict:
         """
         Delete all hostvars branches other than main.
+
+        Every remote branch is deleted with one atomic multi-refspec push, so
+        either all of them go or none do. Returns the deleted branches and the
+        reason each remaining branch could not be deleted.
         """
+        with self.repo.lock.write():
+            return self._delete_all()
+
+    def _delete_all(self) -> dict:
         logger.info("Fetching remote branches...")
-   
-        self.repo.checkout_and_pull(branch="main")
+        self.repo.checkout_and_pull(branch="main", force_fetch=True)
 
-        # For every non-main branch, check it out, delete the hostvars file, commit and push the change, then remove the branch
+        remote_branches = self.repo.get_remote_branches(excluded_branches=["main", "HEAD"])
         local_branches = self.repo.get_local_branches(excluded_branches=["main"])
 
-        for branch in local_branches:
-            logger.info(f"Checking out branch {branch}...")
-            self.repo.checkout_and_pull(branch=branch)
-
-            if self.hostvars_path.exists():
-                logger.info(f"Deleting hostvars file for branch {branch}...")
-                os.remove(self.hostvars_path)
-                self.repo.commit_and_push(f"Delete hostvars for {branch}", branch=branch)
-            else:
-                logger.warning(f"No hostvars file found for branch {branch}, skipping deletion.")
-
-        # We cannot delete a branch while checked out to it, so we check out main first
-        self.repo.checkout_and_pull(branch="main")
-
-        logger.info("Deleting all hostvars branches...")
-        for branch in local_branches:
-            logger.info(f"Deleting local branch {branch}...")
-            self.repo.repo.delete_head(branch, force=True)
-
-            try:
-                logger.info(f"Deleting remote branch {branch}...")
-                self.repo.repo.remotes.origin.push(refspec=f":{branch}")
-            except Exception as e:
-                logger.error(f"Failed to delete remote branch {branch}: {e}")
-
-
-        # Delete any remote branch stragglers
-        remote_branches = self.repo.get_remote_branches(excluded_branches=["main"])
-        for branch in remote_branches:
-            try:
-                logger.info(f"Deleting remote branch straggler: {branch}")
-                self.repo.repo.git.push("origin", "--delete", branch)
-            except Exception as e:
-                logger.error(f"Failed to delete remote branch {branch}: {e}")
+        failed = {}
+        if remote_branches:
+            logger.info(f"Deleting {len(remote_branches)} remote hostvars branch(es) in a single push...")
+            results = self.repo.push_refspecs([f":refs/heads/{branch}" for branch in remote_branches], atomic=True)
+            for branch in remote_branches:
+                error = results.get(f"refs/heads/{branch}")
+                if error:
+                    logger.error(f"Failed to delete remote branch {branch}: {error}")
+                    failed[branch] = error
+
+        deleted = [b for b in dict.fromkeys(remote_branches + local_branches) if b not in failed]
+        logger.info(f"Deleted {len(deleted)} remote branch(es), {len(failed)} failed. Cleaning up local state...")
+
+        for branch in deleted:
+            self.worktrees.discard(branch)
+            notify(self._listeners, branch, None)
+
+        stale_local = [b for b in local_branches if b not in failed]
+        if stale_local:
+            self.repo.delete_local_branches(stale_local)
+
+        return {"deleted": deleted, "failed": failed}
 
     def get(self, host_name: str):
-        self.repo.checkout_and_pull(branch=host_name)
-        if not self.hostvars_path.exists():
+        """
+        Get the hostvars for a host from its remote branch without checking it out.
+        """
+        self.repo.fetch(branch=host_name)
+        hostvars = self._read(host_name)
+        if hostvars is None:
             raise HostvarsNotFoundException
 
-        hv_data = {}
-        with open(self.hostvars_path, "r") as f:
-            hv_data = yaml.safe_load(f) or {}
+        # Callers are free to mutate what they get back
+        return copy.deepcopy(hostvars)
+
+    async def get_async(self, host_name: str):
+        """
+        Same as get, for the event loop.
+        """
+        await self.arepo.fetch(branch=host_name)
+        sha = await self.arepo.run(self.repo.remote_sha, host_name)
+        hostvars = self.cache.get((host_name, sha)) if sha is not None else None
+        if hostvars is None:
+            # Reading the blob may go to the remote in a partial clone
+            hostvars = await asyncio.to_thread(self._read, host_name)
+        if hostvars is None:
+            raise HostvarsNotFoundException
+
+        return copy.deepcopy(hostvars)
+
+    def get_many(self, host_names: list[str]) -> dict[str, dict]:
+        """
+        Get the hostvars for many hosts with a single fetch. Hosts without
+        hostvars are left out.
+        """
+        self.repo.fetch_all()
+        found = {}
+        for host_name in host_names:
+            hostvars = self._read(host_name)
+            if hostvars is not None:
+                found[host_name] = copy.deepcopy(hostvars)
+        return found
+
+    def _read(self, host_name: str) -> dict | None:
+        """
+        The cached hostvars at the fetched tip of the host's branch, which callers must not modify.
+        """
+        sha = self.repo.remote_sha(host_name)
+        if sha is None:
+            return None
+        return self._read_at(host_name, sha)
 
-        return hv_data
+    def _read_at(self, host_name: str, sha: str) -> dict | None:
+        key = (host_name, sha)
+        hostvars = self.cache.get(key)
+        if hostvars is None:
+            content = self.repo.read_file_at(sha, "hostvars.yml")
+            if content is None:
+                return None
 
-    def set(self, host: InventoryEntry, hostvars: HostvarsModel):
-        """Set hostvars for a host entry."""
-        self.repo.checkout_and_pull(branch=host.name)
+            hostvars = yaml_io.load(content) or {}
+            self.cache.put(key, hostvars, len(content))
+        return hostvars
+
+    def set(self, host: InventoryEntry, hostvars: HostvarsModel, wait: bool = True) -> Future:
+        """
+        Set hostvars for a host entry.
 
+        Returns a future that resolves once the change is pushed, to None if
+        the hostvars were unchanged; by default this waits for it.
+        """
         hostvars_dict = hostvars.model_dump()
 
         logger.info(f"Setting hostvars for {host.name}: {hostvars_dict}")
 
-        with open(self.hostvars_path, "w") as f:
-            yaml.safe_dump(hostvars_dict, f, default_flow_style=False, allow_unicode=True)
-
-        self.repo.commit_and_push("Update hostvars", branch=host.name)
+        return self._write(host.name, hostvars_dict, "Update hostvars", wait)
     
-    def set_from_dict(self, host: InventoryEntry, hostvars_dict: dict):
+    def set_from_dict(self, host: InventoryEntry, hostvars_dict: dict, wait: bool = True) -> Future:
+        """
+        Set hostvars for a host entry from a dict.
+        """
         host_type = host.get_type()
-        hostvars_model = HOSTVARS_VALIDATOR[host_type].model_validate(hostvars_dict)
-        self.set(host, hostvars_model)
+        hostvars_model = validate_as(HOSTVARS_VALIDATOR[host_type], hostvars_dict)
+        return self.set(host, hostvars_model, wait)
+
+    def set_section(self, host_name: str, section: str, value, wait: bool = True) -> Future | None:
+        """
+        Replace one top-level section of a host's hostvars with an already
+        validated model (or list of models), leaving the rest as it is on the
+        branch at the time of the write.
+
+        Returns None, writing nothing, if the hostvars have no such section.
+        Otherwise returns a future like set().
+        """
+        def update(hostvars: dict | None) -> dict | None:
+            if hostvars is None:
+                raise HostvarsNotFoundException
+            if section not in hostvars:
+                return None
+            hostvars[section] = value
+            return dump_models(hostvars)
+
+        logger.info(f"Setting {section} for {host_name}")
+        return self._update(host_name, update, "Update hostvars", wait)
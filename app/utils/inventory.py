@@ -1,156 +1,126 @@
 import logging
-from ansible.inventory.manager import InventoryManager
-from ansible.parsing.dataloader import DataLoader
+import threading
 from pathlib import Path
 
-from app.exceptions import HostAlreadyExistsException, HostNotFoundException
+from app.exceptions import HostNotFoundException
 from app.models.entities import HOST_TYPE_REGISTRY
 from app.models.inventory import InventoryEntry
+from app.utils.inventory_parser import AnsibleInventoryParser, NativeInventoryParser
+from app.utils.inventory_snapshot import HostRecord, InventorySnapshot
 from app.utils.sanitize import sanitize_data
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class Inventory():
-    def __init__(self, inventory_path: Path):
-        self.data_loader = DataLoader()
+    def __init__(self, inventory_path: Path, parser: str = "native"):
         self.inventory_path = inventory_path
-        self.inventory = InventoryManager(loader=self.data_loader, sources=str(self.inventory_path))
+        if parser == "native":
+            self.parser = NativeInventoryParser()
+        elif parser == "ansible":
+            self.parser = AnsibleInventoryParser(inventory_path)
+        else:
+            raise ValueError(f"Unknown inventory parser: {parser}")
+        # Readers holding the repo's shared lock may load a snapshot concurrently
+        self._lock = threading.Lock()
+        self._snapshot: InventorySnapshot | None = None
+
+    def snapshot(self, sha: str | None) -> InventorySnapshot:
+        """
+        Get the snapshot for the inventory file on disk, which must be at commit
+        sha. The file is only parsed again when the commit changes.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and sha is not None and snapshot.sha == sha:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or sha is None or snapshot.sha != sha:
+                snapshot = self._load(sha)
+                # Swapped in whole, so readers see either the old snapshot or the new one
+                self._snapshot = snapshot
+            return snapshot
+
+    def is_loaded(self, sha: str | None, entries: bool = False) -> bool:
+        """
+        Check whether the snapshot for sha (and, if asked, its entries) is
+        already in memory, so reading it involves no parsing.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or sha is None or snapshot.sha != sha:
+            return False
+        return not entries or snapshot.entries is not None
 
-    def get_host(self, host_name: str) -> InventoryEntry:
-        self.inventory.refresh_inventory()
-        host = self.inventory.get_host(host_name)
-        if not host:
-            raise HostNotFoundException(f"Host {host_name} not found")
+    def publish(self, snapshot: InventorySnapshot, sha: str):
+        """
+        Make a snapshot produced by a mutation current, once it is committed as sha.
+        This saves re-parsing the file that was just written from it.
+        """
+        self._snapshot = snapshot.at(sha)
 
+    def _load(self, sha: str | None) -> InventorySnapshot:
+        logger.info(f"Loading inventory snapshot for {sha}")
+        hosts, groups = self.parser.parse(self.inventory_path)
+        return InventorySnapshot(sha, hosts, groups)
 
-        host_type = InventoryEntry.get_type_from_group(host.groups)
+    def _entry_class(self, record: HostRecord) -> type:
+        host_type = InventoryEntry.get_type_from_group(record.groups)
 
         entry_cls = HOST_TYPE_REGISTRY.get(host_type)
         if not entry_cls:
             raise ValueError(f"Unrecognized host type: {host_type}")
+        return entry_cls
 
-        host.vars.pop("inventory_file", None)
-        host.vars.pop("inventory_dir", None)
+    def _entry_for(self, record: HostRecord) -> InventoryEntry:
+        # Everything in a snapshot comes from a commit; see build_entry for what is still checked
+        return self._entry_class(record).get_inventory_entry(record, trusted=True)
 
-        return entry_cls.get_inventory_entry(host)
+    def get_host(self, host_name: str, sha: str | None = None) -> InventoryEntry:
+        record = self.snapshot(sha).get(host_name)
+        if not record:
+            raise HostNotFoundException(f"Host {host_name} not found")
 
-    def get_host_by_mac(self, mac: str) -> InventoryEntry:
+        return self._entry_for(record)
+
+    def get_host_by_mac(self, mac: str, sha: str | None = None) -> InventoryEntry:
         """
         Get a host entry from the inventory by its MAC address.
         """
-        self.inventory.refresh_inventory()
-        for host in self.inventory.get_hosts():
-            print(host.vars)
-            if host.vars.get("mac", None) == mac:
-                print(host.name)
-                return self.get_host(host.name)
+        record = self.snapshot(sha).get_by_mac(mac)
+        if not record:
+            raise HostNotFoundException(f"Host with mac {mac} not found")
 
-        raise HostNotFoundException(f"Host with mac {mac} not found")
+        return self._entry_for(record)
 
-    def get_all_hosts(self) -> list[InventoryEntry]:
+    def get_all_hosts(self, sha: str | None = None) -> list[InventoryEntry]:
         """
         Get all hosts in the inventory.
-        """
-        self.inventory.refresh_inventory()
-        hosts = self.inventory.get_hosts()
 
-        if not hosts:
+        The entries are materialized once per snapshot and shared, so callers
+        must not modify them.
+        """
+        snapshot = self.snapshot(sha)
+        entries = snapshot.entries
+        if entries is None:
+            entries = self._entries_for(snapshot)
+            # Racing builders produce equal lists, so the last one simply wins
+            snapshot.entries = entries
+
+        if not entries:
             logger.warning("No hosts found in the inventory.")
-            return []
-
-        all_hosts = []
-        for host in hosts:
-            all_hosts.append(self.get_host(host.name))
-
-        return all_hosts
-
-    def add_host(self, host: InventoryEntry) -> None:
-        self.inventory.refresh_inventory()
-        self.inventory.add_group("all")
-
-        logger.info(f"Adding host {host.name} to the inventory...")
-
-        if any(host.name == h.name for h in self.inventory.get_hosts()):
-            raise HostAlreadyExistsException(f"Host {host.name} already exists in the inventory.")
-
-        self.inventory.add_host(host.name, group="all", port=host.ansible_port)
-        entry = self.inventory.get_host(host.name)
-
-        for key, value in host.get_hostvars().items():
-            if value is not None:
-                entry.set_variable(key, value)
-
-        logger.info(f"Groups for host {host.name}: {host.groups}")
 
-        for group in host.groups:
-            logger.info(f"Adding host {host.name} to group {group}...")
-            if group in ["all", "ungrouped", ""]:
-                continue
+        return list(entries)
 
-            self.inventory.add_group(group)
-            self.inventory.add_host(host.name, group=group)
-
-
-        logger.info(f"Host {host.name} added to the inventory")
-
-    def remove_host(self, host_name: str) -> None:
-        self.inventory.refresh_inventory()
-
-        host = self.inventory.get_host(host_name)
-        if not host:
-            logger.warning(f"Host {host_name} not found in the inventory.")
-            raise HostNotFoundException(f"Host {host_name} not found in the inventory.")
-
-        logger.info(f"Removing {host_name} from the inventory")
-        self.inventory._inventory.remove_host(host)
-
-        groups_list = list(self.inventory.groups)
-        for group in groups_list:
-            if group not in ["all", "ungrouped"] and not self.inventory.get_groups_dict()[group]:
-                logger.info(f"Found empty group {group} after removing host. Removing the group as well.")
-                self.inventory._inventory.remove_group(group)
-
-    def clear_inventory(self) -> None:
-        logger.info("Clearing the inventory...")
-        self.inventory.refresh_inventory()
-
-        for host in self.inventory.get_hosts():
-            logger.info(f"Removing host {host.name} from the inventory")
-            self.inventory._inventory.remove_host(host)
-
-        groups = self.inventory.get_groups_dict()
-
-        for group in groups:
-            if group not in ["all", "ungrouped"]:
-                logger.info(f"Removing group {group} from the inventory")
-                self.inventory._inventory.remove_group(group)
-
-    def to_dict(self, refresh_from_disk: bool = False) -> dict:
-        # Only call self.inventory.refresh_inventory() when you want to refresh
-        # the in-memory representation with what's on disk.
-        if refresh_from_disk:
-            self.inventory.refresh_inventory()
-
-        inventory_dict = {"all": {"hosts": {}, "children": {}}}
-        groups_dict = self.inventory.get_groups_dict()
-
-        for host in groups_dict.get("all", []):
-            entry = self.inventory.get_host(host)
-            if not host:
-                continue
-
-            hostvars = entry.vars.copy()
-            hostvars.pop("inventory_file", None)
-            hostvars.pop("inventory_dir", None)
-            inventory_dict["all"]["hosts"][str(host)] = hostvars
-
-        for group, hosts in groups_dict.items():
-            if group in ["all", "ungrouped"]:
-                continue
-
-            inventory_dict["all"]["children"][str(group)] = {"hosts": {}}
-            for host in hosts:
-                inventory_dict["all"]["children"][str(group)]["hosts"][str(host)] = None
+    def _entries_for(self, snapshot: InventorySnapshot) -> list[InventoryEntry]:
+        """
+        Build every entry in one pass: one sanitize for all the host vars, then
+        one model per host.
+        """
+        records = list(snapshot.hosts.values())
+        all_vars = sanitize_data([record.vars for record in records])
 
-        return inventory_dict
+        entries = []
+        for record, vars in zip(records, all_vars):
+            entries.append(self._entry_class(record).get_inventory_entry(record, vars, trusted=True))
+        return entries
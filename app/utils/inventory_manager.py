@@ -1,88 +1,260 @@
-import json
-import os
-import yaml
+import asyncio
+import functools
+import logging
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Callable
 from app.models.inventory import InventoryEntry
-from app.utils.git import RepoHandler
+from app.utils.async_git import AsyncRepoHandler
+from app.utils.git import RepoHandler, completed, notify_when_pushed
+from app.utils.ssh_mux import SSHMultiplexer
 from app.utils.inventory import Inventory
+from app.utils.inventory_snapshot import InventorySnapshot
 from app.utils.sanitize import sanitize_data
+from app.utils import yaml_io
 
-# Need this to avoid YAML dumping None as 'null'
-yaml.SafeDumper.add_representer(
-    type(None),
-    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
-)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 class InventoryManager:
-    def __init__(self, repo_url: str, repo_path: Path):
+    def __init__(
+        self,
+        repo_url: str,
+        repo_path: Path,
+        max_staleness_ms: int = 0,
+        write_behind_ms: int = 0,
+        write_behind_max_batch: int = 50,
+        clone_filter: str | None = None,
+        reference_dir: Path | None = None,
+        ssh_mux: SSHMultiplexer | None = None,
+        parser: str = "native",
+        git_timeout_s: float = 60,
+    ):
         self.repo_url = repo_url
         self.repo_path = repo_path
-        self.repo = RepoHandler(repo_url, Path(repo_path))
+        self.repo = RepoHandler(
+            repo_url,
+            Path(repo_path),
+            max_staleness_ms=max_staleness_ms,
+            write_behind_ms=write_behind_ms,
+            write_behind_max_batch=write_behind_max_batch,
+            clone_filter=clone_filter,
+            reference_dir=reference_dir,
+            ssh_mux=ssh_mux,
+            git_timeout_s=git_timeout_s,
+        )
+        # The same clone driven from the event loop, for the async routes
+        self.arepo = AsyncRepoHandler(self.repo, timeout_s=git_timeout_s)
         self.inventory_path = Path(repo_path) / "inventory.yml"
-        self.inventory = Inventory(self.inventory_path)
+        self.inventory = Inventory(self.inventory_path, parser)
+        # Called with the new snapshot whenever this process pushes an inventory change
+        self._listeners: list[Callable[[InventorySnapshot], None]] = []
 
-    def save(self):
+    def add_listener(self, listener: Callable[[InventorySnapshot], None]):
+        """
+        Call listener with the new inventory snapshot after each change this
+        process pushes. It runs on whichever thread finishes the push.
+        """
+        self._listeners.append(listener)
+
+    def close(self):
+        """
+        Push any changes still queued for write-behind, e.g. on shutdown.
+        """
+        self.repo.close()
+
+    def _wait(self, future: Future, wait: bool) -> Future:
+        # Only ever wait after releasing the write lock, so that concurrent
+        # writers can join the same write-behind batch
+        if wait:
+            future.result()
+        return future
+
+    def save(self, wait: bool = True) -> Future:
         """
         Save the current state of the inventory to the repository.
+
+        Returns a future that resolves once the change is pushed, to the
+        pushed commit sha, or to None if there was nothing to write.
         """
-        self.repo.checkout_and_pull(branch="main")
-        # Take the in-memory representation and write it to disk
-        inventory = self.inventory.to_dict(refresh_from_disk=False)
-        sanitized_inventory = sanitize_data(inventory)
+        with self.repo.lock.write():
+            future = self._save(self._current())
+        return self._wait(future, wait)
+
+    def _current(self) -> InventorySnapshot:
+        # Callers must hold the repo write lock
+        self.repo.checkout_and_pull(branch="main", force_fetch=True)
+        return self.inventory.snapshot(self.repo.head_sha())
+
+    def _save(self, snapshot: InventorySnapshot) -> Future:
+        # Callers must hold the repo write lock and have derived snapshot from _current()
+        if not self._stage(snapshot):
+            return completed()
 
-        with open(self.inventory_path, "w") as f:
-            yaml.safe_dump(sanitized_inventory, f, default_flow_style=False, allow_unicode=True)
+        future = self.repo.commit_and_push("Update inventory", branch="main", wait=False)
+        self.inventory.publish(snapshot, self.repo.head_sha())
+        notify_when_pushed(future, self._listeners, snapshot)
+        return future
+
+    def _stage(self, snapshot: InventorySnapshot) -> bool:
+        """
+        Write the snapshot to the working tree. Returns False (and publishes the
+        snapshot as is) if the committed file already has exactly this content.
+        """
+        sanitized_inventory = sanitize_data(snapshot.to_dict())
+        content = yaml_io.dump(sanitized_inventory).encode()
 
-        self.repo.commit_and_push("Update inventory", branch="main")
+        head = self.repo.head_sha()
+        if self.repo.is_unchanged(head, "inventory.yml", content):
+            logger.info("Inventory is unchanged, skipping the commit")
+            self.inventory.publish(snapshot, head)
+            return False
+
+        with open(self.inventory_path, "wb") as f:
+            f.write(content)
+        return True
 
     def get_host(self, host_name: str) -> InventoryEntry:
         """
         Get a host entry from the inventory by its name.
         """
-        self.repo.checkout_and_pull(branch="main")
-        return self.inventory.get_host(host_name)
+        with self.repo.snapshot(branch="main"):
+            return self.inventory.get_host(host_name, sha=self.repo.head_sha())
 
     def get_host_by_mac(self, mac: str) -> InventoryEntry:
         """
         Get a host entry from the inventory by its MAC address.
         """
-        self.repo.checkout_and_pull(branch="main")
-        return self.inventory.get_host_by_mac(mac)
+        with self.repo.snapshot(branch="main"):
+            return self.inventory.get_host_by_mac(mac, sha=self.repo.head_sha())
 
     def get_all_hosts(self) -> list[InventoryEntry]:
         """
         Get all hosts in the inventory.
         """
-        self.repo.checkout_and_pull(branch="main")
-        return self.inventory.get_all_hosts()
+        with self.repo.snapshot(branch="main"):
+            return self.inventory.get_all_hosts(sha=self.repo.head_sha())
+
+    def get_snapshot(self) -> InventorySnapshot:
+        """
+        Get the current inventory snapshot. It is immutable, so it stays
+        consistent after the repo moves on.
+        """
+        with self.repo.snapshot(branch="main"):
+            return self.inventory.snapshot(self.repo.head_sha())
 
     def get_inventory(self) -> dict:
         """
         Get the current inventory as a dictionary.
         """
-        self.repo.checkout_and_pull(branch="main")
-        return self.inventory.to_dict(refresh_from_disk=True)
+        with self.repo.snapshot(branch="main"):
+            return self.inventory.snapshot(self.repo.head_sha()).to_dict()
 
-    def add_host(self, entry: InventoryEntry):
+    def add_host(self, entry: InventoryEntry, wait: bool = True) -> Future:
         """
         Add a host to the inventory with its variables.
         """
-        self.repo.checkout_and_pull(branch="main")
-        self.inventory.add_host(entry)
-        self.save()
+        with self.repo.lock.write():
+            snapshot = self._current().with_host(entry)
+            future = self._save(snapshot)
+        return self._wait(future, wait)
 
-    def remove_host(self, host_name: str):
+    def remove_host(self, host_name: str, wait: bool = True) -> Future:
         """
         Delete a host from the inventory.
         """
-        self.repo.checkout_and_pull(branch="main")
-        self.inventory.remove_host(host_name)
-        self.save()
+        with self.repo.lock.write():
+            snapshot = self._current().without_host(host_name)
+            future = self._save(snapshot)
+        return self._wait(future, wait)
 
-    def clear_inventory(self):
+    def clear_inventory(self, wait: bool = True) -> Future:
         """
         Clear the inventory by removing all hosts.
         """
-        self.repo.checkout_and_pull(branch="main")
-        self.inventory.clear_inventory()
-        self.save()
+        with self.repo.lock.write():
+            snapshot = self._current().cleared()
+            future = self._save(snapshot)
+        return self._wait(future, wait)
+
+    async def _read_async(self, read: Callable, *args, entries: bool = False):
+        async with self.arepo.snapshot(branch="main"):
+            sha = await self.arepo.run(self.repo.head_sha)
+            if self.inventory.is_loaded(sha, entries):
+                return read(*args, sha=sha)
+            # Parsing the file and building entries is CPU bound; keep it off the event loop
+            return await self.arepo.run(functools.partial(read, *args, sha=sha))
+
+    async def get_host_async(self, host_name: str) -> InventoryEntry:
+        """
+        Same as get_host, for the event loop.
+        """
+        return await self._read_async(self.inventory.get_host, host_name)
+
+    async def get_host_by_mac_async(self, mac: str) -> InventoryEntry:
+        """
+        Same as get_host_by_mac, for the event loop.
+        """
+        return await self._read_async(self.inventory.get_host_by_mac, mac)
+
+    async def get_all_hosts_async(self) -> list[InventoryEntry]:
+        """
+        Same as get_all_hosts, for the event loop.
+        """
+        return await self._read_async(self.inventory.get_all_hosts, entries=True)
+
+    async def get_snapshot_async(self) -> InventorySnapshot:
+        """
+        Same as get_snapshot, for the event loop.
+        """
+        return await self._read_async(self.inventory.snapshot)
+
+    async def get_inventory_async(self) -> dict:
+        """
+        Same as get_inventory, for the event loop.
+        """
+        snapshot = await self.get_snapshot_async()
+        return snapshot.to_dict()
+
+    async def _mutate_async(self, mutate: Callable[[InventorySnapshot], InventorySnapshot], wait: bool) -> Future:
+        """
+        Apply mutate to the latest inventory and commit the result, holding the
+        write lock without holding a thread.
+        """
+        async with self.repo.lock.write_async():
+            await self.arepo.checkout_and_pull(branch="main", force_fetch=True)
+            snapshot = await self.arepo.run(lambda: mutate(self.inventory.snapshot(self.repo.head_sha())))
+            if not await self.arepo.run(self._stage, snapshot):
+                return completed()
+            future = await self.arepo.commit_and_push("Update inventory", branch="main", wait=False)
+            self.inventory.publish(snapshot, await self.arepo.run(self.repo.head_sha))
+            notify_when_pushed(future, self._listeners, snapshot)
+
+        # Waited for outside the write lock, as in _wait
+        if wait:
+            await asyncio.wrap_future(future)
+        return future
+
+    async def save_async(self, wait: bool = True) -> Future:
+        """
+        Same as save, for the event loop.
+        """
+        return await self._mutate_async(lambda snapshot: snapshot, wait)
+
+    async def add_host_async(self, entry: InventoryEntry, wait: bool = True) -> Future:
+        """
+        Same as add_host, for the event loop.
+        """
+        return await self._mutate_async(lambda snapshot: snapshot.with_host(entry), wait)
+
+    async def remove_host_async(self, host_name: str, wait: bool = True) -> Future:
+        """
+        Same as remove_host, for the event loop.
+        """
+        return await self._mutate_async(lambda snapshot: snapshot.without_host(host_name), wait)
+
+    async def clear_inventory_async(self, wait: bool = True) -> Future:
+        """
+        Same as clear_inventory, for the event loop.
+        """
+        return await self._mutate_async(lambda snapshot: snapshot.cleared(), wait)
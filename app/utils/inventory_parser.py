@@ -0,0 +1,219 @@
+import logging
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+from app.exceptions import InventoryParseException
+from app.utils import yaml_io
+from app.utils.inventory_snapshot import IMPLICIT_GROUPS, HostRecord
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("vars", "children", "hosts")
+
+class _Group:
+    __slots__ = ("name", "hosts", "children", "parents")
+
+    def __init__(self, name: str):
+        self.name = name
+        # Insertion-ordered set of host names
+        self.hosts: dict[str, None] = {}
+        self.children: list["_Group"] = []
+        self.parents: list["_Group"] = []
+
+    def ancestors(self) -> list["_Group"]:
+        seen = []
+        pending = list(self.parents)
+        while pending:
+            group = pending.pop(0)
+            if group not in seen:
+                seen.append(group)
+                pending.extend(group.parents)
+        return seen
+
+    def descendants(self) -> list["_Group"]:
+        """
+        This group and everything below it, breadth first.
+        """
+        ordered = [self]
+        for group in ordered:
+            ordered.extend(child for child in group.children if child not in ordered)
+        return ordered
+
+
+class _Parser:
+    """
+    Reads the YAML inventory layout the same way Ansible's yaml inventory
+    plugin does: group membership (including ancestors, "all" and "ungrouped"),
+    host vars and host order. Group vars are ignored since Ansible does not
+    fold them into a host's own vars either.
+    """
+    def __init__(self):
+        self.groups: dict[str, _Group] = {name: _Group(name) for name in IMPLICIT_GROUPS}
+        self.host_vars: dict[str, dict] = {}
+        self.host_groups: dict[str, list[_Group]] = {}
+        # Ansible starts out with "ungrouped" as a child of "all", which decides
+        # the group order of hosts listed under "ungrouped" explicitly
+        self._add_child(self.groups["all"], self.groups["ungrouped"])
+
+    def parse(self, document) -> tuple[dict[str, HostRecord], tuple[str, ...]]:
+        if document is not None:
+            if not isinstance(document, Mapping):
+                raise InventoryParseException("The inventory must be a mapping of groups")
+            for name, data in document.items():
+                self._parse_group(name, data)
+        self._reconcile()
+
+        hosts = {}
+        for group in self.groups["all"].descendants():
+            for name in group.hosts:
+                if name not in hosts:
+                    groups = tuple(g.name for g in self.host_groups[name])
+                    hosts[name] = HostRecord(name, self.host_vars[name], groups)
+
+        return hosts, tuple(name for name in self.groups if name not in IMPLICIT_GROUPS)
+
+    def _add_group(self, name) -> _Group:
+        if not isinstance(name, str) or not name:
+            raise InventoryParseException(f"Invalid group name: {name!r}")
+        if name not in self.groups:
+            self.groups[name] = _Group(name)
+        return self.groups[name]
+
+    def _parse_group(self, name, data) -> _Group | None:
+        if data is not None and not isinstance(data, Mapping):
+            logger.warning(f"Skipping '{name}' as this is not a valid group definition")
+            return None
+
+        group = self._add_group(name)
+        if data is None:
+            return group
+
+        data = dict(data)
+        for section in SECTIONS:
+            if isinstance(data.get(section), str):
+                data[section] = {data[section]: None}
+            if section in data and data[section] is not None and not isinstance(data[section], Mapping):
+                raise InventoryParseException(f"Invalid \"{section}\" entry for \"{name}\" group, requires a dictionary")
+
+        for key, value in data.items():
+            if key not in SECTIONS:
+                logger.warning(f"Skipping unexpected key ({key}) in group ({name})")
+            elif not isinstance(value, Mapping):
+                continue
+            elif key == "children":
+                for child_name, child_data in value.items():
+                    child = self._parse_group(child_name, child_data)
+                    if child is None:
+                        raise InventoryParseException(f"Could not find group {child_name} in inventory")
+                    self._add_child(group, child)
+            elif key == "hosts":
+                for pattern, host_vars in value.items():
+                    self._add_host(pattern, host_vars or {}, group)
+
+        return group
+
+    def _add_host(self, pattern, host_vars, group: _Group):
+        if not isinstance(pattern, str) or not pattern:
+            raise InventoryParseException(f"Invalid host name: {pattern!r}")
+        if "[" in pattern:
+            raise InventoryParseException(
+                f"Host ranges ({pattern}) are not supported by the native inventory parser, set INVENTORY_PARSER=ansible"
+            )
+        if not isinstance(host_vars, Mapping):
+            raise InventoryParseException(f"Invalid vars for host {pattern}, requires a dictionary")
+
+        name, port = pattern, None
+        # "name:port", as opposed to a bare IPv6 address
+        if pattern.count(":") == 1:
+            head, tail = pattern.split(":")
+            if tail.isdigit():
+                name, port = head, int(tail)
+
+        if name not in self.host_vars:
+            self.host_vars[name] = {"ansible_port": port} if port is not None else {}
+            self.host_groups[name] = []
+
+        if name not in group.hosts:
+            group.hosts[name] = None
+            self._join(name, group.ancestors() + [group])
+
+        self.host_vars[name].update(host_vars)
+
+    def _join(self, host: str, groups: list[_Group]):
+        membership = self.host_groups[host]
+        membership.extend(g for g in groups if g not in membership)
+
+    def _add_child(self, parent: _Group, child: _Group):
+        if child is parent or child in parent.ancestors():
+            raise InventoryParseException(f"Adding group '{child.name}' as child to '{parent.name}' creates a recursive dependency loop.")
+        if child in parent.children:
+            return
+
+        child_ancestors = child.ancestors()
+        additions = [g for g in parent.ancestors() + [parent] if g not in child_ancestors]
+        parent.children.append(child)
+        if parent not in child.parents:
+            child.parents.append(parent)
+            for group in child.descendants():
+                for host in group.hosts:
+                    self._join(host, additions)
+
+    def _reconcile(self):
+        all_group, ungrouped = self.groups["all"], self.groups["ungrouped"]
+        for group in list(self.groups.values()):
+            if group is not all_group and not group.parents:
+                self._add_child(all_group, group)
+
+        for host, membership in self.host_groups.items():
+            if ungrouped in membership:
+                if set(membership) - {all_group, ungrouped}:
+                    del ungrouped.hosts[host]
+                    membership.remove(ungrouped)
+            elif not membership or membership == [all_group]:
+                ungrouped.hosts[host] = None
+                self._join(host, [all_group, ungrouped])
+
+
+class NativeInventoryParser:
+    """
+    Parses inventory.yml without Ansible.
+    """
+    def parse(self, inventory_path: Path) -> tuple[dict[str, HostRecord], tuple[str, ...]]:
+        path = Path(inventory_path)
+        if not path.exists():
+            logger.warning(f"Inventory file {path} does not exist, treating it as empty")
+            return {}, ()
+
+        document = yaml_io.load(path.read_bytes())
+        return _Parser().parse(document)
+
+
+class AnsibleInventoryParser:
+    """
+    Parses inventory.yml with Ansible's InventoryManager. Opt-in fallback for
+    inventories using features the native parser does not handle.
+    """
+    def __init__(self, inventory_path: Path):
+        from ansible.inventory.manager import InventoryManager
+        from ansible.parsing.dataloader import DataLoader
+
+        self.data_loader = DataLoader()
+        self.inventory = InventoryManager(loader=self.data_loader, sources=str(inventory_path))
+        # Ansible's InventoryManager is not thread-safe
+        self._lock = threading.Lock()
+
+    def parse(self, inventory_path: Path) -> tuple[dict[str, HostRecord], tuple[str, ...]]:
+        with self._lock:
+            self.inventory.refresh_inventory()
+
+            hosts = {}
+            for host in self.inventory.get_hosts():
+                vars = dict(host.vars)
+                vars.pop("inventory_file", None)
+                vars.pop("inventory_dir", None)
+                hosts[host.name] = HostRecord(host.name, vars, tuple(g.name for g in host.groups))
+
+            groups = tuple(g for g in self.inventory.groups if g not in IMPLICIT_GROUPS)
+            return hosts, groups
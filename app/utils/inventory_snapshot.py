@@ -0,0 +1,122 @@
+import logging
+
+from app.exceptions import HostAlreadyExistsException, HostNotFoundException
+from app.models.inventory import InventoryEntry
+from app.utils.sanitize import sanitize_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Implicit groups that are never written under all.children
+IMPLICIT_GROUPS = ("all", "ungrouped")
+
+def normalize_mac(mac: str) -> str:
+    """
+    Normalize a MAC address to bare lowercase hex, accepting colon, dash and
+    dot separated or bare forms in any case. Values that are not a MAC are
+    returned lowercased and otherwise unchanged.
+    """
+    mac = mac.strip().lower()
+    bare = mac.replace(":", "").replace("-", "").replace(".", "")
+    if len(bare) == 12 and all(c in "0123456789abcdef" for c in bare):
+        return bare
+    return mac
+
+
+class HostRecord:
+    """
+    One host as stored in the inventory: its name, host vars and the names of
+    the groups it belongs to (including "all"). Treated as immutable.
+    """
+    __slots__ = ("name", "vars", "groups")
+
+    def __init__(self, name: str, vars: dict, groups: tuple[str, ...]):
+        self.name = name
+        self.vars = vars
+        self.groups = groups
+
+    @classmethod
+    def from_entry(cls, entry: InventoryEntry) -> "HostRecord":
+        vars = sanitize_data({k: v for k, v in entry.get_hostvars().items() if v is not None})
+        groups = ("all",) + tuple(g for g in dict.fromkeys(entry.groups) if g not in IMPLICIT_GROUPS + ("",))
+        return cls(entry.name, vars, groups)
+
+
+class InventorySnapshot:
+    """
+    An immutable view of the inventory as of one commit.
+
+    Lookups by name and (normalized) MAC are dict hits. Mutations never touch
+    the snapshot; they return the next snapshot, which shares every unchanged
+    host record with this one. Snapshots produced by a mutation have no sha
+    until they are committed.
+    """
+    def __init__(self, sha: str | None, hosts: dict[str, HostRecord], groups: tuple[str, ...]):
+        self.sha = sha
+        self.hosts = hosts
+        # Explicit groups (other than all/ungrouped) in file order, kept so empty
+        # groups survive a round trip the way they did before
+        self.groups = groups
+        # Every host materialized as an InventoryEntry, filled in on first use
+        self.entries: list[InventoryEntry] | None = None
+        self.by_mac: dict[str, HostRecord] = {}
+        for record in hosts.values():
+            mac = record.vars.get("mac")
+            if isinstance(mac, str) and mac:
+                self.by_mac.setdefault(normalize_mac(mac), record)
+
+    def at(self, sha: str) -> "InventorySnapshot":
+        """
+        The same inventory, recorded as being at commit sha.
+        """
+        return InventorySnapshot(sha, self.hosts, self.groups)
+
+    def get(self, host_name: str) -> HostRecord | None:
+        return self.hosts.get(host_name)
+
+    def get_by_mac(self, mac: str) -> HostRecord | None:
+        return self.by_mac.get(normalize_mac(mac))
+
+    def with_host(self, entry: InventoryEntry) -> "InventorySnapshot":
+        if entry.name in self.hosts:
+            raise HostAlreadyExistsException(f"Host {entry.name} already exists in the inventory.")
+
+        logger.info(f"Adding host {entry.name} to the inventory with groups {entry.groups}")
+        record = HostRecord.from_entry(entry)
+        hosts = dict(self.hosts)
+        hosts[record.name] = record
+        groups = self.groups + tuple(g for g in record.groups[1:] if g not in self.groups)
+        return InventorySnapshot(None, hosts, groups)
+
+    def without_host(self, host_name: str) -> "InventorySnapshot":
+        record = self.hosts.get(host_name)
+        if record is None:
+            logger.warning(f"Host {host_name} not found in the inventory.")
+            raise HostNotFoundException(f"Host {host_name} not found in the inventory.")
+
+        logger.info(f"Removing {host_name} from the inventory")
+        hosts = dict(self.hosts)
+        del hosts[host_name]
+
+        # Groups the removed host leaves empty go with it
+        emptied = set(record.groups) - {g for other in hosts.values() for g in other.groups}
+        groups = tuple(g for g in self.groups if g not in emptied)
+        return InventorySnapshot(None, hosts, groups)
+
+    def cleared(self) -> "InventorySnapshot":
+        logger.info("Clearing the inventory...")
+        return InventorySnapshot(None, {}, ())
+
+    def to_dict(self) -> dict:
+        inventory_dict = {"all": {"hosts": {}, "children": {}}}
+        children = inventory_dict["all"]["children"]
+        for group in self.groups:
+            children[group] = {"hosts": {}}
+
+        for name, record in self.hosts.items():
+            inventory_dict["all"]["hosts"][name] = dict(record.vars)
+            for group in record.groups:
+                if group not in IMPLICIT_GROUPS:
+                    children.setdefault(group, {"hosts": {}})["hosts"][name] = None
+
+        return inventory_dict
@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+
+from app.exceptions import ServiceNotReadyException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class LazyResource(Generic[T]):
+    """
+    A resource that is built in the background after the app starts.
+
+    Until the factory has succeeded, get() raises ServiceNotReadyException so
+    that requests fail fast with a 503 instead of blocking a worker on a clone.
+    A failed build is retried with exponential backoff.
+    """
+    def __init__(self, name: str, factory: Callable[[], T], max_retry_interval: float = 60):
+        self.name = name
+        self.factory = factory
+        self.max_retry_interval = max_retry_interval
+
+        self._lock = threading.Lock()
+        self._instance: T | None = None
+        self._error: str | None = None
+        self._thread: threading.Thread | None = None
+        self._started_at: float | None = None
+        self._ready_after: float | None = None
+        self._ready = threading.Event()
+
+    def start(self):
+        """
+        Start building the resource in a background thread. Safe to call more than once.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._build, name=f"init-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _build(self):
+        retry_interval = 1
+        while True:
+            try:
+                logger.info(f"Initializing {self.name}...")
+                instance = self.factory()
+            except Exception as e:
+                logger.error(f"Failed to initialize {self.name}, retrying in {retry_interval}s: {e}")
+                with self._lock:
+                    self._error = str(e)
+                time.sleep(retry_interval)
+                retry_interval = min(retry_interval * 2, self.max_retry_interval)
+                continue
+
+            with self._lock:
+                self._instance = instance
+                self._error = None
+                self._ready_after = time.monotonic() - self._started_at
+            self._ready.set()
+            logger.info(f"{self.name} ready after {self._ready_after:.2f}s")
+            return
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def wait(self) -> T:
+        """
+        Block until the resource is ready, e.g. to build another resource on top of it.
+        """
+        self._ready.wait()
+        return self._instance
+
+    def get(self) -> T:
+        instance = self._instance
+        if instance is None:
+            detail = f": {self._error}" if self._error else ""
+            raise ServiceNotReadyException(f"{self.name} is not ready yet{detail}")
+        return instance
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._instance is not None,
+                "started": self._thread is not None,
+                "ready_after_s": round(self._ready_after, 3) if self._ready_after is not None else None,
+                "error": self._error,
+            }
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class _AsyncWaiters:
+    """
+    Coroutines parked on a lock. They are woken with call_soon_threadsafe from
+    whichever thread releases it, so waiting never ties up a thread.
+    Callers must hold the lock's condition.
+    """
+    def __init__(self):
+        self._futures: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def add(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._futures.append((loop, future))
+        return future
+
+    def discard(self, future: asyncio.Future):
+        self._futures = [(loop, f) for loop, f in self._futures if f is not future]
+
+    def wake_all(self):
+        futures, self._futures = self._futures, []
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+async def _wait(cond: threading.Condition, waiters: _AsyncWaiters, try_acquire):
+    """
+    Wait until try_acquire (called with cond held) succeeds.
+    """
+    while True:
+        with cond:
+            if try_acquire():
+                return
+            future = waiters.add()
+        try:
+            await future
+        except asyncio.CancelledError:
+            with cond:
+                waiters.discard(future)
+            raise
+
+
+class Lock:
+    """
+    A mutex for threads (`with lock`) that coroutines can also take with
+    `async with locked(lock)`, without holding a thread while they wait.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._locked = False
+        self._waiters = _AsyncWaiters()
+
+    def _try_acquire(self) -> bool:
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def acquire(self, blocking: bool = True) -> bool:
+        with self._cond:
+            while not self._try_acquire():
+                if not blocking:
+                    return False
+                self._cond.wait()
+            return True
+
+    async def acquire_async(self):
+        await _wait(self._cond, self._waiters, self._try_acquire)
+
+    def release(self):
+        with self._cond:
+            self._locked = False
+            self._cond.notify()
+            self._waiters.wake_all()
+
+    def locked(self) -> bool:
+        return self._locked
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+@asynccontextmanager
+async def locked(lock: Lock):
+    """
+    `with lock` for coroutines.
+    """
+    await lock.acquire_async()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+class RWLock:
+    """
+    A writer-preferring readers-writer lock.
+
+    Any number of readers may hold the lock at once; a writer holds it alone.
+    Once a writer is waiting, new readers queue behind it so a steady stream of
+    reads cannot starve a commit. The lock is not reentrant.
+
+    Threads use read()/write(), coroutines read_async()/write_async(). Waiting
+    coroutines do not hold a thread.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._waiters = _AsyncWaiters()
+
+    def _wake(self):
+        # Callers must hold the condition
+        self._cond.notify_all()
+        self._waiters.wake_all()
+
+    def _try_read(self) -> bool:
+        if self._writer or self._writers_waiting:
+            return False
+        self._readers += 1
+        return True
+
+    def _try_write(self) -> bool:
+        if self._writer or self._readers:
+            return False
+        self._writer = True
+        return True
+
+    def acquire_read(self, blocking: bool = True) -> bool:
+        with self._cond:
+            while not self._try_read():
+                if not blocking:
+                    return False
+                self._cond.wait()
+            return True
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._wake()
+
+    def acquire_write(self, blocking: bool = True) -> bool:
+        with self._cond:
+            if not blocking:
+                return self._try_write()
+
+            self._writers_waiting += 1
+            try:
+                while not self._try_write():
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            return True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._wake()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    @asynccontextmanager
+    async def read_async(self):
+        await _wait(self._cond, self._waiters, self._try_read)
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @asynccontextmanager
+    async def write_async(self):
+        with self._cond:
+            self._writers_waiting += 1
+        try:
+            await _wait(self._cond, self._waiters, self._try_write)
+        finally:
+            with self._cond:
+                self._writers_waiting -= 1
+                # Readers held back by this writer may go ahead if it gave up
+                self._wake()
+        try:
+            yield
+        finally:
+            self.release_write()
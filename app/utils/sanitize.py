@@ -1,16 +1,68 @@
-import json
+def _sanitize_key(key) -> str:
+    # Same key conversion json.dumps applies
+    if isinstance(key, str):
+        return str.__str__(key)
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, int):
+        return int.__repr__(key)
+    if isinstance(key, float):
+        return float.__repr__(key)
+    return str(key)
+
+def _sanitize_dict(data: dict) -> dict:
+    return {
+        k if type(k) is str else _sanitize_key(k): v if type(v) in _SCALARS else sanitize_data(v)
+        for k, v in data.items()
+    }
+
+def _sanitize_list(data) -> list:
+    return [i if type(i) in _SCALARS else sanitize_data(i) for i in data]
+
+def _unchanged(data):
+    return data
+
+# Values of exactly these types are already what a JSON round trip returns
+_SCALARS = frozenset((str, int, bool, float, type(None)))
+
+# Exact types, so the common case is one dict lookup per value
+_SANITIZERS = {
+    dict: _sanitize_dict,
+    list: _sanitize_list,
+    tuple: _sanitize_list,
+    str: _unchanged,
+    int: _unchanged,
+    bool: _unchanged,
+    float: _unchanged,
+    type(None): _unchanged,
+}
 
 def sanitize_data(data):
     """
     Sanitize the inventory data to make it serializable.
     Convert Ansible custom types to standard Python types.
+
+    Gives the same result as a json.dumps/json.loads round trip: containers
+    are always copied, plain scalars are returned as they are, str/int/float
+    subclasses (e.g. Ansible's unsafe text) are rebuilt as the base type and
+    anything else is converted with str().
     """
-    try:
-        return json.loads(json.dumps(data))
-    except (TypeError, ValueError):
-        if isinstance(data, dict):
-            return {str(k): sanitize_data(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [sanitize_data(i) for i in data]
-        else:
-            return str(data)
+    sanitizer = _SANITIZERS.get(type(data))
+    if sanitizer is not None:
+        return sanitizer(data)
+
+    if isinstance(data, str):
+        return str.__str__(data)
+    if isinstance(data, int):
+        return int(data)
+    if isinstance(data, float):
+        return float(data)
+    if isinstance(data, dict):
+        return _sanitize_dict(data)
+    if isinstance(data, (list, tuple)):
+        return _sanitize_list(data)
+    return str(data)
@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# git@github.com:owner/repo.git or ssh://git@github.com:22/owner/repo.git
+SCP_URL = re.compile(r"^(?:(?P<user>[^@/]+)@)?(?P<host>[^:/]+):(?!//)")
+SSH_URL = re.compile(r"^ssh://(?:(?P<user>[^@/]+)@)?(?P<host>[^:/]+)(?::(?P<port>\d+))?/")
+
+class _Master:
+    def __init__(self, user: str, host: str, port: int, control_path: Path):
+        self.user = user
+        self.host = host
+        self.port = port
+        self.control_path = control_path
+        # Guards the state and counters below; never held across a subprocess
+        self.lock = threading.Lock()
+        # Held by whoever is checking or (re)establishing the master
+        self.connect_lock = threading.Lock()
+        self.handshake_s: float | None = None
+        self.operations = 0
+        self.multiplexed = 0
+        self.saved_s = 0.0
+        self.connects = 0
+        self.failures = 0
+        self.last_failure: float | None = None
+
+    @property
+    def target(self) -> str:
+        return f"{self.user}@{self.host}"
+
+
+class SSHMultiplexer:
+    """
+    Persistent, multiplexed SSH connections for the git transport.
+
+    Repos are configured (core.sshCommand) to run ssh with ControlMaster=auto and
+    a shared ControlPath, so every fetch and push to the same host rides on one
+    authenticated connection instead of doing its own key exchange. The masters
+    are started and health-checked (`ssh -O check`) by the app and re-established
+    when they die. ssh falls back to a direct connection whenever no master is up.
+
+    The handshake cost measured when a master is established is credited as
+    saved time to every operation that then reuses it.
+
+    Nothing touches the filesystem or starts a thread until start() is called.
+    """
+    def __init__(self, control_dir: Path, ssh_command: str = "ssh", persist_s: int = 600, check_interval_s: float = 30):
+        self.control_dir = Path(control_dir)
+        self.ssh_command = shlex.split(ssh_command)
+        self.persist_s = persist_s
+        self.check_interval_s = check_interval_s
+
+        self._lock = threading.Lock()
+        self._masters: dict[tuple[str, str, int], _Master] = {}
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """
+        Create the control directory and start the health checks.
+        """
+        self.control_dir.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.control_dir, 0o700)
+        self._thread = threading.Thread(target=self._health_loop, name="ssh-mux-health", daemon=True)
+        self._thread.start()
+
+    def _options(self) -> list[str]:
+        return [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self.control_dir}/%r@%h:%p",
+            "-o", f"ControlPersist={self.persist_s}",
+        ]
+
+    @property
+    def git_ssh_command(self) -> str:
+        """
+        The value for core.sshCommand (or GIT_SSH_COMMAND).
+        """
+        return shlex.join(self.ssh_command + self._options())
+
+    def _master_for(self, repo_url: str) -> _Master | None:
+        match = SSH_URL.match(repo_url) or SCP_URL.match(repo_url)
+        if match is None:
+            # Not an SSH remote (https://, file://, a local path)
+            return None
+
+        user = match.group("user") or os.getenv("USER", "git")
+        host = match.group("host")
+        port = int(match.groupdict().get("port") or 22)
+        key = (user, host, port)
+        with self._lock:
+            if key not in self._masters:
+                self._masters[key] = _Master(user, host, port, self.control_dir / f"{user}@{host}:{port}")
+            return self._masters[key]
+
+    def _ssh(self, master: _Master, *args: str, timeout: float = 30) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            self.ssh_command + self._options() + ["-p", str(master.port), *args, master.target],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=timeout,
+        )
+
+    def _alive(self, master: _Master) -> bool:
+        if not master.control_path.exists():
+            return False
+        try:
+            return self._ssh(master, "-O", "check", timeout=5).returncode == 0
+        except subprocess.TimeoutExpired:
+            return False
+
+    def _connect(self, master: _Master):
+        # Callers hold master.connect_lock
+        master.control_path.unlink(missing_ok=True)
+        started = time.monotonic()
+        try:
+            # -f returns once authentication is done, so this times the full handshake
+            result = self._ssh(master, "-o", "ControlMaster=yes", "-o", "BatchMode=yes", "-N", "-f")
+        except subprocess.TimeoutExpired:
+            result = None
+        if result is None or result.returncode != 0:
+            with master.lock:
+                master.failures += 1
+                master.last_failure = time.monotonic()
+            detail = result.stderr.decode(errors="replace").strip() if result is not None else "timed out"
+            logger.warning(f"Failed to establish SSH master for {master.target}:{master.port}: {detail}")
+            return
+
+        handshake_s = time.monotonic() - started
+        with master.lock:
+            master.handshake_s = handshake_s
+            master.connects += 1
+        logger.info(f"Established SSH master for {master.target}:{master.port} in {handshake_s * 1000:.0f}ms")
+
+    def ensure(self, repo_url: str) -> bool:
+        """
+        Make sure a master connection is up for the repo's host. Returns whether
+        one was already up.
+
+        Never waits for another thread's handshake or health check: while one
+        is running, the operation goes ahead and ssh connects on its own.
+        """
+        master = self._master_for(repo_url)
+        if master is None:
+            return False
+        if master.control_path.exists():
+            return True
+
+        with master.lock:
+            last_failure = master.last_failure
+        # Leave reconnecting after a failure to the health check rather than
+        # paying for a doomed handshake on every operation
+        if last_failure is not None and time.monotonic() - last_failure < self.check_interval_s:
+            return False
+
+        if master.connect_lock.acquire(blocking=False):
+            try:
+                if not master.control_path.exists():
+                    self._connect(master)
+            finally:
+                master.connect_lock.release()
+        return False
+
+    @contextmanager
+    def operation(self, repo_url: str):
+        """
+        Wrap a git network operation against the repo's remote.
+        """
+        reused = self.ensure(repo_url)
+        yield
+        self.record(repo_url, reused)
+
+    def record(self, repo_url: str, reused: bool):
+        """
+        Count an operation that ran after ensure() returned reused.
+        """
+        master = self._master_for(repo_url)
+        if master is None:
+            return
+        with master.lock:
+            master.operations += 1
+            if reused and master.handshake_s is not None:
+                master.multiplexed += 1
+                master.saved_s += master.handshake_s
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.check_interval_s)
+            with self._lock:
+                masters = list(self._masters.values())
+            for master in masters:
+                # An operation is establishing it right now
+                if not master.connect_lock.acquire(blocking=False):
+                    continue
+                try:
+                    if not self._alive(master):
+                        logger.info(f"SSH master for {master.target}:{master.port} is down, re-establishing")
+                        self._connect(master)
+                except Exception as e:
+                    logger.error(f"SSH master health check failed for {master.target}: {e}")
+                finally:
+                    master.connect_lock.release()
+
+    def stats(self) -> dict:
+        """
+        Per-host connection reuse and handshake time saved.
+        """
+        stats = {}
+        with self._lock:
+            masters = list(self._masters.values())
+        for master in masters:
+            with master.lock:
+                stats[f"{master.target}:{master.port}"] = {
+                    "handshake_ms": round(master.handshake_s * 1000, 1) if master.handshake_s is not None else None,
+                    "operations": master.operations,
+                    "multiplexed": master.multiplexed,
+                    "connects": master.connects,
+                    "connect_failures": master.failures,
+                    "saved_ms_total": round(master.saved_s * 1000, 1),
+                    "saved_ms_per_operation": round(master.saved_s * 1000 / master.operations, 1) if master.operations else 0.0,
+                }
+        return stats
@@ -0,0 +1,160 @@
+import itertools
+import logging
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from git import Repo
+
+from app.exceptions import GitGetOrCloneException, GitPullException
+from app.utils.git import RepoHandler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WorktreePool:
+    """
+    A bounded pool of `git worktree` checkouts of a repository, leased per branch.
+
+    Worktrees are checked out with a detached HEAD and pushed with
+    HEAD:refs/heads/<branch>, so the same branch can never be "checked out" twice
+    and the main working tree is left alone. Leases for the same branch are
+    serialized, leases for different branches run concurrently, and idle
+    worktrees are evicted least-recently-used first once the cap is reached.
+    """
+    def __init__(self, repo: RepoHandler, root: Path, max_worktrees: int = 8):
+        self.repo = repo
+        self.root = Path(root)
+        self.max_worktrees = max_worktrees
+
+        self._cond = threading.Condition()
+        self._branch_locks: dict[str, threading.Lock] = {}
+        self._worktrees: OrderedDict[str, Repo] = OrderedDict()
+        self._leased: set[str] = set()
+        # Numbers every worktree path, see _path_for
+        self._serial = itertools.count()
+
+        self._reset_root()
+
+    def _reset_root(self):
+        """
+        Drop worktrees left behind by a previous process.
+        """
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self.root.mkdir(parents=True)
+        self.repo.repo.git.worktree("prune")
+
+    def _branch_lock(self, branch: str) -> threading.Lock:
+        with self._cond:
+            return self._branch_locks.setdefault(branch, threading.Lock())
+
+    def _path_for(self, branch: str) -> Path:
+        # Unique per worktree: an evicted worktree is removed without holding its
+        # branch's lock, so a new lease of that branch must not reuse its path
+        return self.root / f"{branch.replace('/', '__')}-{next(self._serial)}"
+
+    def _acquire(self, branch: str) -> Repo:
+        evicted = None
+        with self._cond:
+            if branch in self._worktrees:
+                self._worktrees.move_to_end(branch)
+                self._leased.add(branch)
+                return self._worktrees[branch]
+
+            # Wait for a free slot or an idle worktree we can evict
+            while len(self._worktrees) >= self.max_worktrees and not self._idle():
+                self._cond.wait()
+
+            if len(self._worktrees) >= self.max_worktrees:
+                evicted_branch = self._idle()[0]
+                evicted = self._worktrees.pop(evicted_branch)
+
+            # Reserve the slot before doing any slow git work outside the lock
+            self._leased.add(branch)
+            self._worktrees[branch] = None
+
+        try:
+            if evicted is not None:
+                self._remove(evicted)
+            worktree = self._add(branch)
+        except Exception:
+            with self._cond:
+                self._leased.discard(branch)
+                self._worktrees.pop(branch, None)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._worktrees[branch] = worktree
+        return worktree
+
+    def _release(self, branch: str):
+        with self._cond:
+            self._leased.discard(branch)
+            self._cond.notify_all()
+
+    def _idle(self) -> list[str]:
+        return [b for b in self._worktrees if b not in self._leased]
+
+    def _add(self, branch: str) -> Repo:
+        path = self._path_for(branch)
+        logger.info(f"Adding worktree for branch {branch} at {path}")
+        try:
+            with self.repo.admin_lock:
+                self.repo.repo.git.worktree("add", "--detach", str(path), "refs/remotes/origin/main")
+            return Repo(path)
+        except Exception as e:
+            logger.error(f"Failed to add worktree for branch {branch}: {e}")
+            raise GitGetOrCloneException(f"Failed to add worktree for branch {branch}.") from e
+
+    def _remove(self, worktree: Repo):
+        path = worktree.working_tree_dir
+        logger.info(f"Evicting worktree at {path}")
+        worktree.close()
+        with self.repo.admin_lock:
+            self.repo.repo.git.worktree("remove", "--force", path)
+
+    def _sync(self, worktree: Repo, branch: str, base: str):
+        """
+        Point the worktree at the tip of the remote branch (or the base branch
+        for a branch that does not exist yet) and discard any leftovers. Commits
+        still waiting on a write-behind push count as the tip.
+        """
+        start = self.repo.pending_tip(branch)
+        if start is None:
+            start = f"refs/remotes/origin/{branch if self.repo.branch_exists(branch, remote=True) else base}"
+        try:
+            worktree.git.checkout("--force", "--detach", start)
+            worktree.git.clean("-fd")
+        except Exception as e:
+            logger.error(f"Failed to sync worktree for branch {branch}: {e}")
+            raise GitPullException(f"Failed to sync worktree for branch {branch}.") from e
+
+    @contextmanager
+    def lease(self, branch: str, base: str = "main"):
+        """
+        Lease a worktree synced to the latest remote state of the branch.
+        """
+        with self._branch_lock(branch):
+            worktree = self._acquire(branch)
+            try:
+                # Writers must never build on stale refs
+                self.repo.fetch(force=True, branch=branch)
+                self._sync(worktree, branch, base)
+                yield worktree
+            finally:
+                self._release(branch)
+
+    def discard(self, branch: str):
+        """
+        Remove the worktree for a branch, e.g. after the branch was deleted.
+        """
+        with self._branch_lock(branch):
+            with self._cond:
+                worktree = self._worktrees.pop(branch, None)
+            if worktree is not None:
+                self._remove(worktree)
+            with self._cond:
+                self._cond.notify_all()
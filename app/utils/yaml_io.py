@@ -0,0 +1,56 @@
+import hashlib
+import logging
+from enum import Enum
+from typing import Any, IO
+
+import yaml
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Use the libyaml-backed loader and dumper when PyYAML was built with them
+try:
+    from yaml import CSafeDumper as _BaseDumper, CSafeLoader as _BaseLoader
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper as _BaseDumper, SafeLoader as _BaseLoader
+    LIBYAML = False
+    logger.warning("libyaml is not available, falling back to the pure-Python YAML loader and dumper")
+
+
+class Loader(_BaseLoader):
+    pass
+
+
+class Dumper(_BaseDumper):
+    """
+    Safe dumper for the inventory and hostvars files. Registers its representers
+    on itself rather than on yaml.SafeDumper, so they apply on both the C and
+    pure-Python paths without leaking into other users of PyYAML.
+    """
+
+
+# Dump None as an empty value instead of 'null'
+Dumper.add_representer(
+    type(None),
+    lambda dumper, value: dumper.represent_scalar(u'tag:yaml.org,2002:null', '')
+)
+
+def str_enum_representer(dumper, data):
+    if isinstance(data, Enum):
+        return dumper.represent_scalar('tag:yaml.org,2002:str', str(data.value))
+    return dumper.represent_scalar('tag:yaml.org,2002:str', str(data))
+
+Dumper.add_multi_representer(Enum, str_enum_representer)
+
+def blob_sha(content: bytes) -> str:
+    """
+    The git blob sha of some content, i.e. what `git hash-object` would print.
+    """
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+def load(content: str | bytes | IO) -> Any:
+    return yaml.load(content, Loader=Loader)
+
+def dump(data: Any, stream: IO | None = None) -> str | None:
+    return yaml.dump(data, stream, Dumper=Dumper, default_flow_style=False, allow_unicode=True)
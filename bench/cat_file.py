@@ -0,0 +1,47 @@
+"""
+Per-read cost of blob, path and ref lookups: one git subprocess per call
+(GitPython, as RepoHandler used to) against the persistent cat-file reader.
+
+    python -m bench.cat_file [hosts]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from git import Repo
+
+from app.utils import yaml_io
+from app.utils.cat_file import CatFileReader
+from bench.common import git_remote, report, timed
+
+def main(hosts: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        branches = {"main": {"inventory.yml": yaml_io.dump({"all": {"hosts": {}}})}}
+        for i in range(hosts):
+            branches[f"h{i}"] = {"hostvars.yml": yaml_io.dump({"system": {"os": "debian", "hostname": f"h{i}"}})}
+        url = git_remote(tmp, branches)
+
+        clone = Path(tmp) / "clone"
+        repo = Repo.clone_from(url, clone)
+        reader = CatFileReader(clone)
+        refs = [f"refs/remotes/origin/h{i}" for i in range(hosts)]
+
+        def each(func):
+            return lambda: [func(ref) for ref in refs]
+
+        rows = [
+            ("read blob", repo.git.show, reader.read_blob, ":hostvars.yml"),
+            ("resolve path", repo.git.rev_parse, reader.resolve, ":hostvars.yml"),
+            ("resolve ref", repo.git.rev_parse, reader.resolve, ""),
+        ]
+        results = []
+        for name, subprocess_call, reader_call, suffix in rows:
+            before = timed(each(lambda ref: subprocess_call(ref + suffix)), repeat=3) / hosts
+            after = timed(each(lambda ref: reader_call(ref + suffix)), repeat=3) / hosts
+            results.append((name, f"{before * 1e6:.0f}", f"{after * 1e6:.0f}", f"{before / after:.0f}x"))
+        reader.close()
+
+    report(results, ("lookup", "subprocess us", "cat-file us", "speedup"))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
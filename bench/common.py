@@ -0,0 +1,80 @@
+"""
+Helpers shared by the benchmarks.
+"""
+import statistics
+import time
+from typing import Callable
+
+def timed(func: Callable, repeat: int = 5, number: int = 1) -> float:
+    """
+    Median seconds per call of func over repeat rounds of number calls.
+    """
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - started) / number)
+    return statistics.median(rounds)
+
+def fleet(hosts: int, droplets: int = 0) -> dict:
+    """
+    An inventory document in the layout Inventory writes, with servers and droplets.
+    """
+    servers = {
+        f"server{i}": {
+            "ansible_host": f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            "ansible_port": 22,
+            "ansible_user": "root",
+            "mac": f"aa:bb:{i // 16777216 % 256:02x}:{i // 65536 % 256:02x}:{i // 256 % 256:02x}:{i % 256:02x}",
+        }
+        for i in range(hosts)
+    }
+    cloud = {
+        f"droplet{i}": {"ansible_host": f"172.16.{i // 256}.{i % 256}", "ansible_port": 22, "ansible_user": "deploy"}
+        for i in range(droplets)
+    }
+    return {
+        "all": {
+            "hosts": {**servers, **cloud},
+            "children": {
+                "servers": {"hosts": {name: None for name in servers}},
+                "droplets": {"hosts": {name: None for name in cloud}},
+            },
+        },
+    }
+
+def report(rows: list[tuple], header: tuple):
+    """
+    Print rows as an aligned table.
+    """
+    table = [tuple(str(cell) for cell in header)] + [tuple(str(cell) for cell in row) for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+def git_remote(root, branches: dict[str, dict[str, str]]) -> str:
+    """
+    Create a bare repository under root with one commit per branch holding
+    the given {path: content} files, and return its URL. Branches other than
+    main start from main.
+    """
+    import subprocess
+    from pathlib import Path
+
+    root = Path(root)
+    work, bare = root / "work", root / "remote.git"
+    def git(*args: str):
+        subprocess.run(["git", "-C", str(work), "-c", "user.name=bench", "-c", "user.email=bench@example.com", *args], check=True, capture_output=True)
+
+    subprocess.run(["git", "init", "-q", "-b", "main", str(work)], check=True)
+    for branch, files in sorted(branches.items(), key=lambda item: item[0] != "main"):
+        if branch != "main":
+            git("checkout", "-q", "-B", branch, "main")
+        for path, content in files.items():
+            (work / path).write_text(content)
+        git("add", "-A")
+        git("commit", "-q", "--allow-empty", "-m", f"Update {branch}")
+    git("checkout", "-q", "main")
+    subprocess.run(["git", "clone", "-q", "--bare", str(work), str(bare)], check=True, capture_output=True)
+    return f"file://{bare}"
@@ -0,0 +1,61 @@
+"""
+Model construction on the hot paths, validated against trusted:
+building inventory entries for GET /entry/, and the POST routes' section
+update (the section model is used as it is and only the hostvars dict is
+dumped, instead of validating the whole hostvars model again).
+
+    python -m bench.construct [hosts]
+"""
+import sys
+
+from app.models.entities import HOST_TYPE_REGISTRY
+from app.models.hostvars import HOSTVARS_VALIDATOR
+from app.models.state import STATE_VALIDATOR, StateModel
+from app.models.validation import dump_models, validate_as
+from app.utils.inventory_snapshot import HostRecord
+from bench.common import fleet, report, timed
+
+HOSTVARS = {
+    "state": {"state": "provisioned"},
+    "system": {"os": "debian", "node_type": "worker"},
+    "storage": {
+        "disk_name": "/dev/sda",
+        "partitions": [
+            {"partition_type": "primary", "alloc_type": "size", "size": 512, "fs_type": "efi", "flags": ["esp"]},
+            {"partition_type": "primary", "alloc_type": "percentage", "size": 100, "fs_type": "ext4"},
+        ],
+    },
+    "flags": {},
+    "users": [{"username": f"user{i}", "groups": ["wheel"]} for i in range(5)],
+}
+
+def main(hosts: int):
+    registry = HOST_TYPE_REGISTRY["server"]
+    records = [HostRecord(name, vars, ("all", "servers")) for name, vars in fleet(hosts)["all"]["hosts"].items()]
+
+    def entries(trusted: bool):
+        return lambda: [registry.get_inventory_entry(record, trusted=trusted) for record in records]
+
+    hostvars = HOSTVARS_VALIDATOR["server"].model_validate(HOSTVARS).model_dump()
+    state = StateModel(state="created")
+
+    def validated_update():
+        # The whole hostvars validated again after the section is put in
+        updated = dict(hostvars, state=STATE_VALIDATOR["server"].model_validate(state.model_dump()))
+        HOSTVARS_VALIDATOR["server"].model_validate(updated).model_dump()
+
+    def trusted_update():
+        dump_models(dict(hostvars, state=validate_as(STATE_VALIDATOR["server"], state)))
+
+    rows = []
+    for name, validated, trusted, count in (
+        ("entries", entries(False), entries(True), hosts),
+        ("section update", validated_update, trusted_update, 1),
+    ):
+        number = 1 if count > 1 else 2000
+        validated_s, trusted_s = timed(validated, number=number) / count, timed(trusted, number=number) / count
+        rows.append((name, f"{validated_s * 1e6:.1f}", f"{trusted_s * 1e6:.1f}", f"{validated_s / trusted_s:.1f}x"))
+    report(rows, ("path", "validated us", "trusted us", "speedup"))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,79 @@
+"""
+Read throughput and latency at 1/8/32 concurrent clients, with and without
+a writer pushing hostvars for an unrelated host the whole time.
+
+    python -m bench.contention [seconds]
+"""
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.utils import yaml_io
+from app.utils.hostvars_manager import HostvarsManager
+from app.utils.inventory_manager import InventoryManager
+from bench.common import fleet, git_remote, report
+
+HOSTS = 50
+
+def run(clients: int, seconds: float, inventory: InventoryManager, hostvars: HostvarsManager, writer: bool) -> tuple:
+    stop = threading.Event()
+    latencies: list[float] = []
+    writes = 0
+
+    def read(client: int):
+        i = client
+        while not stop.is_set():
+            started = time.perf_counter()
+            inventory.get_host(f"server{i % HOSTS}")
+            hostvars.get(f"server{i % HOSTS}")
+            latencies.append(time.perf_counter() - started)
+            i += clients
+
+    def write():
+        nonlocal writes
+        while not stop.is_set():
+            hostvars._write("writer", {"system": {"os": "arch", "n": writes}}, "bench", wait=True)
+            writes += 1
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(clients)]
+    if writer:
+        threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return (
+        clients,
+        "yes" if writer else "no",
+        f"{len(latencies) / seconds:.0f}",
+        f"{statistics.median(latencies) * 1000:.1f}",
+        f"{latencies[int(len(latencies) * 0.95)] * 1000:.1f}",
+        f"{writes / seconds:.1f}" if writer else "-",
+    )
+
+def main(seconds: float):
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inventory_url = git_remote(tmp / "inventory", {"main": {"inventory.yml": yaml_io.dump(fleet(HOSTS))}})
+        branches = {"main": {}} | {f"server{i}": {"hostvars.yml": yaml_io.dump({"system": {"os": "debian"}})} for i in range(HOSTS)}
+        hostvars_url = git_remote(tmp / "hostvars", branches)
+
+        # Reads may be served from refs fetched up to 2s ago, as in production
+        inventory = InventoryManager(inventory_url, tmp / "inventory-clone", max_staleness_ms=2000)
+        hostvars = HostvarsManager(hostvars_url, tmp / "hostvars-clone", max_staleness_ms=2000, single_branch=True)
+        inventory.get_host("server0")
+
+        rows = [run(clients, seconds, inventory, hostvars, writer) for writer in (False, True) for clients in (1, 8, 32)]
+    report(rows, ("clients", "writer", "reads/s", "p50 ms", "p95 ms", "writes/s"))
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,44 @@
+"""
+GET /entry/ without the HTTP layer: materializing every entry of an
+inventory and encoding it, at 100, 1k and 10k hosts. The per-host cost
+should stay flat as the fleet grows.
+
+    python -m bench.entries [hosts ...]
+"""
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+from app.utils import yaml_io
+from app.utils.inventory import Inventory
+from bench.common import fleet, report, timed
+
+def main(sizes: list[int]):
+    logging.disable(logging.INFO)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for hosts in sizes:
+            path = Path(tmp) / f"inventory-{hosts}.yml"
+            path.write_text(yaml_io.dump(fleet(hosts - hosts // 10, droplets=hosts // 10)))
+            commits = iter(range(1_000_000))
+
+            def cold():
+                # A new commit: parse the file and build every entry
+                jsonable_encoder(Inventory(path).get_all_hosts(sha=str(next(commits))))
+
+            inventory = Inventory(path)
+            inventory.get_all_hosts(sha="warm")
+
+            def warm():
+                jsonable_encoder(inventory.get_all_hosts(sha="warm"))
+
+            repeat = max(3, 300 // hosts)
+            cold_s, warm_s = timed(cold, repeat), timed(warm, repeat)
+            rows.append((hosts, f"{cold_s * 1000:.0f}", f"{cold_s / hosts * 1e6:.0f}", f"{warm_s * 1000:.0f}", f"{warm_s / hosts * 1e6:.0f}"))
+    report(rows, ("hosts", "new commit ms", "us/host", "same commit ms", "us/host"))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,36 @@
+"""
+sanitize_data over the host vars of a 10k-host inventory, against the JSON
+round trip it replaced, with plain strings and with str subclasses such as
+the unsafe text older Ansible versions wrap values in. Current Ansible hands
+over plain str; a fully wrapped document takes the per-value subclass path
+and is slower than the C json round trip.
+
+    python -m bench.sanitize [hosts]
+"""
+import json
+import sys
+
+from app.utils.sanitize import sanitize_data
+from bench.common import fleet, report, timed
+
+class UnsafeText(str):
+    pass
+
+def unsafe(value):
+    if isinstance(value, dict):
+        return {UnsafeText(k): unsafe(v) for k, v in value.items()}
+    return UnsafeText(value) if isinstance(value, str) else value
+
+def main(hosts: int):
+    plain = list(fleet(hosts)["all"]["hosts"].values())
+    wrapped = [unsafe(vars) for vars in plain]
+
+    rows = []
+    for name, data in (("plain", plain), ("unsafe text", wrapped)):
+        before = timed(lambda: json.loads(json.dumps(data)))
+        after = timed(lambda: sanitize_data(data))
+        rows.append((name, hosts, f"{before * 1000:.1f}", f"{after * 1000:.1f}", f"{before / after:.1f}x"))
+    report(rows, ("vars", "hosts", "json round trip ms", "sanitize_data ms", "speedup"))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
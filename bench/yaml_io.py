@@ -0,0 +1,32 @@
+"""
+Parse and dump time of inventory documents, pure-Python PyYAML against
+yaml_io (libyaml when available).
+
+    python -m bench.yaml_io [hosts ...]
+"""
+import sys
+
+import yaml
+
+from app.utils import yaml_io
+from bench.common import fleet, report, timed
+
+def main(sizes: list[int]):
+    print(f"libyaml: {yaml_io.LIBYAML}")
+    rows = []
+    for hosts in sizes:
+        document = fleet(hosts)
+        content = yaml_io.dump(document).encode()
+        repeat = max(3, 2000 // hosts)
+        rows.append((
+            hosts,
+            f"{len(content) / 1024:.0f}",
+            f"{timed(lambda: yaml.safe_load(content), repeat) * 1000:.1f}",
+            f"{timed(lambda: yaml_io.load(content), repeat) * 1000:.1f}",
+            f"{timed(lambda: yaml.safe_dump(document, default_flow_style=False), repeat) * 1000:.1f}",
+            f"{timed(lambda: yaml_io.dump(document), repeat) * 1000:.1f}",
+        ))
+    report(rows, ("hosts", "KiB", "safe_load ms", "load ms", "safe_dump ms", "dump ms"))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,77 @@
+"""
+A local stand-in for the parts of the Concourse API the app uses: the token
+endpoint, resource checks (which finish after a configurable time, with a
+configurable status), build status and job triggers.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHECK = re.compile(r"^/api/v1/teams/(?P<team>[^/]+)/pipelines/(?P<pipeline>[^/]+)/resources/(?P<resource>[^/]+)/check$")
+TRIGGER = re.compile(r"^/api/v1/teams/(?P<team>[^/]+)/pipelines/(?P<pipeline>[^/]+)/jobs/(?P<job>[^/]+)/builds$")
+BUILD = re.compile(r"^/api/v1/builds/(?P<id>\d+)$")
+
+class ConcourseStub:
+    def __init__(self, check_duration_s: float = 0, check_status: str = "succeeded"):
+        self.check_duration_s = check_duration_s
+        self.check_status = check_status
+        self.checks: dict[int, dict] = {}
+        self.triggers: list[dict] = []
+        self.polls = 0
+        self._ids = iter(range(1, 1_000_000))
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _status(self, check: dict) -> str:
+        if time.monotonic() - check["started"] < self.check_duration_s:
+            return "started"
+        check.setdefault("finished", time.monotonic())
+        return self.check_status
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, body: dict, status: int = 200):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub._lock:
+                    if self.path == "/sky/issuer/token":
+                        return self._reply({"access_token": "token", "expires_in": 3600})
+                    if match := CHECK.match(self.path):
+                        check = {"id": next(stub._ids), "started": time.monotonic(), **match.groupdict()}
+                        stub.checks[check["id"]] = check
+                        return self._reply({"id": check["id"], "status": "started"})
+                    if match := TRIGGER.match(self.path):
+                        stub.triggers.append({"at": time.monotonic(), **match.groupdict()})
+                        return self._reply({"id": next(stub._ids), "status": "pending"})
+                return self._reply({}, 404)
+
+            def do_GET(self):
+                with stub._lock:
+                    if (match := BUILD.match(self.path)) and int(match["id"]) in stub.checks:
+                        stub.polls += 1
+                        return self._reply({"id": int(match["id"]), "status": stub._status(stub.checks[int(match["id"])])})
+                return self._reply({}, 404)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
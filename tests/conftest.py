@@ -0,0 +1,23 @@
+import subprocess
+
+import pytest
+
+from tests.concourse_stub import ConcourseStub
+
+@pytest.fixture
+def concourse():
+    stub = ConcourseStub()
+    stub.start()
+    yield stub
+    stub.stop()
+
+@pytest.fixture
+def remote_repo(tmp_path):
+    """
+    A bare repository with one commit on main, to clone from.
+    """
+    work, bare = tmp_path / "work", tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(work)], check=True)
+    subprocess.run(["git", "-C", str(work), "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "--allow-empty", "-m", "init"], check=True)
+    subprocess.run(["git", "clone", "-q", "--bare", str(work), str(bare)], check=True)
+    return f"file://{bare}"
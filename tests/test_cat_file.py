@@ -0,0 +1,80 @@
+"""
+CatFileReader against `git rev-parse` and `git show`.
+"""
+import os
+import subprocess
+
+import pytest
+
+from app.exceptions import GitTimeoutException
+from app.utils.cat_file import CatFileReader
+
+def git(repo, *args: str) -> str:
+    return subprocess.run(["git", "-C", str(repo), *args], capture_output=True, text=True, check=True).stdout.strip()
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    (path / "hostvars.yml").write_text("system:\n  os: arch\n")
+    (path / "dir" / "sub").mkdir(parents=True)
+    (path / "dir" / "sub" / "file.txt").write_text("nested\n")
+    git(path, "add", "-A")
+    git(path, "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "init")
+    return path
+
+@pytest.fixture
+def reader(repo):
+    reader = CatFileReader(repo, timeout_s=5)
+    yield reader
+    reader.close()
+
+@pytest.mark.parametrize("rev", ["HEAD", "refs/heads/main", "main:hostvars.yml", "HEAD:dir", "HEAD:dir/sub/file.txt", "HEAD:dir/sub/"])
+def test_resolve_matches_rev_parse(repo, reader, rev):
+    assert reader.resolve(rev) == git(repo, "rev-parse", rev)
+
+@pytest.mark.parametrize("rev", ["missing", "HEAD:missing.yml", "HEAD:hostvars.yml/x", "missing:hostvars.yml"])
+def test_resolve_missing(reader, rev):
+    assert reader.resolve(rev) is None
+
+def test_read_blob_and_tree(repo, reader):
+    assert reader.read_blob("HEAD:hostvars.yml") == b"system:\n  os: arch\n"
+    assert reader.read_blob("HEAD:missing.yml") is None
+    names = [name for _, name, _ in reader.read_tree("HEAD^{tree}")]
+    assert names == ["dir", "hostvars.yml"]
+    with pytest.raises(ValueError):
+        reader.read_blob("HEAD:dir")
+
+def test_restarts_a_dead_process(reader):
+    assert reader.resolve("HEAD") is not None
+    reader._check._proc.kill()
+    reader._check._proc.wait()
+    assert reader.resolve("HEAD") is not None
+
+def test_times_out(repo, tmp_path, monkeypatch):
+    # A git that never answers
+    fake = tmp_path / "bin"
+    fake.mkdir()
+    (fake / "git").write_text("#!/bin/sh\nsleep 30\n")
+    (fake / "git").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{fake}:{os.environ['PATH']}")
+
+    reader = CatFileReader(repo, timeout_s=0.5)
+    with pytest.raises(GitTimeoutException):
+        reader.resolve("HEAD")
+    reader.close()
+
+def test_retry_after_a_crash_times_out(repo, tmp_path, monkeypatch):
+    # A git that dies on its first start and never answers on the next
+    fake = tmp_path / "bin"
+    fake.mkdir()
+    (fake / "git").write_text(f"#!/bin/sh\nif [ -e {tmp_path}/started ]; then sleep 30; fi\ntouch {tmp_path}/started\n")
+    (fake / "git").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{fake}:{os.environ['PATH']}")
+
+    reader = CatFileReader(repo, timeout_s=0.5)
+    with pytest.raises(GitTimeoutException):
+        reader.resolve("HEAD")
+    # The hung process was stopped rather than left behind
+    assert reader._check._proc is None
+    reader.close()
@@ -0,0 +1,62 @@
+"""
+CommandsManager against the local Concourse stand-in.
+"""
+import time
+
+import pytest
+
+from app.exceptions import ConcourseCheckException
+from app.utils.commands_manager import CommandsManager
+from app.utils.concourse_manager import ConcourseManager
+
+@pytest.fixture
+def manager(concourse, remote_repo, tmp_path):
+    return CommandsManager(
+        "main",
+        "commands",
+        "commands",
+        remote_repo,
+        tmp_path / "clone",
+        ConcourseManager(concourse.url, "user", "password"),
+        check_timeout_s=2,
+    )
+
+def test_fast_check_triggers_without_waiting(concourse, manager):
+    started = time.monotonic()
+    manager.add_command("uptime")
+
+    assert [t["job"] for t in concourse.triggers] == ["commands"]
+    # No fixed sleep between the check and the trigger
+    assert time.monotonic() - started < 1
+
+def test_slow_check_is_waited_for(concourse, manager):
+    concourse.check_duration_s = 0.8
+    manager.add_command("uptime")
+
+    (check,) = concourse.checks.values()
+    (trigger,) = concourse.triggers
+    assert trigger["at"] >= check["finished"]
+    # Polled with backoff, not in a tight loop
+    assert 1 < concourse.polls < 10
+
+def test_failed_check_does_not_trigger(concourse, manager):
+    concourse.check_status = "errored"
+    with pytest.raises(ConcourseCheckException):
+        manager.add_command("uptime")
+    assert concourse.triggers == []
+
+def test_check_past_the_deadline_triggers_anyway(concourse, manager):
+    concourse.check_duration_s = 60
+    started = time.monotonic()
+    manager.add_command("uptime")
+
+    assert len(concourse.triggers) == 1
+    assert 2 <= time.monotonic() - started < 4
+
+def test_node_command_uses_the_node_pipeline(concourse, manager):
+    manager.add_node_command("node1", "echo hi")
+
+    (check,) = concourse.checks.values()
+    assert check["pipeline"] == "node1-commands"
+    assert [(t["pipeline"], t["job"]) for t in concourse.triggers] == [("node1-commands", "commands")]
+    assert manager.repo.branch_exists("node1", remote=True)
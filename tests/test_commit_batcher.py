@@ -0,0 +1,94 @@
+"""
+Write-behind: CommitBatcher on its own and through RepoHandler against a local bare remote.
+"""
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.exceptions import GitPushException
+from app.utils.commit_batcher import CommitBatcher
+from app.utils.git import RepoHandler
+
+class FakeRepo:
+    """
+    Records pushes and rejects the refs it is told to.
+    """
+    def __init__(self, rejected: dict[str, str] = {}):
+        self.repo_path = Path("fake")
+        self.rejected = rejected
+        self.pushes = []
+        self.pushed = threading.Event()
+
+    def push_refspecs(self, refspecs: list[str]) -> dict[str, str | None]:
+        self.pushes.append(refspecs)
+        self.pushed.set()
+        refs = [refspec.split(":", 1)[1] for refspec in refspecs]
+        return {ref: self.rejected.get(ref) for ref in refs}
+
+def remote_log(remote_repo: str, branch: str = "main") -> list[str]:
+    bare = remote_repo.removeprefix("file://")
+    return subprocess.run(["git", "-C", bare, "log", "--format=%s", branch], capture_output=True, text=True, check=True).stdout.splitlines()
+
+def test_writes_are_coalesced_into_one_push(remote_repo, tmp_path):
+    handler = RepoHandler(remote_repo, tmp_path / "clone", write_behind_ms=500)
+    pushes = []
+    push_refspecs = handler.push_refspecs
+    handler.push_refspecs = lambda refspecs, **kwargs: pushes.append(refspecs) or push_refspecs(refspecs, **kwargs)
+
+    futures = []
+    for i in range(3):
+        (tmp_path / "clone" / f"file{i}.txt").write_text(f"{i}\n")
+        futures.append(handler.commit_and_push(f"Write {i}", wait=False))
+
+    shas = {future.result(10) for future in futures}
+    assert len(shas) == 1 and len(pushes) == 1
+    # One commit on top of the initial one
+    assert remote_log(remote_repo) == ["Batch of 3 updates", "init"]
+    handler.close()
+
+def test_rejected_ref_fails_only_its_own_futures():
+    repo = FakeRepo(rejected={"refs/heads/b": "non-fast-forward"})
+    batcher = CommitBatcher(repo, window_ms=200)
+    a1, a2 = batcher.enqueue("a", "sha-a1", "first"), batcher.enqueue("a", "sha-a2", "second")
+    b = batcher.enqueue("b", "sha-b", "other")
+
+    # Both writes to a resolve to the amended tip
+    assert a1.result(10) == a2.result(10) == "sha-a2"
+    with pytest.raises(GitPushException, match="non-fast-forward"):
+        b.result(10)
+    assert repo.pushes == [["sha-a2:refs/heads/a", "sha-b:refs/heads/b"]]
+    batcher.close()
+
+def test_failed_push_fails_the_whole_batch():
+    repo = FakeRepo()
+    repo.push_refspecs = lambda refspecs: (_ for _ in ()).throw(RuntimeError("remote hung up"))
+    batcher = CommitBatcher(repo, window_ms=50)
+    futures = [batcher.enqueue("a", "sha-a", "a"), batcher.enqueue("b", "sha-b", "b")]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(10)
+    batcher.close()
+
+def test_close_flushes_without_waiting_for_the_window():
+    repo = FakeRepo()
+    batcher = CommitBatcher(repo, window_ms=60_000)
+    future = batcher.enqueue("a", "sha-a", "a")
+    assert not repo.pushed.wait(0.2)
+
+    batcher.close()
+    assert future.result(0) == "sha-a"
+    assert not batcher._thread.is_alive()
+    with pytest.raises(GitPushException):
+        batcher.enqueue("a", "sha-a2", "too late")
+
+def test_close_pushes_queued_commits(remote_repo, tmp_path):
+    handler = RepoHandler(remote_repo, tmp_path / "clone", write_behind_ms=60_000)
+    (tmp_path / "clone" / "file.txt").write_text("x\n")
+    future = handler.commit_and_push("Queued", wait=False)
+    assert remote_log(remote_repo) == ["init"]
+
+    handler.close()
+    assert future.done()
+    assert remote_log(remote_repo) == ["Queued", "init"]
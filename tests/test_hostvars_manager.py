@@ -0,0 +1,31 @@
+"""
+HostvarsManager against a local bare remote.
+"""
+import pytest
+
+from app.exceptions import HostvarsNotFoundException
+from app.models.hostvars import ServerHostvarsModel
+from app.utils.hostvars_manager import HostvarsManager
+
+HOSTVARS = {
+    "state": {"state": "provisioned"},
+    "system": {"os": "debian", "node_type": "worker"},
+    "storage": {
+        "disk_name": "/dev/sda",
+        "partitions": [{"partition_type": "primary", "alloc_type": "percentage", "size": 100, "fs_type": "ext4"}],
+    },
+    "flags": {},
+    "users": [{"username": "admin", "groups": ["wheel"]}],
+}
+
+@pytest.mark.parametrize("single_branch", [False, True])
+def test_deleted_hostvars_are_gone(remote_repo, tmp_path, single_branch):
+    # A staleness window would otherwise serve the deleted branch from the remote-tracking ref
+    manager = HostvarsManager(remote_repo, tmp_path / "clone", max_staleness_ms=60_000, single_branch=single_branch)
+    manager.init("server0", ServerHostvarsModel.model_validate(HOSTVARS))
+    assert manager.get("server0")["system"] == HOSTVARS["system"]
+
+    manager.delete("server0")
+    with pytest.raises(HostvarsNotFoundException):
+        manager.get("server0")
+    assert not manager.repo.branch_exists("server0", remote=True)
@@ -0,0 +1,29 @@
+"""
+Import-time regression checks for app.main: heavy dependencies must load on
+first use, and what the app adds on top of FastAPI must stay within budget.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Only needed once a request touches git, Concourse or the Ansible fallback
+LAZY_MODULES = ("ansible", "git", "requests", "urllib3", "yaml", "app.utils.inventory_manager", "app.utils.hostvars_manager")
+# What the app itself may add to FastAPI's import time; generous, since CI machines vary
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "500"))
+
+def import_app(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+def test_heavy_modules_load_lazily():
+    result = import_app(f"import sys, app.main; print([m for m in {LAZY_MODULES!r} if m in sys.modules])")
+    assert result.stdout.strip() == "[]"
+
+def test_import_time_budget():
+    # FastAPI and pydantic come first, so the app.main line only counts what the app adds
+    result = import_app("import fastapi, fastapi.responses, pydantic; import app.main")
+    line = next(line for line in result.stderr.splitlines() if line.rstrip().endswith("| app.main"))
+    cumulative_ms = int(line.split("|")[1]) / 1000
+    assert cumulative_ms < BUDGET_MS, f"import app.main took {cumulative_ms:.0f}ms on top of FastAPI, budget {BUDGET_MS:.0f}ms"
@@ -0,0 +1,54 @@
+"""
+Inventory reads: the bulk path must build the same entries as the per-host one.
+"""
+import pytest
+
+from app.exceptions import HostNotFoundException
+from app.utils import yaml_io
+from app.utils.inventory import Inventory
+
+@pytest.fixture
+def inventory(tmp_path):
+    path = tmp_path / "inventory.yml"
+    path.write_text(yaml_io.dump({
+        "all": {
+            "hosts": {
+                "h1": {"ansible_host": "10.0.0.1", "mac": "AA:BB:CC:00:00:01", "ansible_port": 2222},
+                "d1": {"ansible_host": "10.0.1.1", "ansible_user": "deploy"},
+            },
+            "children": {"servers": {"hosts": {"h1": None}}, "droplets": {"hosts": {"d1": None}}},
+        },
+    }))
+    return Inventory(path)
+
+def test_all_hosts_match_single_lookups(inventory):
+    entries = inventory.get_all_hosts(sha="a")
+    assert sorted(entry.name for entry in entries) == ["d1", "h1"]
+    assert [entry.model_dump() for entry in entries] == [inventory.get_host(entry.name, sha="a").model_dump() for entry in entries]
+
+def test_entries_are_built_once_per_commit(inventory):
+    first = inventory.get_all_hosts(sha="a")
+    assert all(a is b for a, b in zip(first, inventory.get_all_hosts(sha="a")))
+    assert inventory.is_loaded("a", entries=True)
+    assert not inventory.is_loaded("b")
+
+def test_lookups(inventory):
+    assert inventory.get_host_by_mac("aa-bb-cc-00-00-01", sha="a").name == "h1"
+    with pytest.raises(HostNotFoundException):
+        inventory.get_host("missing", sha="a")
+
+def test_unknown_host_type_is_reported(tmp_path):
+    path = tmp_path / "inventory.yml"
+    path.write_text(yaml_io.dump({"all": {"children": {"servers": {"hosts": {"h1": {"mac": "aa"}}}}}}))
+    inventory = Inventory(path)
+
+    # A type the registry does not know, as a newer writer could add
+    from app.models.entities import HOST_TYPE_REGISTRY
+    server = HOST_TYPE_REGISTRY.pop("server")
+    try:
+        with pytest.raises(ValueError, match="Unrecognized host type"):
+            inventory.get_all_hosts(sha="a")
+        with pytest.raises(ValueError, match="Unrecognized host type"):
+            inventory.get_host("h1", sha="a")
+    finally:
+        HOST_TYPE_REGISTRY["server"] = server
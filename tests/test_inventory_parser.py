@@ -0,0 +1,121 @@
+"""
+Parity of the native inventory parser with Ansible's yaml inventory plugin.
+"""
+import random
+
+import pytest
+
+from app.exceptions import InventoryParseException
+from app.utils import yaml_io
+from app.utils.inventory_parser import AnsibleInventoryParser, NativeInventoryParser
+
+INVENTORIES = {
+    "empty": {"all": {"hosts": None}},
+    "written_by_inventory": {
+        "all": {
+            "hosts": {
+                "h1": {"ansible_host": "10.0.0.1", "mac": "aa:bb:cc:00:00:01", "ansible_port": 22},
+                "d1": {"ansible_host": "10.0.1.1", "ansible_user": "deploy"},
+            },
+            "children": {
+                "servers": {"hosts": {"h1": None}},
+                "droplets": {"hosts": {"d1": None}},
+            },
+        },
+    },
+    "nested_children": {
+        "all": {
+            "children": {
+                "servers": {
+                    "hosts": {"h1": {"rack": 1}, "h2": None},
+                    "children": {"gpu": {"hosts": {"h2": {"gpus": 4}}}},
+                },
+                "droplets": {"hosts": {"d1": None}},
+                "empty": None,
+            },
+        },
+    },
+    "top_level_groups": {
+        "servers": {"hosts": {"h1": {"ansible_host": "10.0.0.1"}}},
+        "ungrouped": {"hosts": {"loose": None}},
+    },
+    "host_in_several_groups": {
+        "all": {
+            "hosts": {"h1": {"a": 1}},
+            "children": {
+                "servers": {"hosts": {"h1": {"b": 2}}},
+                "edge": {"hosts": {"h1": {"a": 3}}},
+            },
+        },
+    },
+    "host_with_port": {
+        "all": {"hosts": {"h1:2222": {"ansible_host": "10.0.0.1"}, "::1": None}},
+    },
+    "group_vars_are_not_host_vars": {
+        "all": {
+            "vars": {"ansible_user": "root"},
+            "children": {"servers": {"vars": {"x": 1}, "hosts": {"h1": None}}},
+        },
+    },
+    "string_sections": {
+        "servers": {"hosts": "h1"},
+    },
+}
+
+def parse_both(tmp_path, document):
+    path = tmp_path / "inventory.yml"
+    path.write_text(yaml_io.dump(document))
+    native = NativeInventoryParser().parse(path)
+    ansible = AnsibleInventoryParser(path).parse(path)
+    return native, ansible
+
+def as_comparable(parsed):
+    hosts, groups = parsed
+    return [(h.name, h.vars, h.groups) for h in hosts.values()], groups
+
+@pytest.mark.parametrize("name", INVENTORIES)
+def test_matches_ansible(tmp_path, name):
+    native, ansible = parse_both(tmp_path, INVENTORIES[name])
+    assert as_comparable(native) == as_comparable(ansible)
+
+def generated(seed: int) -> dict:
+    """
+    A random inventory: hosts spread over nested groups, some listed in
+    more than one group with overlapping vars.
+    """
+    rng = random.Random(seed)
+    groups = [f"g{i}" for i in range(rng.randint(1, 6))]
+    document = {"all": {"hosts": {}, "children": {}}}
+    definitions = {name: {"hosts": {}, "children": {}} for name in groups}
+    for i, name in enumerate(groups):
+        parent = rng.choice([None] + groups[:i])
+        if parent is None:
+            document["all"]["children"][name] = definitions[name]
+        else:
+            definitions[parent]["children"][name] = definitions[name]
+    for i in range(rng.randint(0, 30)):
+        host = f"h{i}"
+        for name in rng.sample(groups + ["all"], rng.randint(1, min(3, len(groups) + 1))):
+            hosts = document["all"]["hosts"] if name == "all" else definitions[name]["hosts"]
+            hosts[host] = {f"v{rng.randint(0, 3)}": rng.randint(0, 9)} if rng.random() < 0.7 else None
+    return document
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_ansible_on_generated(tmp_path, seed):
+    native, ansible = parse_both(tmp_path, generated(seed))
+    assert as_comparable(native) == as_comparable(ansible)
+
+def test_missing_file_is_empty(tmp_path):
+    assert NativeInventoryParser().parse(tmp_path / "inventory.yml") == ({}, ())
+
+def test_host_ranges_need_ansible(tmp_path):
+    path = tmp_path / "inventory.yml"
+    path.write_text(yaml_io.dump({"all": {"hosts": {"h[1:3]": None}}}))
+    with pytest.raises(InventoryParseException):
+        NativeInventoryParser().parse(path)
+
+def test_recursive_groups_are_rejected(tmp_path):
+    path = tmp_path / "inventory.yml"
+    path.write_text("a:\n  children:\n    b:\n      children:\n        a: {}\n")
+    with pytest.raises(InventoryParseException):
+        NativeInventoryParser().parse(path)
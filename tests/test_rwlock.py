@@ -0,0 +1,95 @@
+"""
+The repo locks, taken from threads and from coroutines.
+"""
+import asyncio
+import threading
+import time
+
+from app.utils.rwlock import Lock, RWLock, locked
+
+def test_readers_share_writers_exclude():
+    lock = RWLock()
+    assert lock.acquire_read(blocking=False)
+    assert lock.acquire_read(blocking=False)
+    assert not lock.acquire_write(blocking=False)
+    lock.release_read()
+    lock.release_read()
+    assert lock.acquire_write(blocking=False)
+    assert not lock.acquire_read(blocking=False)
+    lock.release_write()
+
+def test_waiting_writer_holds_back_new_readers():
+    lock = RWLock()
+    lock.acquire_read()
+    writer = threading.Thread(target=lambda: (lock.acquire_write(), lock.release_write()))
+    writer.start()
+    while not lock._writers_waiting:
+        time.sleep(0.001)
+    assert not lock.acquire_read(blocking=False)
+    lock.release_read()
+    writer.join(5)
+    assert not writer.is_alive()
+
+def test_many_waiting_coroutines_hold_no_threads():
+    lock = RWLock()
+    order = []
+
+    async def reader(i: int):
+        async with lock.read_async():
+            order.append(i)
+
+    async def main():
+        threads = threading.active_count()
+        lock.acquire_write()
+        tasks = [asyncio.create_task(reader(i)) for i in range(200)]
+        await asyncio.sleep(0.05)
+        assert threading.active_count() == threads
+        # Released from another thread, as a sync writer would
+        threading.Thread(target=lock.release_write).start()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    asyncio.run(main())
+    assert sorted(order) == list(range(200))
+
+def test_cancelled_async_writer_lets_readers_in():
+    lock = RWLock()
+
+    async def main():
+        lock.acquire_read()
+        async def writer():
+            async with lock.write_async():
+                pass
+        task = asyncio.create_task(writer())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert lock.acquire_read(blocking=False)
+        lock.release_read()
+        lock.release_read()
+
+    asyncio.run(main())
+
+def test_mutex_between_threads_and_coroutines():
+    lock = Lock()
+    inside = []
+
+    def thread_user():
+        for _ in range(200):
+            with lock:
+                inside.append(1)
+                assert len(inside) == 1
+                inside.pop()
+
+    async def coroutine_user():
+        for _ in range(200):
+            async with locked(lock):
+                inside.append(1)
+                await asyncio.sleep(0)
+                assert len(inside) == 1
+                inside.pop()
+
+    thread = threading.Thread(target=thread_user)
+    thread.start()
+    asyncio.run(coroutine_user())
+    thread.join()
+    assert not lock.locked()
@@ -0,0 +1,55 @@
+"""
+sanitize_data against the JSON round trip it replaced.
+"""
+import json
+from datetime import date
+from enum import IntEnum
+from pathlib import PurePosixPath
+
+import pytest
+
+from app.utils.sanitize import sanitize_data
+
+class UnsafeText(str):
+    """
+    Like Ansible's AnsibleUnsafeText in the versions that wrap strings.
+    """
+
+class Port(IntEnum):
+    SSH = 22
+
+def round_trip(data):
+    return json.loads(json.dumps(data))
+
+SERIALIZABLE = [
+    None, True, 1, 1.5, "text",
+    {"a": [1, 2.0, None, {"b": (3, 4)}], "c": {}},
+    {1: "int key", 2.5: "float key", True: "bool key", None: "none key"},
+    [UnsafeText("unsafe"), {UnsafeText("key"): UnsafeText("value")}],
+    {"port": Port.SSH, "ports": [Port.SSH]},
+]
+
+def strict(value):
+    """
+    value with the exact type of everything in it, so str and UnsafeText differ.
+    """
+    if isinstance(value, dict):
+        return {(type(k), k): strict(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [strict(v) for v in value]
+    return type(value), value
+
+@pytest.mark.parametrize("data", SERIALIZABLE)
+def test_matches_json_round_trip(data):
+    assert strict(sanitize_data(data)) == strict(round_trip(data))
+
+def test_anything_else_becomes_str():
+    assert sanitize_data({"when": date(2024, 1, 2), "path": [PurePosixPath("/a")]}) == {"when": "2024-01-02", "path": ["/a"]}
+
+def test_containers_are_copied_and_scalars_kept():
+    inner = {"mac": "aa"}
+    data = {"host": inner, "groups": ["servers"]}
+    result = sanitize_data(data)
+    assert result == data
+    assert result is not data and result["host"] is not inner and result["groups"] is not data["groups"]
+    assert result["host"]["mac"] is inner["mac"]
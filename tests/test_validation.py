@@ -0,0 +1,60 @@
+"""
+Trusted construction must build the same models validation does, and fall back
+to validation for anything it cannot take as it is.
+"""
+from typing import List
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.entities import HOST_TYPE_REGISTRY
+from app.models.state import StateModel
+from app.models.user import UserModel
+from app.models.validation import construct_trusted, dump_models, validate_as
+from app.utils.inventory_snapshot import HostRecord
+
+SERVER_VARS = {"ansible_host": "10.0.0.1", "ansible_port": 2222, "ansible_user": "admin", "mac": "aa:bb:cc:00:00:01"}
+DROPLET_VARS = {"ansible_host": "172.16.0.1", "ansible_user": "deploy"}
+
+def entry(host_type, vars, trusted):
+    record = HostRecord(f"{host_type}1", vars, ("all", f"{host_type}s"))
+    return HOST_TYPE_REGISTRY[host_type].get_inventory_entry(record, trusted=trusted)
+
+@pytest.mark.parametrize("host_type, vars", [("server", SERVER_VARS), ("droplet", DROPLET_VARS)])
+def test_trusted_entry_matches_validated(host_type, vars):
+    trusted, validated = entry(host_type, vars, True), entry(host_type, vars, False)
+    assert type(trusted) is type(validated)
+    assert trusted.model_dump() == validated.model_dump()
+    assert type(trusted.ip) is type(validated.ip)
+
+@pytest.mark.parametrize("bad", [{"mac": 123}, {"ansible_port": 70000}, {"ansible_port": "22x"}, {"ansible_host": "not an ip"}])
+def test_bad_trusted_fields_are_validated(bad):
+    with pytest.raises(ValidationError):
+        entry("server", dict(SERVER_VARS, **bad), True)
+
+def test_coercible_trusted_fields_are_coerced():
+    assert entry("server", dict(SERVER_VARS, ansible_port="2222"), True).ansible_port == 2222
+
+def test_construct_trusted_matches_model_validate():
+    data = {"username": "alice", "groups": ["wheel"]}
+    assert construct_trusted(UserModel, data) == UserModel.model_validate(data)
+    # Defaults are filled in when fields are left out
+    assert construct_trusted(UserModel, {"username": "bob"}) == UserModel(username="bob")
+    with pytest.raises(ValidationError):
+        construct_trusted(UserModel, {"groups": []})
+
+def test_validate_as():
+    state = StateModel(state="created")
+    assert validate_as(StateModel, state) is state
+    assert validate_as(StateModel, {"state": "created"}) == state
+    users = validate_as(List[UserModel], [{"username": "alice"}])
+    assert users == [UserModel(username="alice")]
+    with pytest.raises(ValidationError):
+        validate_as(StateModel, {"state": "unknown"})
+
+def test_dump_models():
+    assert dump_models({"state": StateModel(), "users": [UserModel(username="a")], "n": 1}) == {
+        "state": {"state": "initializing"},
+        "users": [{"username": "a", "groups": []}],
+        "n": 1,
+    }
@@ -0,0 +1,84 @@
+"""
+WorktreePool against a local bare remote.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.models.hostvars import ServerHostvarsModel
+from app.utils.git import RepoHandler
+from app.utils.hostvars_manager import HostvarsManager
+from app.utils.worktree_pool import WorktreePool
+from tests.test_hostvars_manager import HOSTVARS
+
+@pytest.fixture
+def pool(remote_repo, tmp_path):
+    return WorktreePool(RepoHandler(remote_repo, tmp_path / "clone"), tmp_path / "worktrees", max_worktrees=2)
+
+def test_concurrent_writes_to_different_hosts(remote_repo, tmp_path):
+    manager = HostvarsManager(remote_repo, tmp_path / "clone", max_worktrees=2)
+    hosts = [f"server{i}" for i in range(6)]
+
+    def write(host):
+        hostvars = dict(HOSTVARS, system={"os": "arch", "node_type": "worker"}, users=[{"username": host}])
+        manager.init(host, ServerHostvarsModel.model_validate(hostvars))
+
+    with ThreadPoolExecutor(len(hosts)) as executor:
+        list(executor.map(write, hosts))
+
+    for host in hosts:
+        assert manager.get(host)["users"] == [{"username": host, "groups": []}]
+    assert len(manager.worktrees._worktrees) <= 2
+
+def test_leased_worktree_is_not_evicted(pool):
+    leased, release = threading.Event(), threading.Event()
+    paths = {}
+
+    def hold():
+        with pool.lease("a") as worktree:
+            paths["a"] = Path(worktree.working_tree_dir)
+            leased.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert leased.wait(10)
+
+    # Only "b" is idle once "c" needs a slot, so it goes and "a" stays
+    with pool.lease("b") as worktree:
+        b_path = Path(worktree.working_tree_dir)
+    with pool.lease("c"):
+        assert paths["a"].exists()
+        assert not b_path.exists()
+        assert set(pool._worktrees) == {"a", "c"}
+
+    release.set()
+    holder.join()
+
+def test_lease_waits_for_a_slot(pool):
+    entered = threading.Event()
+
+    def lease_c():
+        with pool.lease("c"):
+            entered.set()
+
+    with pool.lease("a"), pool.lease("b"):
+        waiter = threading.Thread(target=lease_c)
+        waiter.start()
+        # Both worktrees are leased, so "c" cannot evict either of them yet
+        assert not entered.wait(0.5)
+    waiter.join(10)
+    assert entered.is_set()
+
+def test_worktree_is_clean_after_a_failed_write(pool):
+    with pytest.raises(RuntimeError):
+        with pool.lease("a") as worktree:
+            (Path(worktree.working_tree_dir) / "leftover.yml").write_text("x: 1\n")
+            raise RuntimeError("push rejected")
+
+    with pool.lease("a") as again:
+        assert again is worktree
+        assert not (Path(again.working_tree_dir) / "leftover.yml").exists()
+        assert not again.is_dirty(untracked_files=True)
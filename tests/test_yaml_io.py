@@ -0,0 +1,62 @@
+"""
+The libyaml and pure-Python YAML paths must read and write the same files.
+"""
+import importlib.util
+import subprocess
+from enum import Enum
+
+import pytest
+import yaml
+
+from app.utils import yaml_io
+
+class Color(str, Enum):
+    RED = "red"
+
+DOCUMENTS = [
+    {"system": {"os": "debian", "hostname": None}, "flags": {"wipe": False}},
+    {"state": Color.RED, "users": [{"name": "root", "keys": ["ssh-ed25519 AAAA", None]}]},
+    {"looks_like_other_types": ["010", "yes", "no", "1e3", "0x1f", "~", "null", "2024-01-01", ""]},
+    {"text": "line one\nline two\n", "unicode": "héllo ✓", "quoted": "a: b # c", "empty": {}, "none_list": []},
+    {"all": {"hosts": {f"h{i}": {"mac": f"aa:bb:cc:00:00:{i:02x}", "ansible_port": 22} for i in range(50)}}},
+]
+
+@pytest.fixture
+def pure_yaml_io(monkeypatch):
+    """
+    A separate copy of yaml_io, loaded as if PyYAML was built without libyaml.
+    """
+    monkeypatch.delattr(yaml, "CSafeDumper")
+    monkeypatch.delattr(yaml, "CSafeLoader")
+    spec = importlib.util.spec_from_file_location("pure_yaml_io", yaml_io.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.undo()
+    assert not module.LIBYAML
+    return module
+
+@pytest.mark.skipif(not yaml.__with_libyaml__, reason="PyYAML was built without libyaml")
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_libyaml_and_pure_python_agree(pure_yaml_io, document):
+    assert yaml_io.LIBYAML
+    dumped = pure_yaml_io.dump(document)
+    assert yaml_io.dump(document) == dumped
+    assert yaml_io.load(dumped) == pure_yaml_io.load(dumped)
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_round_trip(document):
+    loaded = yaml_io.load(yaml_io.dump(document))
+    assert yaml_io.dump(loaded) == yaml_io.dump(document)
+
+def test_none_is_written_empty_and_enums_by_value():
+    assert yaml_io.dump({"a": None, "b": Color.RED}) == "a:\nb: red\n"
+
+def test_representers_stay_off_pyyaml_defaults():
+    assert yaml.safe_dump({"a": None}) == "a: null\n"
+
+def test_blob_sha_matches_git(tmp_path):
+    content = yaml_io.dump(DOCUMENTS[0]).encode()
+    path = tmp_path / "hostvars.yml"
+    path.write_bytes(content)
+    git_sha = subprocess.run(["git", "hash-object", str(path)], capture_output=True, text=True, check=True).stdout.strip()
+    assert yaml_io.blob_sha(content) == git_sha